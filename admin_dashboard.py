@@ -1,11 +1,13 @@
 import streamlit as st
 import pandas as pd
 import os
-import json
 import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 from user_management import get_all_users, get_user_data_path
+from utils.workbook_mirror import read_workbook
+from utils.xlsx_package import list_sheets
+from utils.dataset_cache import load_cached, read_json_file
 
 def mostrar_dashboard_admin():
     """
@@ -107,18 +109,17 @@ def mostrar_estadisticas_usuario(username):
     # Estadísticas de órdenes
     if os.path.exists(ordenes_file):
         try:
-            # Leer archivo de órdenes
-            ordenes_excel = pd.ExcelFile(ordenes_file)
+            # Leer archivo de órdenes (solo la columna de certificado)
+            ordenes_hojas = load_cached(ordenes_file, read_workbook, columns=["certificado"])
             
-            # Obtener lista de licitaciones
-            licitaciones = ordenes_excel.sheet_names
+            # Obtener lista de licitaciones (una hoja por licitación, sin leer las hojas)
+            licitaciones = list_sheets(ordenes_file)
             
             # Contar órdenes totales y certificadas
             ordenes_totales = 0
             ordenes_certificadas = 0
             
-            for sheet in licitaciones:
-                df = ordenes_excel.parse(sheet)
+            for df in ordenes_hojas.values():
                 df.columns = [col.lower() for col in df.columns]
                 
                 ordenes_totales += len(df)
@@ -166,8 +167,7 @@ def mostrar_estadisticas_usuario(username):
     # Estadísticas de resumenes
     if os.path.exists(summary_file):
         try:
-            with open(summary_file, "r", encoding="utf-8") as f:
-                resumenes = json.load(f)
+            resumenes = load_cached(summary_file, read_json_file)
             
             if resumenes:
                 # Crear gráfico de distribución de presupuesto
@@ -197,8 +197,7 @@ def mostrar_estadisticas_usuario(username):
     # Estadísticas de certificados
     if os.path.exists(certificados_file):
         try:
-            with open(certificados_file, "r", encoding="utf-8") as f:
-                certificados = json.load(f)
+            certificados = load_cached(certificados_file, read_json_file)
             
             if certificados:
                 st.subheader("Certificados Generados")
@@ -367,14 +366,13 @@ def obtener_estadisticas_usuario(username):
     # Obtener datos de órdenes
     if os.path.exists(ordenes_file):
         try:
-            ordenes_excel = pd.ExcelFile(ordenes_file)
+            ordenes_hojas = load_cached(ordenes_file, read_workbook, columns=["certificado"])
             
-            # Contar licitaciones (hojas)
-            stats["licitaciones"] = len(ordenes_excel.sheet_names)
+            # Contar licitaciones (hojas, sin leer su contenido)
+            stats["licitaciones"] = len(list_sheets(ordenes_file))
             
             # Contar órdenes totales y certificadas
-            for sheet in ordenes_excel.sheet_names:
-                df = ordenes_excel.parse(sheet)
+            for df in ordenes_hojas.values():
                 df.columns = [col.lower() for col in df.columns]
                 
                 stats["ordenes_totales"] += len(df)
@@ -389,8 +387,7 @@ def obtener_estadisticas_usuario(username):
     # Obtener datos de resúmenes
     if os.path.exists(summary_file):
         try:
-            with open(summary_file, "r", encoding="utf-8") as f:
-                resumenes = json.load(f)
+            resumenes = load_cached(summary_file, read_json_file)
             
             # Sumar presupuestos
             for resumen in resumenes:
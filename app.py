@@ -33,6 +33,8 @@ from reset_system import (crear_backup, reiniciar_certificados,
 
 # Importar gestión de usuarios
 from user_management import get_user_data_path
+from utils.workbook_mirror import read_workbook
+from utils.dataset_cache import load_cached, read_json_file
 
 # Rutas de archivos importantes - Serán personalizadas por usuario
 # Estas variables serán modificadas en auth_app.py al iniciar sesión
@@ -229,57 +231,54 @@ def obtener_estadisticas():
     # Obtener información de certificados
     if os.path.exists(CERTIFICADOS_LOG_FILE):
         try:
-            with open(CERTIFICADOS_LOG_FILE, 'r', encoding='utf-8') as f:
-                certificados = json.load(f)
-                estadisticas["certificados_generados"] = len(certificados)
+            certificados = load_cached(CERTIFICADOS_LOG_FILE, read_json_file)
+            estadisticas["certificados_generados"] = len(certificados)
         except Exception as e:
             print(f"Error al leer certificados: {e}")
     
     # Obtener información de licitaciones (VERSIÓN MEJORADA)
     if os.path.exists(CONTROL_SUMMARY_FILE):
         try:
-            with open(CONTROL_SUMMARY_FILE, 'r', encoding='utf-8') as f:
-                try:
-                    resumenes = json.load(f)
-                    
-                    # Imprimir información de depuración sobre licitaciones
-                    print(f"Total de licitaciones encontradas: {len(resumenes)}")
-                    
-                    for i, resumen in enumerate(resumenes):
-                        # Verificar si el estado de licitación existe y es válido
-                        if "estado" in resumen:
-                            # Obtener y normalizar el valor del estado
-                            estado_valor = str(resumen["estado"]).lower().strip()
-                            
-                            # Imprimir información de depuración
-                            print(f"Licitación {i+1}: Estado = '{resumen['estado']}', Normalizado = '{estado_valor}'")
-                            
-                            # Verificar si es activa - ampliamos los casos posibles
-                            estados_activos = ["activa", "activo", "vigente", "en curso", "abierta", "abierto", "en proceso"]
-                            if any(estado_activo in estado_valor for estado_activo in estados_activos):
-                                estadisticas["licitaciones_activas"] += 1
-                                print(f"  --> Marcada como ACTIVA")
-                        else:
-                            print(f"Licitación {i+1}: No tiene campo 'estado'")
-                        
-                        # Acumular valores de presupuesto
-                        estadisticas["presupuesto_total"] += float(resumen.get("presupuesto_total", 0))
-                        estadisticas["presupuesto_ejecutado"] += float(resumen.get("presupuesto_ejecutado", 0))
-                        estadisticas["presupuesto_certificado"] += float(resumen.get("presupuesto_certificado", 0))
+            try:
+                resumenes = load_cached(CONTROL_SUMMARY_FILE, read_json_file)
                 
-                except json.JSONDecodeError as e:
-                    print(f"Error decodificando JSON de licitaciones: {e}")
+                # Imprimir información de depuración sobre licitaciones
+                print(f"Total de licitaciones encontradas: {len(resumenes)}")
+                
+                for i, resumen in enumerate(resumenes):
+                    # Verificar si el estado de licitación existe y es válido
+                    if "estado" in resumen:
+                        # Obtener y normalizar el valor del estado
+                        estado_valor = str(resumen["estado"]).lower().strip()
+                        
+                        # Imprimir información de depuración
+                        print(f"Licitación {i+1}: Estado = '{resumen['estado']}', Normalizado = '{estado_valor}'")
+                        
+                        # Verificar si es activa - ampliamos los casos posibles
+                        estados_activos = ["activa", "activo", "vigente", "en curso", "abierta", "abierto", "en proceso"]
+                        if any(estado_activo in estado_valor for estado_activo in estados_activos):
+                            estadisticas["licitaciones_activas"] += 1
+                            print(f"  --> Marcada como ACTIVA")
+                    else:
+                        print(f"Licitación {i+1}: No tiene campo 'estado'")
+                    
+                    # Acumular valores de presupuesto
+                    estadisticas["presupuesto_total"] += float(resumen.get("presupuesto_total", 0))
+                    estadisticas["presupuesto_ejecutado"] += float(resumen.get("presupuesto_ejecutado", 0))
+                    estadisticas["presupuesto_certificado"] += float(resumen.get("presupuesto_certificado", 0))
+            
+            except json.JSONDecodeError as e:
+                print(f"Error decodificando JSON de licitaciones: {e}")
         except Exception as e:
             print(f"Error al abrir archivo de licitaciones: {e}")
     
     # Obtener información de órdenes
     if os.path.exists(ORDENES_FILE):
         try:
-            ordenes_excel = pd.ExcelFile(ORDENES_FILE)
+            # Solo se necesita la columna de certificado (y el número de filas)
+            ordenes_hojas = load_cached(ORDENES_FILE, read_workbook, columns=["certificado"])
             
-            for hoja in ordenes_excel.sheet_names:
-                ordenes = ordenes_excel.parse(hoja)
-                
+            for hoja, ordenes in ordenes_hojas.items():
                 estadisticas["ordenes_totales"] += len(ordenes)
                 
                 if "certificado" in ordenes.columns:
@@ -14,6 +14,9 @@ from user_management import (
     admin_view_user_data, get_user_data_path, generate_user_report
 )
 
+# Páginas de la aplicación principal, en el orden de la barra de navegación
+PAGINAS = ["Inicio", "Subida de PDFs", "Control de Gastos", "Certificados", "Reportes"]
+
 def initialize_session_state():
     """
     Inicializa las variables de estado de la sesión.
@@ -105,8 +108,15 @@ def redirect_to_app():
             if 'pagina_seleccionada' not in st.session_state:
                 st.session_state.pagina_seleccionada = "Inicio"
             
-            # Crear navegación simplificada
-            tabs = st.tabs(["Inicio", "Subida de PDFs", "Control de Gastos", "Certificados", "Reportes"])
+            # Navegación: a diferencia de st.tabs, que ejecuta el contenido de todas las pestañas
+            # en cada interacción, solo se ejecuta el código de la página seleccionada
+            st.radio(
+                "Página",
+                PAGINAS,
+                key="pagina_seleccionada",
+                horizontal=True,
+                label_visibility="collapsed"
+            )
             
             # Modificar las rutas de archivos para este usuario
             from pages.pagina_1 import pagina_1
@@ -123,21 +133,25 @@ def redirect_to_app():
             pagina_2_module.PERSISTENT_EXPENSES_FILE = f"{user_data_path}/control_de_gasto_de_licitaciones.xlsx"
             pagina_2_module.PERSISTENT_ORDERS_FILE = f"{user_data_path}/control_de_ordenes_de_compra.xlsx"
             pagina_2_module.CONTROL_SUMMARY_FILE = f"{user_data_path}/resumen_control_licitaciones.json"
+            pagina_2_module.STORE_FILE = f"{user_data_path}/sistema_oc.db"
             
             pagina_3_module.GASTOS_FILE = f"{user_data_path}/control_de_gasto_de_licitaciones.xlsx"
             pagina_3_module.ORDENES_FILE = f"{user_data_path}/control_de_ordenes_de_compra.xlsx"
             pagina_3_module.CONTROL_SUMMARY_FILE = f"{user_data_path}/resumen_control_licitaciones.json"
+            pagina_3_module.STORE_FILE = f"{user_data_path}/sistema_oc.db"
             pagina_3_module.CERTIFICADOS_LOG_FILE = f"{user_data_path}/registro_certificados.json"
             
             pagina_4_module.ORDENES_FILE = f"{user_data_path}/control_de_ordenes_de_compra.xlsx"
             pagina_4_module.GASTOS_FILE = f"{user_data_path}/control_de_gasto_de_licitaciones.xlsx"
             pagina_4_module.CONTROL_SUMMARY_FILE = f"{user_data_path}/resumen_control_licitaciones.json"
+            pagina_4_module.STORE_FILE = f"{user_data_path}/sistema_oc.db"
             pagina_4_module.CERTIFICADOS_LOG_FILE = f"{user_data_path}/registro_certificados.json"
             
-            # Mostrar la página según la pestaña seleccionada
-            with tabs[0]:  # Inicio
+            # Mostrar solo la página seleccionada
+            pagina = st.session_state.pagina_seleccionada
+            if pagina == "Inicio":
                 st.write("## Bienvenido al Sistema de Gestión")
-                st.write("Selecciona una de las pestañas para acceder a las diferentes funcionalidades.")
+                st.write("Selecciona una de las páginas para acceder a las diferentes funcionalidades.")
                 
                 # Mostrar estadísticas básicas
                 col1, col2, col3 = st.columns(3)
@@ -150,16 +164,16 @@ def redirect_to_app():
                 with col3:
                     st.metric("Rol", current_role)
             
-            with tabs[1]:  # Subida de PDFs
+            elif pagina == "Subida de PDFs":
                 pagina_1()
             
-            with tabs[2]:  # Control de Gastos
+            elif pagina == "Control de Gastos":
                 pagina_2()
             
-            with tabs[3]:  # Certificados
+            elif pagina == "Certificados":
                 pagina_3()
             
-            with tabs[4]:  # Reportes
+            elif pagina == "Reportes":
                 pagina_4()
     
     except Exception as e:
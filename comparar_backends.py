@@ -0,0 +1,210 @@
+"""
+Comparación lado a lado de los backends de texto para la extracción de órdenes de compra.
+
+Ejecuta extract_fields_from_pdf sobre una carpeta de PDFs de muestra con cada backend
+disponible y muestra el rendimiento (documentos y páginas por segundo) y la precisión
+por campo, tomando pdfplumber como referencia. Si la carpeta tiene un esperado.json
+(nombre del PDF relativo a la carpeta -> campos), también se mide la precisión respecto
+de esos valores. Sin carpeta se usa el corpus de muestra de muestras_oc/.
+
+Con --plantilla verifica además las plantillas de posiciones (aunque estén desactivadas):
+cada PDF se lee con las plantillas conocidas y con el texto completo, y los campos deben
+coincidir. Termina con código 2 si alguna plantilla entrega campos distintos.
+
+Uso:
+    python comparar_backends.py [carpeta_con_pdfs] [--repeticiones 3] [--detalle] [--plantilla]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.pdf_extraction import extract_fields_from_pdf, FIELD_PATTERNS, REQUIRED_FIELDS
+from utils.text_backends import TEXT_BACKENDS
+from utils.layout_templates import KNOWN_LAYOUT_TEMPLATES
+
+REFERENCIA = "pdfplumber"
+
+# Corpus de órdenes de compra de muestra incluido en el repositorio (ver muestras_oc/generar_muestras.py)
+CORPUS_MUESTRA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "muestras_oc")
+
+
+def cargar_esperado(carpeta, archivos):
+    """
+    Lee los campos esperados de cada PDF desde esperado.json en la carpeta del corpus.
+
+    Returns:
+        dict: Ruta del PDF -> campos esperados (solo los PDFs listados), o None si no hay archivo.
+    """
+    ruta = os.path.join(carpeta, "esperado.json")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        esperado = json.load(f)
+    return {
+        archivo: esperado[os.path.relpath(archivo, carpeta)]
+        for archivo in archivos
+        if os.path.relpath(archivo, carpeta) in esperado
+    }
+
+
+def ejecutar_backend(archivos, backend, repeticiones, fallback=False, layout=False, plantillas=None):
+    """
+    Extrae todos los archivos con un backend y mide el tiempo total.
+    :param plantillas: Diccionario opcional que se completa con la plantilla usada en cada archivo.
+
+    Returns:
+        tuple: (resultados por archivo, segundos por pasada, páginas totales)
+    """
+    resultados = {}
+    paginas = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        paginas = 0
+        for archivo in archivos:
+            stats = {}
+            resultados[archivo] = extract_fields_from_pdf(
+                archivo, stats=stats, backend=backend, fallback=fallback, layout=layout
+            )
+            paginas += stats.get("paginas_totales", 0)
+            if plantillas is not None:
+                plantillas[archivo] = stats.get("plantilla")
+    segundos = (time.perf_counter() - inicio) / repeticiones
+    return resultados, segundos, paginas
+
+
+def verificar_plantillas(archivos, ejecuciones, repeticiones, detalle):
+    """
+    Lee los archivos con las plantillas de posiciones conocidas y compara los campos con los
+    de la lectura del texto completo del mismo backend.
+
+    Returns:
+        bool: True si todas las lecturas con plantilla coinciden con el texto completo.
+    """
+    print("\nPlantillas de posiciones respecto del texto completo:")
+    print(f"{'Backend':<22}{'Segundos':>10}{'Aceleración':>13}{'Con plantilla':>15}{'Idénticos':>12}")
+    correcto = True
+    for backend in TEXT_BACKENDS:
+        plantillas = {}
+        resultados, segundos, _ = ejecutar_backend(
+            archivos, backend, repeticiones, layout=KNOWN_LAYOUT_TEMPLATES, plantillas=plantillas
+        )
+        completo, segundos_completo, _ = ejecuciones[backend]
+        leidos = [archivo for archivo in archivos if plantillas[archivo]]
+        distintos = [archivo for archivo in leidos if resultados[archivo] != completo[archivo]]
+        correcto = correcto and not distintos
+        aceleracion = segundos_completo / segundos if segundos else float("inf")
+        print(f"{backend:<22}{segundos:>10.2f}{aceleracion:>12.1f}x{len(leidos):>9}/{len(archivos):<5}"
+              f"{len(leidos) - len(distintos):>6}/{len(leidos):<5}")
+        if detalle:
+            for archivo in distintos:
+                for campo, valor in (completo[archivo] or {}).items():
+                    if (resultados[archivo] or {}).get(campo) != valor:
+                        print(f"  [{backend}] {os.path.basename(archivo)} · {campo}: "
+                              f"{(resultados[archivo] or {}).get(campo)!r} (texto completo: {valor!r})")
+    return correcto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los backends de texto de extracción de PDFs.")
+    parser.add_argument("carpeta", nargs="?", default=CORPUS_MUESTRA,
+                        help="Carpeta con PDFs de órdenes de compra de muestra (por defecto, muestras_oc)")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Pasadas por backend (se promedia el tiempo)")
+    parser.add_argument("--detalle", action="store_true", help="Mostrar cada diferencia respecto de la referencia")
+    parser.add_argument("--plantilla", action="store_true",
+                        help="Verificar también las plantillas de posiciones contra el texto completo")
+    args = parser.parse_args()
+
+    archivos = sorted(glob.glob(os.path.join(args.carpeta, "**", "*.pdf"), recursive=True))
+    if not archivos:
+        print(f"No se encontraron PDFs en {args.carpeta}")
+        return 1
+
+    if REFERENCIA not in TEXT_BACKENDS:
+        print(f"El backend de referencia '{REFERENCIA}' no está disponible.")
+        return 1
+
+    configuraciones = [(nombre, False) for nombre in TEXT_BACKENDS]
+    configuraciones += [(nombre, True) for nombre in TEXT_BACKENDS if nombre != REFERENCIA]
+
+    ejecuciones = {}
+    for backend, fallback in configuraciones:
+        etiqueta = f"{backend}+fallback" if fallback else backend
+        ejecuciones[etiqueta] = ejecutar_backend(archivos, backend, args.repeticiones, fallback)
+
+    referencia = ejecuciones[REFERENCIA][0]
+    campos = list(FIELD_PATTERNS.keys())
+
+    print(f"Corpus: {len(archivos)} PDF(s), {ejecuciones[REFERENCIA][2]} página(s). Referencia: {REFERENCIA}\n")
+    print(f"{'Backend':<22}{'Segundos':>10}{'Docs/s':>10}{'Págs/s':>10}{'Aceleración':>13}{'Docs idénticos':>16}{'Oblig. vacíos':>15}")
+
+    tiempo_referencia = ejecuciones[REFERENCIA][1]
+    for etiqueta, (resultados, segundos, paginas) in ejecuciones.items():
+        identicos = sum(1 for archivo in archivos if resultados[archivo] == referencia[archivo])
+        vacios = sum(
+            1 for archivo in archivos
+            if resultados[archivo] is None or any(not resultados[archivo].get(campo) for campo in REQUIRED_FIELDS)
+        )
+        docs_s = len(archivos) / segundos if segundos else float("inf")
+        pags_s = paginas / segundos if segundos else float("inf")
+        aceleracion = tiempo_referencia / segundos if segundos else float("inf")
+        print(f"{etiqueta:<22}{segundos:>10.2f}{docs_s:>10.1f}{pags_s:>10.1f}{aceleracion:>12.1f}x"
+              f"{identicos:>10}/{len(archivos):<5}{vacios:>15}")
+
+    print("\nPrecisión por campo respecto de la referencia:")
+    print(f"{'Campo':<20}" + "".join(f"{etiqueta:>22}" for etiqueta in ejecuciones if etiqueta != REFERENCIA))
+    for campo in campos:
+        fila = f"{campo:<20}"
+        for etiqueta, (resultados, _, _) in ejecuciones.items():
+            if etiqueta == REFERENCIA:
+                continue
+            coincidencias = sum(
+                1 for archivo in archivos
+                if (resultados[archivo] or {}).get(campo) == (referencia[archivo] or {}).get(campo)
+            )
+            fila += f"{100 * coincidencias / len(archivos):>21.1f}%"
+        print(fila)
+
+    esperado = cargar_esperado(args.carpeta, archivos)
+    if esperado:
+        print(f"\nPrecisión respecto de esperado.json ({len(esperado)} PDF(s)):")
+        print(f"{'Campo':<20}" + "".join(f"{etiqueta:>22}" for etiqueta in ejecuciones))
+        for campo in campos + ["Docs correctos"]:
+            fila = f"{campo:<20}"
+            for resultados, _, _ in ejecuciones.values():
+                correctos = sum(
+                    1 for archivo, campos_esperados in esperado.items()
+                    if all(
+                        (resultados[archivo] or {}).get(nombre) == valor
+                        for nombre, valor in campos_esperados.items()
+                        if campo in ("Docs correctos", nombre)
+                    )
+                )
+                fila += f"{100 * correctos / len(esperado):>21.1f}%"
+            print(fila)
+
+    if args.detalle:
+        print("\nDiferencias:")
+        for etiqueta, (resultados, _, _) in ejecuciones.items():
+            if etiqueta == REFERENCIA:
+                continue
+            for archivo in archivos:
+                obtenido = resultados[archivo] or {}
+                esperado = referencia[archivo] or {}
+                for campo in campos:
+                    if obtenido.get(campo) != esperado.get(campo):
+                        print(f"[{etiqueta}] {os.path.basename(archivo)} · {campo}: "
+                              f"{obtenido.get(campo)!r} (referencia: {esperado.get(campo)!r})")
+
+    if args.plantilla and not verificar_plantillas(archivos, ejecuciones, args.repeticiones, args.detalle):
+        return 2
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
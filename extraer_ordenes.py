@@ -0,0 +1,231 @@
+"""
+Extracción de órdenes de compra por lotes sin Streamlit (p. ej. para cargas nocturnas de archivos históricos).
+
+Lee los PDFs (y los PDFs dentro de archivos ZIP) de una carpeta o patrón glob, extrae los datos
+en paralelo con las mismas reglas que la Página 1 y escribe el resultado en un archivo JSONL o
+directamente en el perfil del usuario (la base de datos de data/users/<usuario>). Con --exportar,
+al terminar genera el Excel de órdenes del perfil (por defecto data/users/<usuario>/ordenes_de_compra.xlsx);
+--excel equivale a --perfil --exportar.
+
+Uso:
+    python extraer_ordenes.py ENTRADA --usuario NOMBRE [--jsonl salida.jsonl | --perfil | --excel]
+                              [--exportar [ARCHIVO.xlsx]]
+                              [--procesos N] [--backend pypdfium2] [--sin-cache] [--completo]
+                              [--sin-aislamiento] [--plantilla] [--separar]
+
+Código de salida: 0 si todos los documentos se procesaron, 2 si hubo documentos con error,
+1 si no se encontraron archivos o los argumentos no son válidos.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.pdf_extraction import format_rut
+from utils.batch_extraction import (
+    iter_extract_batch, load_processed_orders, export_orders_to_excel, compute_content_hash,
+    format_result_name, MAX_EXTRACTION_WORKERS
+)
+from utils.order_store import get_store_file, append_ordenes_extraidas
+from utils.extraction_cache import get_extraction_cache_dir
+from utils.text_store import get_text_store_dir
+from utils.text_backends import TEXT_BACKENDS, DEFAULT_TEXT_BACKEND
+from utils.layout_templates import OC_LAYOUT_TEMPLATES
+from utils.zip_ingestion import is_zip_upload, iter_zip_pdfs
+from utils.manual_entry import get_manual_queue_file, add_to_manual_queue
+
+
+def buscar_archivos(entrada):
+    """
+    Devuelve los PDFs y ZIP de una carpeta (recursivamente) o que coinciden con un patrón glob.
+    """
+    if os.path.isdir(entrada):
+        patron = os.path.join(entrada, "**", "*")
+    else:
+        patron = entrada
+    return sorted(
+        ruta for ruta in glob.glob(patron, recursive=True)
+        if os.path.isfile(ruta) and (ruta.lower().endswith(".pdf") or is_zip_upload(ruta))
+    )
+
+
+def iterar_documentos(archivos, duplicados):
+    """
+    Lee los archivos de uno en uno (los ZIP miembro a miembro) y omite los contenidos repetidos.
+    :param duplicados: Lista que se completa con los nombres de los archivos repetidos.
+    :return: Generador de tuplas (nombre, contenido, hash).
+    """
+    vistos = set()
+    for ruta in archivos:
+        if is_zip_upload(ruta):
+            miembros = ((f"{ruta}/{nombre}", contenido, file_hash)
+                        for nombre, contenido, file_hash in iter_zip_pdfs(ruta))
+        else:
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            miembros = [(ruta, contenido, None)]
+
+        for nombre, contenido, file_hash in miembros:
+            if file_hash is None:
+                file_hash = compute_content_hash(contenido)
+            if file_hash in vistos:
+                duplicados.append(nombre)
+                continue
+            vistos.add(file_hash)
+            yield nombre, contenido, file_hash
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae órdenes de compra de PDFs sin la interfaz web.")
+    parser.add_argument("entrada", help="Carpeta o patrón glob con PDFs (o ZIP con PDFs)")
+    parser.add_argument("--usuario", required=True, help="Nombre de usuario (carpeta data/users/<usuario>)")
+    salida = parser.add_mutually_exclusive_group(required=True)
+    salida.add_argument("--jsonl", help="Archivo JSONL de salida (un documento por línea)")
+    salida.add_argument("--perfil", action="store_true", help="Guardar las órdenes en el perfil del usuario")
+    salida.add_argument("--excel", action="store_true", help="Igual que --perfil --exportar")
+    parser.add_argument("--exportar", nargs="?", const="", metavar="ARCHIVO",
+                        help="Generar al terminar el Excel con todas las órdenes del perfil "
+                             "(por defecto ordenes_de_compra.xlsx en la carpeta del usuario)")
+    parser.add_argument("--procesos", type=int, default=MAX_EXTRACTION_WORKERS, help="Procesos de extracción en paralelo")
+    parser.add_argument("--backend", choices=list(TEXT_BACKENDS.keys()), default=DEFAULT_TEXT_BACKEND,
+                        help="Motor de lectura de texto")
+    parser.add_argument("--sin-cache", action="store_true", help="No usar la caché de extracción del usuario")
+    parser.add_argument("--completo", action="store_true",
+                        help="Leer todas las páginas (desactiva la lectura incremental)")
+    parser.add_argument("--sin-aislamiento", action="store_true",
+                        help="No aislar cada PDF en un proceso con tiempo límite y límite de memoria")
+    parser.add_argument("--plantilla", action="store_true",
+                        help="Leer solo las zonas conocidas de la OC (los PDFs con otro formato se leen completos; "
+                             "requiere OC_LAYOUT_TEMPLATES=1)")
+    parser.add_argument("--separar", action="store_true",
+                        help="Separar los PDFs que contienen varias órdenes de compra (lee todas las páginas)")
+    args = parser.parse_args()
+    if args.excel:
+        args.perfil = True
+        if args.exportar is None:
+            args.exportar = ""
+
+    user_data_path = os.path.join("data", "users", args.usuario)
+    if not os.path.isdir(user_data_path):
+        print(f"No existe la carpeta de datos del usuario: {user_data_path}")
+        return 1
+
+    archivos = buscar_archivos(args.entrada)
+    if not archivos:
+        print(f"No se encontraron PDFs ni ZIP en {args.entrada}")
+        return 1
+
+    if args.plantilla and not OC_LAYOUT_TEMPLATES:
+        print("Advertencia: las plantillas de posiciones están desactivadas (OC_LAYOUT_TEMPLATES=1 "
+              "para activarlas); se leerá el texto completo.")
+        args.plantilla = False
+
+    store_file = get_store_file(user_data_path)
+    processed_orders = load_processed_orders(store_file, args.usuario)
+
+    resumen = {"ok": 0, "duplicado": 0, "error": 0, "manual": 0}
+    con_plantilla = 0
+    separadas = 0
+    duplicados = []
+    fallidos = []
+    manuales = []
+    filas = []
+    paginas = 0
+    rss_pico = None  # (MB, archivo) del documento que más memoria usó
+    inicio = time.perf_counter()
+
+    salida_jsonl = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+    try:
+        for resultado in iter_extract_batch(
+            iterar_documentos(archivos, duplicados),
+            processed_orders,
+            args.usuario,
+            max_workers=max(1, args.procesos),
+            cache_dir=None if args.sin_cache else get_extraction_cache_dir(user_data_path),
+            incremental=not args.completo,
+            backend=args.backend,
+            text_store_dir=get_text_store_dir(user_data_path),
+            isolated=not args.sin_aislamiento,
+            layout=args.plantilla,
+            split_orders=args.separar
+        ):
+            datos = resultado["datos"]
+            if datos and "RUT Proveedor" in datos:
+                datos["RUT Proveedor"] = format_rut(datos["RUT Proveedor"])
+
+            resumen[resultado["estado"]] += 1
+            paginas += resultado["paginas_leidas"]
+            con_plantilla += bool(resultado["plantilla"])
+            separadas += bool(resultado["segmento"])
+            if resultado["rss_pico_mb"] is not None and (rss_pico is None or resultado["rss_pico_mb"] > rss_pico[0]):
+                rss_pico = (resultado["rss_pico_mb"], resultado["nombre"])
+            if resultado["estado"] == "error":
+                fallidos.append((format_result_name(resultado), resultado["motivo"]))
+            elif resultado["estado"] == "manual":
+                manuales.append(resultado)
+            if datos:
+                filas.append(datos)
+
+            if salida_jsonl:
+                salida_jsonl.write(json.dumps({
+                    "archivo": resultado["nombre"],
+                    "hash": resultado["hash"],
+                    "segmento": resultado["segmento"],
+                    "estado": resultado["estado"],
+                    "motivo": resultado["motivo"],
+                    "rss_pico_mb": resultado["rss_pico_mb"],
+                    "error_backend": resultado["error_backend"],
+                    "datos": datos,
+                }, ensure_ascii=False) + "\n")
+    finally:
+        if salida_jsonl:
+            salida_jsonl.close()
+
+    segundos = time.perf_counter() - inicio
+
+    if args.perfil and filas:
+        append_ordenes_extraidas(store_file, filas)
+        print(f"{len(filas)} orden(es) añadidas al perfil de {args.usuario}")
+    elif args.jsonl:
+        print(f"Resultados escritos en {args.jsonl}")
+
+    if args.exportar is not None:
+        orders_file = args.exportar or os.path.join(user_data_path, "ordenes_de_compra.xlsx")
+        exportadas = export_orders_to_excel(store_file, orders_file)
+        print(f"{exportadas} orden(es) del perfil exportadas a {orders_file}")
+
+    if manuales:
+        add_to_manual_queue(get_manual_queue_file(user_data_path), manuales)
+        print("Requieren ingreso manual (PDF sin texto):")
+        for resultado in manuales:
+            print(f"  {resultado['nombre']}")
+
+    if fallidos:
+        print("Archivos con error:")
+        for nombre, motivo in fallidos:
+            print(f"  {nombre}: {motivo}")
+
+    documentos = sum(resumen.values())
+    print(f"Documentos: {documentos} (archivos repetidos omitidos: {len(duplicados)})")
+    if args.separar:
+        print(f"Órdenes separadas de PDFs con varias: {separadas}")
+    print(f"Extraídos: {resumen['ok']}")
+    print(f"Órdenes duplicadas: {resumen['duplicado']}")
+    print(f"Con error: {resumen['error']}")
+    print(f"Sin texto (ingreso manual): {resumen['manual']}")
+    if args.plantilla:
+        print(f"Leídos con la plantilla de posiciones: {con_plantilla}")
+    print(f"Páginas leídas: {paginas}")
+    if rss_pico:
+        print(f"Memoria adicional máxima por documento: {rss_pico[0]:.0f} MB ({rss_pico[1]})")
+    print(f"Tiempo: {segundos:.2f} s ({documentos / segundos if segundos else 0:.1f} docs/s)")
+
+    return 2 if resumen["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
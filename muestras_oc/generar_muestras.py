@@ -0,0 +1,158 @@
+"""
+Genera el corpus de órdenes de compra de muestra usado por comparar_backends.py.
+
+Las órdenes son sintéticas (datos ficticios) y siguen la secuencia de rótulos de una OC de
+Mercado Público: cabecera con el número de la OC y la licitación, un rótulo por línea
+(SEÑOR (ES), RUT, NOMBRE ORDEN DE COMPRA, FECHA ENTREGA PRODUCTOS, Fecha Envio OC.), la
+tabla de ítems (que puede ocupar varias páginas) y los totales en la última página.
+Junto a los PDFs escribe esperado.json con los campos que deben extraerse de cada uno,
+calculados a partir de los datos con que se generó (no a partir de una extracción).
+
+Uso:
+    python muestras_oc/generar_muestras.py
+"""
+import os
+import json
+import random
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+# TrueType embebida: el texto queda extraíble por pdfplumber y pypdfium2
+matplotlib.rcParams["pdf.fonttype"] = 42
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+SEMILLA = 2024
+CANTIDAD = 8
+ITEMS_POR_PAGINA = 28
+TAMANO_A4 = (8.27, 11.69)
+
+PROVEEDORES = [
+    ("SERVICIOS BIOMEDICOS DEL SUR LIMITADA", "76.482.913-5"),
+    ("COMERCIAL ÑANDÚ SPA", "77.105.338-K"),
+    ("INSUMOS CLINICOS ANDINOS S.A.", "96.731.204-1"),
+    ("LABORATORIO PEÑALOLÉN LIMITADA", "78.990.412-7"),
+]
+NOMBRES = [
+    "MANTENIMIENTO CORRECTIVO MONITOR MULTIPARAMETRO",
+    "665/OT 1204/118/24 REPUESTOS BOMBA DE INFUSION",
+    "ADQUISICION DE INSUMOS DE ESTERILIZACION, LOTE 2",
+    "664/OT 311/52/24",
+]
+ESTADOS = ["Aceptada", "Recepcion Conforme", "Enviada a Proveedor", "Cancelada"]
+PRODUCTOS = ["SENSOR SPO2 ADULTO", "CABLE ECG 5 DERIVACIONES", "BATERIA RECARGABLE", "FILTRO HEPA",
+             "MANGUITO PRESION ARTERIAL", "SERVICIO TECNICO EN TERRENO"]
+
+
+def _moneda(valor):
+    return f"{valor:,}".replace(",", ".")
+
+
+def _orden(numero, rng):
+    proveedor, rut = PROVEEDORES[numero % len(PROVEEDORES)]
+    items = []
+    for _ in range(rng.choice([2, 5, 12, 31, 64])):
+        cantidad = rng.randint(1, 20)
+        precio = rng.randint(1, 400) * 250
+        items.append((rng.choice(PRODUCTOS), cantidad, precio))
+    neto = sum(cantidad * precio for _, cantidad, precio in items)
+    iva = round(neto * 0.19)
+    envio = datetime(2024, 1, 8, 9, 0, 0) + timedelta(days=rng.randint(0, 300), seconds=rng.randint(0, 30000))
+    return {
+        "orden": f"1057461-{rng.randint(100, 2999)}-SE24",
+        "licitacion": f"1057461-{rng.randint(1, 40)}-LE23",
+        "estado": ESTADOS[numero % len(ESTADOS)],
+        "proveedor": proveedor,
+        "rut": rut,
+        "nombre": NOMBRES[numero % len(NOMBRES)],
+        "envio": envio,
+        "items": items,
+        "neto": neto,
+        "iva": iva,
+        "total": neto + iva,
+    }
+
+
+def _escribir_pdf(ruta, oc):
+    paginas = [oc["items"][i:i + ITEMS_POR_PAGINA] for i in range(0, len(oc["items"]), ITEMS_POR_PAGINA)]
+    with PdfPages(ruta, metadata={"CreationDate": None, "Creator": None, "Producer": None}) as pdf:
+        for numero, items in enumerate(paginas):
+            fig = plt.figure(figsize=TAMANO_A4)
+            y = 0.95
+            if numero == 0:
+                lineas = [
+                    (f"ORDEN DE COMPRA N°: {oc['orden']}", 12),
+                    (f"Estado : {oc['estado']}", 9),
+                    (f"ID Licitación : {oc['licitacion']}", 9),
+                    ("Demandante : HOSPITAL REGIONAL DE EJEMPLO", 9),
+                    (f"SEÑOR (ES) : {oc['proveedor']}", 9),
+                    (f"RUT : {oc['rut']}", 9),
+                    ("Dirección : AVENIDA LOS CARRERA 1450", 9),
+                    (f"NOMBRE ORDEN DE COMPRA : {oc['nombre']}", 9),
+                    ("FECHA ENTREGA PRODUCTOS : 30 días", 9),
+                    (f"Fecha Envio OC. : {oc['envio'].strftime('%d-%m-%Y %H:%M:%S')}", 9),
+                ]
+                for texto, tamano in lineas:
+                    fig.text(0.08, y, texto, fontsize=tamano)
+                    y -= 0.022
+                y -= 0.01
+            fig.text(0.08, y, "Código", fontsize=8)
+            fig.text(0.2, y, "Producto", fontsize=8)
+            fig.text(0.62, y, "Cantidad", fontsize=8)
+            fig.text(0.74, y, "Precio", fontsize=8)
+            fig.text(0.86, y, "Subtotal", fontsize=8)
+            y -= 0.02
+            for codigo, (producto, cantidad, precio) in enumerate(items, start=numero * ITEMS_POR_PAGINA + 1):
+                fig.text(0.08, y, f"{codigo:04d}", fontsize=8)
+                fig.text(0.2, y, producto, fontsize=8)
+                fig.text(0.62, y, str(cantidad), fontsize=8)
+                fig.text(0.74, y, _moneda(precio), fontsize=8)
+                fig.text(0.86, y, _moneda(cantidad * precio), fontsize=8)
+                y -= 0.022
+            if numero == len(paginas) - 1:
+                y -= 0.02
+                for rotulo, valor in (("Neto", oc["neto"]), ("19% IVA", oc["iva"]), ("Total", oc["total"])):
+                    fig.text(0.62, y, f"{rotulo} $ {_moneda(valor)}", fontsize=9)
+                    y -= 0.022
+            fig.text(0.08, 0.03, f"Página {numero + 1} de {len(paginas)}", fontsize=7)
+            pdf.savefig(fig)
+            plt.close(fig)
+    return len(paginas)
+
+
+def _campos_esperados(oc):
+    """
+    Campos que devuelve extract_fields_from_pdf con una lectura correcta del texto. Como en
+    las OC reales, cada rótulo va seguido del siguiente en una línea propia, por lo que
+    Proveedor termina en "RUT" y Nombre Orden en "FECHA ENTREGA PRODUCTOS".
+    """
+    return {
+        "Número Licitación": oc["licitacion"],
+        "Orden de Compra": oc["orden"],
+        "Estado": oc["estado"],
+        "Proveedor": f"{oc['proveedor']} RUT",
+        "RUT Proveedor": oc["rut"],
+        "Nombre Orden": f"{oc['nombre']} FECHA ENTREGA PRODUCTOS",
+        "Fecha Envío OC": oc["envio"].strftime("%d/%m/%Y"),
+        "Total": float(oc["total"]),
+    }
+
+
+def main():
+    rng = random.Random(SEMILLA)
+    esperado = {}
+    for numero in range(CANTIDAD):
+        oc = _orden(numero, rng)
+        nombre = f"oc_{numero + 1:02d}.pdf"
+        paginas = _escribir_pdf(os.path.join(CARPETA, nombre), oc)
+        esperado[nombre] = _campos_esperados(oc)
+        print(f"{nombre}: {paginas} página(s), {len(oc['items'])} ítem(s)")
+    with open(os.path.join(CARPETA, "esperado.json"), "w", encoding="utf-8") as f:
+        json.dump(esperado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,40 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 import os
+import time
 import hashlib
-from utils.pdf_extraction import extract_data_from_pdf
+from utils.pdf_extraction import format_rut
+from utils.batch_extraction import (
+    iter_extract_batch, format_result_name, load_processed_orders, load_order_states, is_status_update,
+    upsert_orders, export_orders_to_excel, MAX_EXTRACTION_WORKERS
+)
+from utils.order_store import get_store_file, add_cambios_estado, load_cambios_estado
+from utils.extraction_cache import get_extraction_cache_dir
+from utils.text_store import get_text_store_dir
+from utils.text_backends import TEXT_BACKENDS, DEFAULT_TEXT_BACKEND
+from utils.layout_templates import OC_LAYOUT_TEMPLATES
+from utils.zip_ingestion import is_zip_upload, list_zip_pdfs, iter_zip_pdfs
+from utils.isolated_extraction import EXTRACTION_TIMEOUT_SECONDS, EXTRACTION_MEMORY_LIMIT_MB
+from utils.manual_entry import (
+    get_manual_queue_file, load_manual_queue, add_to_manual_queue, remove_from_manual_queue
+)
+from utils.checkpoint_journal import (
+    get_checkpoint_file, batch_id, load_checkpoint, CheckpointJournal, clear_checkpoint
+)
 
 # Importar funciones de gestión de usuarios
 from user_management import get_user_data_path
 
+# Clave de session_state con los resultados ya extraídos (permite reanudar un lote tras una recarga)
+EXTRACTION_STATE_KEY = "extraccion_pdf"
+
+# Clave de session_state con los hashes quitados a mano de la cola de ingreso manual
+# (los resultados de la sesión no deben volver a encolarlos en la misma recarga)
+MANUAL_DISMISSED_KEY = "cola_manual_quitados"
+
+# Intervalo mínimo (segundos) entre actualizaciones de la tabla durante la extracción
+STREAM_REFRESH_SECONDS = 0.5
+
 
 def generate_file_hash(file):
     """
@@ -19,14 +47,34 @@ def generate_file_hash(file):
     return hashlib.md5(content).hexdigest()
 
 
-def format_rut(rut):
+def iterar_documentos_pendientes(unique_files, resultados_previos, origenes, duplicados):
     """
-    Formatea un RUT en el formato XX.XXX.XXX-X (si no lo está).
+    Recorre en orden de subida los PDFs sueltos y los PDFs dentro de los ZIP (descomprimidos
+    de uno en uno, sin escribir en disco) y entrega solo los que aún no tienen resultado.
+    :param unique_files: Diccionario hash -> archivo subido (PDF o ZIP).
+    :param resultados_previos: Resultados ya obtenidos, por hash de contenido.
+    :param origenes: Diccionario que se completa con hash del PDF -> hash del archivo subido.
+    :param duplicados: Lista que se completa con los nombres de los PDFs repetidos.
+    :return: Generador de tuplas (nombre, contenido, hash).
     """
-    if rut and len(rut) > 1:
-        rut = rut.replace(".", "").replace("-", "")
-        return f"{rut[:-8]}.{rut[-8:-5]}.{rut[-5:-2]}-{rut[-1]}"
-    return rut
+    for origen, uploaded_file in unique_files.items():
+        if is_zip_upload(uploaded_file.name):
+            uploaded_file.seek(0)
+            miembros = iter_zip_pdfs(uploaded_file)
+        else:
+            uploaded_file.seek(0)
+            miembros = [(uploaded_file.name, uploaded_file.read(), origen)]
+            uploaded_file.seek(0)
+
+        for nombre, contenido, file_hash in miembros:
+            if is_zip_upload(uploaded_file.name):
+                nombre = f"{uploaded_file.name}/{nombre}"
+            if file_hash in origenes:
+                duplicados.append(nombre)
+                continue
+            origenes[file_hash] = origen
+            if file_hash not in resultados_previos:
+                yield nombre, contenido, file_hash
 
 
 def pagina_1():
@@ -51,105 +99,386 @@ def pagina_1():
     extraer los datos relevantes y guardarlos en tu perfil de usuario.
     """)
 
-    # Ruta del archivo de órdenes específica para este usuario
-    user_orders_file = os.path.join(user_data_path, "ordenes_de_compra.xlsx")
+    # Base de datos del usuario: registro de las órdenes guardadas en su perfil
+    store_file = get_store_file(user_data_path)
     
+    # Cola de PDFs escaneados (sin texto) que deben ingresarse a mano
+    manual_queue_file = get_manual_queue_file(user_data_path)
+    cola_manual = load_manual_queue(manual_queue_file)
+    if cola_manual:
+        with st.expander(f"📋 PDFs pendientes de ingreso manual ({len(cola_manual)})"):
+            st.dataframe(pd.DataFrame({
+                "Archivo": [entrada["nombre"] for entrada in cola_manual],
+                "Páginas": [entrada["paginas"] for entrada in cola_manual],
+                "Fecha": [entrada["fecha"] for entrada in cola_manual],
+            }))
+            nombres_cola = {entrada["hash"]: entrada["nombre"] for entrada in cola_manual}
+            ingresados = st.multiselect(
+                "Marcar como ingresados",
+                options=list(nombres_cola.keys()),
+                format_func=lambda file_hash: nombres_cola[file_hash]
+            )
+            if st.button("Quitar de la cola") and ingresados:
+                remove_from_manual_queue(manual_queue_file, ingresados)
+                st.session_state.setdefault(MANUAL_DISMISSED_KEY, set()).update(ingresados)
+                st.success(f"{len(ingresados)} PDF(s) quitados de la cola de ingreso manual.")
+
+    # Historial de cambios de estado de las órdenes guardadas
+    historial_estados = load_cambios_estado(store_file)
+    if historial_estados:
+        with st.expander(f"🔄 Historial de estados de órdenes ({len(historial_estados)})"):
+            st.dataframe(pd.DataFrame(historial_estados))
+
+    # El Excel con las órdenes guardadas se genera solo cuando se pide
+    if st.button("📤 Exportar mis órdenes guardadas a Excel"):
+        towrite = BytesIO()
+        exportadas = export_orders_to_excel(store_file, towrite)
+        if exportadas:
+            st.download_button(
+                label=f"📥 Descargar ordenes_de_compra.xlsx ({exportadas} órdenes)",
+                data=towrite.getvalue(),
+                file_name="ordenes_de_compra.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            st.info("Todavía no hay órdenes guardadas en tu perfil.")
+
     # Subida de archivos PDF
     uploaded_files = st.file_uploader(
-        "Sube uno o más archivos PDF",
-        type=["pdf"],
+        "Sube uno o más archivos PDF (o archivos ZIP con PDFs)",
+        type=["pdf", "zip"],
         accept_multiple_files=True
     )
 
     if uploaded_files:
         # Verificar archivos duplicados
         unique_files = {}
+        total_archivos = 0
         st.write("Archivos subidos:")
 
         for uploaded_file in uploaded_files:
             file_hash = generate_file_hash(uploaded_file)
-            if file_hash not in unique_files:
-                unique_files[file_hash] = uploaded_file
-                st.write(f"- {uploaded_file.name}")
-            else:
+            if file_hash in unique_files:
                 st.warning(f"El archivo '{uploaded_file.name}' ya fue subido y será ignorado.")
+                continue
 
-        unique_files_list = list(unique_files.values())
+            if is_zip_upload(uploaded_file.name):
+                # Solo se lee el índice del ZIP; los PDFs se descomprimen durante la extracción
+                miembros = list_zip_pdfs(uploaded_file)
+                uploaded_file.seek(0)
+                if miembros is None:
+                    st.warning(f"El archivo '{uploaded_file.name}' no es un ZIP válido y será ignorado.")
+                    continue
+                st.write(f"- {uploaded_file.name} ({len(miembros)} PDF(s))")
+                total_archivos += len(miembros)
+            else:
+                st.write(f"- {uploaded_file.name}")
+                total_archivos += 1
+            unique_files[file_hash] = uploaded_file
 
-        # Inicializar conjunto para rastrear órdenes de compra procesadas
-        processed_orders = set()
-        
         # Cargar órdenes existentes para evitar duplicados
-        if os.path.exists(user_orders_file):
-            try:
-                existing_orders = pd.read_excel(user_orders_file)
-                if "Orden de Compra" in existing_orders.columns:
-                    # Añadir al conjunto de órdenes procesadas
-                    for order in existing_orders["Orden de Compra"]:
-                        if order and not pd.isna(order):
-                            processed_orders.add(f"{current_user}_{order}")
-                    st.info(f"Se encontraron {len(processed_orders)} órdenes de compra existentes.")
-            except Exception as e:
-                st.warning(f"Error al cargar órdenes existentes: {e}")
-
-        # Extraer datos de los PDFs
-        extracted_data = []
-        for uploaded_file in unique_files_list:
+        processed_orders = load_processed_orders(store_file, current_user)
+        if processed_orders:
+            st.info(f"Se encontraron {len(processed_orders)} órdenes de compra existentes.")
+
+        # Opciones de extracción
+        with st.expander("Opciones de extracción"):
+            col1, col2 = st.columns(2)
+            with col1:
+                modo_paralelo = st.checkbox("Procesar en paralelo", value=MAX_EXTRACTION_WORKERS > 1)
+            with col2:
+                num_procesos = st.number_input(
+                    "Número de procesos",
+                    min_value=1,
+                    max_value=max(1, os.cpu_count() or 1),
+                    value=max(1, min(MAX_EXTRACTION_WORKERS, os.cpu_count() or 1)),
+                    disabled=not modo_paralelo
+                )
+            usar_cache = st.checkbox(
+                "Reutilizar resultados de PDFs ya procesados (caché)",
+                value=True
+            )
+            backend_texto = st.selectbox(
+                "Motor de lectura de texto",
+                options=list(TEXT_BACKENDS.keys()),
+                index=list(TEXT_BACKENDS.keys()).index(DEFAULT_TEXT_BACKEND),
+                help="pypdfium2 es más rápido; si no encuentra los campos obligatorios se reintenta con pdfplumber."
+            )
+            lectura_incremental = st.checkbox(
+                "Lectura incremental (detenerse al encontrar todos los campos)",
+                value=True
+            )
+            total_desde_final = st.checkbox(
+                "Buscar el Total desde la última página",
+                value=False,
+                disabled=not lectura_incremental
+            )
+            # Las plantillas de posiciones están desactivadas mientras no se verifiquen con OC reales
+            usar_plantilla = bool(OC_LAYOUT_TEMPLATES) and st.checkbox(
+                "Leer solo las zonas conocidas de la OC (plantilla de posiciones)",
+                value=False,
+                help="Mucho más rápido para las OC con el formato estándar de Mercado Público; "
+                     "los PDFs con otro formato se leen completos."
+            )
+            separar_ordenes = st.checkbox(
+                "Separar PDFs con varias órdenes de compra",
+                value=False,
+                help="Detecta cada orden dentro de un PDF combinado y la registra por separado. "
+                     "Requiere leer todas las páginas de cada PDF."
+            )
+            aislar_documentos = st.checkbox(
+                f"Aislar cada PDF (máximo {EXTRACTION_TIMEOUT_SECONDS:.0f} s y {EXTRACTION_MEMORY_LIMIT_MB} MB por archivo)",
+                value=True,
+                help="Un PDF dañado o demasiado grande se reporta como fallido sin detener el resto del lote."
+            )
+
+        # Los resultados ya obtenidos se guardan en session_state por hash de contenido;
+        # si cambian las opciones que afectan el resultado se vuelve a empezar
+        opciones = (
+            backend_texto, bool(lectura_incremental), bool(total_desde_final), bool(usar_plantilla),
+            bool(separar_ordenes)
+        )
+        # La bitácora en disco permite retomar el mismo lote en otra sesión
+        # (recarga del navegador, caída del servidor)
+        checkpoint_file = get_checkpoint_file(user_data_path)
+        lote = batch_id(unique_files.keys())
+        estado_extraccion = st.session_state.get(EXTRACTION_STATE_KEY)
+        if (not estado_extraccion or estado_extraccion["usuario"] != current_user
+                or estado_extraccion["opciones"] != opciones):
+            resultados_bitacora, origenes_bitacora = load_checkpoint(checkpoint_file, lote, opciones)
+            if resultados_bitacora:
+                st.info(f"Se retomó un lote interrumpido: {len(resultados_bitacora)} archivo(s) ya procesados.")
+            estado_extraccion = {
+                "usuario": current_user, "opciones": opciones,
+                "resultados": resultados_bitacora, "origenes": origenes_bitacora
+            }
+        # Descartar resultados de archivos que ya no están en la subida
+        origenes_previos = estado_extraccion.get("origenes", {})
+        resultados_previos = {
+            file_hash: resultado
+            for file_hash, resultado in estado_extraccion["resultados"].items()
+            if origenes_previos.get(file_hash) in unique_files
+        }
+        estado_extraccion["resultados"] = resultados_previos
+        st.session_state[EXTRACTION_STATE_KEY] = estado_extraccion
+
+        # Las órdenes de los resultados reanudados cuentan como procesadas
+        # (cada PDF guarda una lista de resultados: uno por orden de compra)
+        for resultados_pdf in resultados_previos.values():
+            for resultado in resultados_pdf:
+                if resultado["estado"] == "ok":
+                    processed_orders.add(f"{current_user}_{resultado['datos'].get('Orden de Compra')}")
+
+        # Extraer solo los PDFs que aún no tienen resultado (en el orden de subida)
+        origenes = {}
+        duplicados = []
+        # Hash del PDF -> hash del archivo subido que lo contiene, para los resultados guardados
+        estado_extraccion["origenes"] = {file_hash: origenes_previos[file_hash] for file_hash in resultados_previos}
+        documentos = iterar_documentos_pendientes(unique_files, resultados_previos, origenes, duplicados)
+
+        if total_archivos:
+            barra_progreso = st.progress(
+                len(resultados_previos) / total_archivos,
+                text=f"Procesados {len(resultados_previos)} de {total_archivos} archivo(s)..."
+            )
+            vista_previa = st.empty()
+            inicio = time.perf_counter()
+            ultima_actualizacion = 0.0
+            procesados = 0
+            # Órdenes ya entregadas de un PDF con varias, hasta recibir la última
+            parciales = {}
+            bitacora = CheckpointJournal(checkpoint_file, lote, opciones)
+
             # Pasar el ID del usuario para evitar duplicados entre usuarios diferentes
-            pdf_data = extract_data_from_pdf(uploaded_file, processed_orders, current_user)
-            if pdf_data:
-                # Formatear RUT
-                if "RUT Proveedor" in pdf_data:
-                    pdf_data["RUT Proveedor"] = format_rut(pdf_data["RUT Proveedor"])
-                extracted_data.append(pdf_data)
-
-        # Si se extrajeron datos, mostrarlos y permitir la descarga
-        if extracted_data:
-            df = pd.DataFrame(extracted_data)
-
-            st.subheader("Datos Extraídos")
-            st.dataframe(df)
-
-            # Generar archivo Excel para descarga
-            towrite = BytesIO()
-            df.to_excel(towrite, index=False, engine='openpyxl')
-            towrite.seek(0)
+            try:
+                for resultado in iter_extract_batch(
+                    documentos,
+                    processed_orders,
+                    current_user,
+                    max_workers=int(num_procesos) if modo_paralelo else 1,
+                    cache_dir=get_extraction_cache_dir(user_data_path) if usar_cache else None,
+                    incremental=lectura_incremental,
+                    total_from_end=lectura_incremental and total_desde_final,
+                    backend=backend_texto,
+                    text_store_dir=get_text_store_dir(user_data_path),
+                    isolated=aislar_documentos,
+                    layout=usar_plantilla,
+                    split_orders=separar_ordenes
+                ):
+                    # Formatear RUT
+                    for pdf_data in (resultado["datos"], resultado["datos_duplicado"]):
+                        if pdf_data and "RUT Proveedor" in pdf_data:
+                            pdf_data["RUT Proveedor"] = format_rut(pdf_data["RUT Proveedor"])
+                    segmento = resultado["segmento"]
+                    parciales.setdefault(resultado["hash"], []).append(resultado)
+                    if segmento and segmento["numero"] < segmento["total"]:
+                        continue
+                    resultados_previos[resultado["hash"]] = parciales.pop(resultado["hash"])
+                    estado_extraccion["origenes"][resultado["hash"]] = origenes[resultado["hash"]]
+                    bitacora.add(resultado["hash"], origenes[resultado["hash"]], resultados_previos[resultado["hash"]])
+                    procesados += 1
+
+                    completados = len(resultados_previos)
+                    segundos = time.perf_counter() - inicio
+                    velocidad = procesados / segundos if segundos else 0.0
+                    barra_progreso.progress(
+                        min(1.0, completados / total_archivos),
+                        text=f"Procesados {completados} de {total_archivos} archivo(s) · {velocidad:.1f} docs/s"
+                    )
+
+                    # Limitar la frecuencia de refresco de la tabla en lotes grandes
+                    if segundos - ultima_actualizacion >= STREAM_REFRESH_SECONDS:
+                        ultima_actualizacion = segundos
+                        filas = [r["datos"] for lista in resultados_previos.values() for r in lista if r["datos"]]
+                        if filas:
+                            vista_previa.dataframe(pd.DataFrame(filas))
+            finally:
+                # También al interrumpirse el lote (p. ej. una recarga): lo ya procesado queda en la bitácora
+                bitacora.flush()
+
+            barra_progreso.empty()
+            vista_previa.empty()
+            if procesados:
+                st.caption(f"{procesados} archivo(s) procesados en {segundos:.1f} s ({velocidad:.1f} docs/s).")
+
+        for nombre in duplicados:
+            st.warning(f"El archivo '{nombre}' ya fue subido y será ignorado.")
+
+        resultados = [
+            resultado
+            for file_hash in origenes if file_hash in resultados_previos
+            for resultado in resultados_previos[file_hash]
+        ]
+
+        segmentados = [resultado for resultado in resultados if resultado["segmento"]]
+        if segmentados:
+            st.caption(
+                f"{sum(1 for resultado in segmentados if resultado['segmento']['numero'] == 1)} PDF(s) "
+                f"con varias órdenes de compra separados en {len(segmentados)} órdenes."
+            )
+
+        desde_cache = sum(1 for resultado in resultados if resultado["desde_cache"])
+        if desde_cache:
+            st.caption(f"{desde_cache} de {len(resultados)} archivo(s) recuperados de la caché de extracción.")
+
+        con_plantilla = sum(1 for resultado in resultados if resultado.get("plantilla"))
+        if usar_plantilla:
+            st.caption(f"{con_plantilla} de {len(resultados)} archivo(s) leídos con la plantilla de posiciones.")
+
+        paginas_totales = sum(resultado["paginas_totales"] for resultado in resultados)
+        if paginas_totales:
+            paginas_leidas = sum(resultado["paginas_leidas"] for resultado in resultados)
+            st.caption(
+                f"Páginas leídas: {paginas_leidas} de {paginas_totales} "
+                f"({100 * (1 - paginas_leidas / paginas_totales):.0f}% de ahorro)."
+            )
+
+        # Documentos que el backend rápido no pudo leer (p. ej. por el límite de memoria) y se leyeron con pdfplumber
+        con_error_backend = [resultado for resultado in resultados if resultado.get("error_backend")]
+        if con_error_backend:
+            st.warning(
+                f"{len(con_error_backend)} archivo(s) se leyeron con pdfplumber porque falló el backend rápido "
+                f"(por ejemplo: {con_error_backend[0]['error_backend']})."
+            )
+
+        # Memoria adicional por documento (solo en procesos de trabajo): permite detectar PDFs
+        # que requieren más memoria de la esperada
+        medidos = [r for r in resultados if r.get("rss_pico_mb") is not None]
+        if medidos:
+            mayor = max(medidos, key=lambda r: r["rss_pico_mb"])
+            st.caption(
+                f"Memoria adicional máxima por documento: {mayor['rss_pico_mb']:.0f} MB ({format_result_name(mayor)})."
+            )
+
+        # Tabla de archivos fallidos con el motivo (el resto del lote se procesa igual)
+        fallidos = [resultado for resultado in resultados if resultado["estado"] == "error"]
+        if fallidos:
+            st.subheader("Archivos con error")
+            st.dataframe(pd.DataFrame({
+                "Archivo": [format_result_name(resultado) for resultado in fallidos],
+                "Motivo": [resultado.get("motivo") or "No se pudo leer el PDF" for resultado in fallidos],
+            }))
+
+        # PDFs escaneados: se descartan sin analizar sus páginas y quedan en la cola de ingreso manual
+        manuales = [resultado for resultado in resultados if resultado["estado"] == "manual"]
+        if manuales:
+            quitados = st.session_state.get(MANUAL_DISMISSED_KEY, set())
+            nuevos_manuales = add_to_manual_queue(
+                manual_queue_file,
+                [resultado for resultado in manuales if resultado["hash"] not in quitados]
+            )
+            st.subheader("Requieren ingreso manual")
+            st.dataframe(pd.DataFrame({
+                "Archivo": [resultado["nombre"] for resultado in manuales],
+                "Páginas": [resultado["paginas_totales"] for resultado in manuales],
+            }))
+            if nuevos_manuales:
+                st.info(f"{nuevos_manuales} PDF(s) sin texto agregados a la cola de ingreso manual.")
+
+        extracted_data = [resultado["datos"] for resultado in resultados if resultado["datos"]]
+
+        # Órdenes ya guardadas cuyo PDF trae un estado más avanzado (p. ej. Aceptada -> Recepcion Conforme)
+        estados_guardados = load_order_states(store_file)
+        cambios_estado = []
+        for resultado in resultados:
+            datos_duplicado = resultado.get("datos_duplicado")
+            if not datos_duplicado:
+                continue
+            orden = str(datos_duplicado.get("Orden de Compra") or "").strip()
+            if orden in estados_guardados and is_status_update(estados_guardados[orden], datos_duplicado.get("Estado")):
+                cambios_estado.append(datos_duplicado)
+
+        # Si se extrajeron datos o cambió el estado de alguna orden, mostrarlos y permitir guardarlos
+        if extracted_data or cambios_estado:
+            if extracted_data:
+                df = pd.DataFrame(extracted_data)
+
+                st.subheader("Datos Extraídos")
+                st.dataframe(df)
+
+            if cambios_estado:
+                st.subheader("Órdenes con Cambio de Estado")
+                st.dataframe(pd.DataFrame({
+                    "Orden de Compra": [datos.get("Orden de Compra") for datos in cambios_estado],
+                    "Estado Guardado": [
+                        estados_guardados[str(datos.get("Orden de Compra")).strip()] for datos in cambios_estado
+                    ],
+                    "Estado Nuevo": [datos.get("Estado") for datos in cambios_estado],
+                }))
             
             # Opción para descargar
             col1, col2 = st.columns(2)
             
             with col1:
-                st.download_button(
-                    label="📥 Descargar Excel con Datos Extraídos",
-                    data=towrite,
-                    file_name="ordenes_de_compra.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                if extracted_data:
+                    # Generar archivo Excel para descarga
+                    towrite = BytesIO()
+                    df.to_excel(towrite, index=False, engine='openpyxl')
+                    towrite.seek(0)
+                    st.download_button(
+                        label="📥 Descargar Excel con Datos Extraídos",
+                        data=towrite,
+                        file_name="ordenes_de_compra.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
             
             # Opción para guardar en la carpeta del usuario
             with col2:
                 if st.button("💾 Guardar en Mi Perfil", type="primary"):
                     try:
-                        # Crear directorio de usuario si no existe
-                        os.makedirs(user_data_path, exist_ok=True)
-                        
-                        # Verificar si existe un archivo previo para concatenar
-                        if os.path.exists(user_orders_file):
-                            # Cargar archivo existente
-                            existing_df = pd.read_excel(user_orders_file)
-                            
-                            # Concatenar con los nuevos datos
-                            combined_df = pd.concat([existing_df, df], ignore_index=True)
-                            
-                            # Guardar archivo combinado
-                            combined_df.to_excel(user_orders_file, index=False, engine='openpyxl')
-                            st.success(f"✅ Datos añadidos a tu archivo existente: {user_orders_file}")
-                        else:
-                            # Guardar nuevo archivo
-                            df.to_excel(user_orders_file, index=False, engine='openpyxl')
-                            st.success(f"✅ Datos guardados en tu perfil: {user_orders_file}")
+                        # Agregar las órdenes nuevas y actualizar solo las que cambiaron
+                        resumen = upsert_orders(extracted_data + cambios_estado, store_file)
+                        add_cambios_estado(store_file, resumen["cambios_estado"], current_user)
+                        st.success(
+                            f"✅ Perfil actualizado: {resumen['nuevas']} orden(es) nueva(s), "
+                            f"{resumen['actualizadas']} actualizada(s)."
+                        )
+
+                        # Las órdenes guardadas ya no son nuevas: la próxima recarga las valida de nuevo
+                        st.session_state.pop(EXTRACTION_STATE_KEY, None)
+                        clear_checkpoint(checkpoint_file)
                             
                     except Exception as e:
-                        st.error(f"❌ Error al guardar el archivo: {e}")
+                        st.error(f"❌ Error al guardar las órdenes en tu perfil: {e}")
         else:
             st.error("No se pudieron extraer datos de los PDFs o todas las órdenes de compra estaban duplicadas.")
\ No newline at end of file
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import hashlib
 from datetime import datetime
 from utils.file_operations import (
     normalizar_dataframe,
@@ -10,6 +11,10 @@ from utils.file_operations import (
     crear_archivo_descargable,
     consolidar_hojas_excel
 )
+from utils.order_store import save_control, load_controles
+from utils.dataset_cache import invalidate_cache
+from utils.workbook_mirror import write_mirror, get_sheet_fingerprints, replace_sheets
+from utils.xlsx_package import list_sheets
 
 # Importar funciones de gestión de usuarios
 from user_management import get_user_data_path
@@ -18,6 +23,11 @@ from user_management import get_user_data_path
 PERSISTENT_EXPENSES_FILE = "data/control_de_gasto_de_licitaciones.xlsx"
 PERSISTENT_ORDERS_FILE = "data/control_de_ordenes_de_compra.xlsx"
 CONTROL_SUMMARY_FILE = "data/resumen_control_licitaciones.json"
+STORE_FILE = "data/sistema_oc.db"
+
+# Versión del cálculo del control; forma parte de la huella de cada licitación, de modo que
+# al cambiarla se recalculan todas (ver huellas_de_licitaciones)
+CONTROL_VERSION = 2
 
 # Función para convertir objetos no serializables a formato JSON
 def json_serial(obj):
@@ -60,143 +70,286 @@ def control_avanzado_de_gastos(licitaciones_df, ordenes_df):
         st.write("Columnas disponibles:", list(ordenes_df.columns))
         return {}
     
-    # Diccionario para almacenar los DataFrames de control
-    controles = {}
+    # Las licitaciones y sus órdenes se relacionan por el número de licitación como texto
+    # (el mismo que identifica cada control); si una licitación se repite, vale su última
+    # fila, en la posición de la primera
+    claves = _como_texto(licitaciones_df["numero_licitacion"])
+    licitaciones = licitaciones_df.assign(clave=claves).drop_duplicates("clave", keep="last")
+    licitaciones = licitaciones.set_index("clave").reindex(claves.unique())
+    ordenes = _ordenes_para_control(ordenes_df)
     
-    # Procesar cada licitación
-    for _, licitacion in licitaciones_df.iterrows():
-        numero_licitacion = licitacion["numero_licitacion"]
-        
-        # Convertir valores de pandas a Python nativos para evitar problemas de serialización
-        fecha_inicio = licitacion.get("fecha_inicio")
-        if isinstance(fecha_inicio, (pd.Timestamp, datetime)):
-            fecha_inicio = fecha_inicio.strftime('%Y-%m-%d')
-            
-        fecha_final = licitacion.get("fecha_final")
-        if isinstance(fecha_final, (pd.Timestamp, datetime)):
-            fecha_final = fecha_final.strftime('%Y-%m-%d')
-            
-        presupuesto_total = float(licitacion.get("presupuesto_total", 0))
-        
-        # Crear estructura base de control
-        control = {
-            "resumen": {
-                "numero_licitacion": str(numero_licitacion),
-                "nombre": str(licitacion.get("nombre_licitaciones", "Sin nombre")),
-                "fecha_inicio": fecha_inicio,
-                "fecha_final": fecha_final,
-                "presupuesto_total": presupuesto_total,
-                "presupuesto_ejecutado": 0,
-                "presupuesto_comprometido": 0,  # Órdenes enviadas pero sin certificado
-                "presupuesto_certificado": 0,   # Órdenes con certificado
-                "presupuesto_disponible": presupuesto_total,
-                "porcentaje_ejecucion": 0,
-                "porcentaje_certificacion": 0,  # Nuevo indicador
-                "estado": "Activa"
-            },
-            "historial": []
+    # Órdenes aceptadas, por fecha de envío (las de igual fecha quedan en el orden del archivo)
+    aceptadas = ordenes[
+        ordenes["estado"].str.contains("aceptada|conforme|recepcion", case=False, na=False) & ordenes["monto_valido"]
+    ]
+    if "fecha_envio_oc" in aceptadas.columns:
+        try:
+            aceptadas = aceptadas.sort_values("fecha_envio_oc", kind="stable")
+        except TypeError as e:
+            st.warning(f"No se pudieron ordenar las órdenes por fecha de envío ({e}); se usará el orden del archivo.")
+    
+    # Presupuesto de cada licitación
+    if "presupuesto_total" in licitaciones.columns:
+        presupuestos = licitaciones["presupuesto_total"].astype(float)
+    else:
+        presupuestos = pd.Series(0.0, index=licitaciones.index)
+    aceptadas = aceptadas.merge(
+        presupuestos.rename("presupuesto_total"), left_on="clave", right_index=True
+    ).reset_index(drop=True)
+    
+    # Resumen: montos comprometidos (sin certificado) y certificados por licitación
+    certificada = aceptadas["certificado"] == "SÍ"
+    montos = aceptadas.assign(
+        comprometido=aceptadas["monto"].where(~certificada, 0.0),
+        certificado=aceptadas["monto"].where(certificada, 0.0),
+    ).groupby("clave", sort=False).agg(
+        presupuesto_comprometido=("comprometido", "sum"),
+        presupuesto_certificado=("certificado", "sum"),
+    ).reindex(licitaciones.index, fill_value=0.0)
+    
+    resumenes = pd.DataFrame({
+        "numero_licitacion": licitaciones.index,
+        "nombre": (
+            _como_texto(licitaciones["nombre_licitaciones"], "Sin nombre")
+            if "nombre_licitaciones" in licitaciones.columns else "Sin nombre"
+        ),
+        "fecha_inicio": _fechas_como_texto(licitaciones, "fecha_inicio"),
+        "fecha_final": _fechas_como_texto(licitaciones, "fecha_final"),
+        "presupuesto_total": presupuestos,
+        "presupuesto_ejecutado": montos["presupuesto_comprometido"] + montos["presupuesto_certificado"],
+        "presupuesto_comprometido": montos["presupuesto_comprometido"],  # Órdenes enviadas pero sin certificado
+        "presupuesto_certificado": montos["presupuesto_certificado"],    # Órdenes con certificado
+    }, index=licitaciones.index)
+    resumenes["presupuesto_disponible"] = resumenes["presupuesto_total"] - resumenes["presupuesto_ejecutado"]
+    
+    # Porcentajes con manejo de divisiones por cero
+    con_presupuesto = resumenes["presupuesto_total"] > 0
+    ejecutado = resumenes["presupuesto_ejecutado"]
+    resumenes["porcentaje_ejecucion"] = (ejecutado / resumenes["presupuesto_total"] * 100).where(con_presupuesto, 0.0)
+    resumenes["porcentaje_certificacion"] = (  # Nuevo indicador
+        resumenes["presupuesto_certificado"] / ejecutado * 100
+    ).where(con_presupuesto & (ejecutado > 0), 0.0)
+    
+    # Estado: solo cambia en las licitaciones con órdenes
+    con_ordenes = resumenes.index.isin(ordenes["clave"].unique())
+    vencidas = _licitaciones_vencidas(resumenes["fecha_final"])
+    resumenes["estado"] = np.select(
+        [con_ordenes & (resumenes["presupuesto_disponible"] <= 0), con_ordenes & vencidas],
+        ["Completada", "Vencida"],
+        "Activa"
+    )
+    
+    # Historial: una fila por orden aceptada, con el saldo que deja cada una
+    acumulado = aceptadas.groupby("clave", sort=False)["monto"].cumsum()
+    saldo_disponible = aceptadas["presupuesto_total"] - acumulado
+    historial = pd.DataFrame({
+        "fecha": aceptadas["fecha"],
+        "orden_compra": aceptadas["orden_compra"],
+        "proveedor": aceptadas["proveedor"],
+        "descripcion": aceptadas["descripcion"],
+        "monto": aceptadas["monto"],
+        "saldo_anterior": saldo_disponible + aceptadas["monto"],
+        "saldo_disponible": saldo_disponible,
+        "certificado": aceptadas["certificado"],
+        "porcentaje_acumulado": (acumulado / aceptadas["presupuesto_total"] * 100).where(
+            aceptadas["presupuesto_total"] > 0, 0.0
+        ),
+    })
+    movimientos = _registros(historial)
+    historiales = {
+        clave: [movimientos[posicion] for posicion in posiciones]
+        for clave, posiciones in aceptadas.groupby("clave", sort=False).indices.items()
+    }
+    
+    # Los controles quedan en el orden del archivo de licitaciones
+    controles = {}
+    for resumen in _registros(resumenes):
+        controles[resumen["numero_licitacion"]] = {
+            "resumen": resumen,
+            "historial": historiales.get(resumen["numero_licitacion"], [])
         }
+    return controles
+
+def _ordenes_para_control(ordenes_df):
+    """
+    Prepara las órdenes para el control: número de licitación como texto (clave), estado y
+    certificado normalizados, monto numérico y las columnas que se muestran en el historial.
+    Las órdenes con un total no numérico quedan marcadas en monto_valido (se informa por licitación).
+    """
+    def columna(nombre, por_defecto):
+        if nombre in ordenes_df.columns:
+            return ordenes_df[nombre]
+        return pd.Series(por_defecto, index=ordenes_df.index, dtype=object)
+    
+    if "estado" not in ordenes_df.columns and len(ordenes_df):
+        st.warning("La columna 'estado' no existe en las órdenes. Se asumirá que todas están aceptadas.")
+    
+    if "total" in ordenes_df.columns:
+        monto = pd.to_numeric(ordenes_df["total"], errors="coerce")
+        invalidos = monto.isna() & ordenes_df["total"].notna()
+        monto = monto.fillna(0.0).astype(float)
+    else:
+        st.warning("La columna 'total' no existe en las órdenes. Los montos se considerarán 0.")
+        monto = pd.Series(0.0, index=ordenes_df.index)
+        invalidos = pd.Series(False, index=ordenes_df.index)
+    
+    ordenes = pd.DataFrame({
+        "clave": _como_texto(ordenes_df["numero_licitacion"]),
+        "estado": _como_texto(columna("estado", "recepcion conforme")).str.lower(),
+        "certificado": _como_texto(columna("certificado", "NO"), "NO").str.upper(),
+        "monto": monto,
+        "monto_valido": ~invalidos,
+        "fecha": _fechas_como_texto(ordenes_df, "fecha_envio_oc"),
+        "orden_compra": _como_texto(columna("orden_de_compra", "")),
+        "proveedor": _como_texto(columna("proveedor", "")),
+        "descripcion": _como_texto(columna("nombre_orden", "")),
+    }, index=ordenes_df.index)
+    if "fecha_envio_oc" in ordenes_df.columns:
+        ordenes["fecha_envio_oc"] = ordenes_df["fecha_envio_oc"]
+    
+    for clave, cantidad in ordenes.loc[invalidos, "clave"].value_counts(sort=False).items():
+        st.warning(f"Error al calcular montos para la licitación {clave}: {cantidad} orden(es) con un total no numérico; no se consideran.")
+    return ordenes
+
+def _como_texto(serie, vacio=""):
+    """
+    Columna como texto, con las celdas vacías reemplazadas por el valor indicado.
+    """
+    return serie.astype(str).where(serie.notna(), vacio)
+
+def _fechas_como_texto(df, nombre):
+    """
+    Columna de fechas para el control: las fechas quedan como AAAA-MM-DD y los vacíos como None;
+    los demás valores (p. ej. fechas escritas como texto) se conservan.
+    """
+    if nombre not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    fechas = df[nombre]
+    if pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = fechas.dt.strftime('%Y-%m-%d')
+    elif fechas.dtype == object:
+        # Columna con fechas y textos mezclados
+        fechas = fechas.map(lambda valor: valor.strftime('%Y-%m-%d') if isinstance(valor, (pd.Timestamp, datetime)) else valor)
+    return fechas.astype(object).where(fechas.notna(), None)
+
+def _registros(df):
+    """
+    Filas de un DataFrame como diccionarios con valores de Python (como to_dict("records"),
+    armadas a partir de las columnas como listas).
+    """
+    columnas = list(df.columns)
+    return [dict(zip(columnas, fila)) for fila in zip(*(df[col].tolist() for col in columnas))]
+
+def _licitaciones_vencidas(fechas_finales):
+    """
+    Indica, para cada fecha final, si ya pasó; las que no se pueden interpretar no vencen.
+    
+    Returns:
+        ndarray: Un valor booleano por fecha, en el mismo orden.
+    """
+    fechas = pd.Series(list(fechas_finales), dtype=object)
+    try:
+        return (pd.to_datetime(fechas, format="mixed", errors="coerce") < datetime.now()).to_numpy(dtype=bool)
+    except (TypeError, ValueError):
+        # Fechas con y sin zona horaria: se interpretan una a una
+        fechas_interpretadas = {}
+        return np.array([_licitacion_vencida(fecha, fechas_interpretadas) for fecha in fechas], dtype=bool)
+
+def _licitacion_vencida(fecha_final, fechas_finales):
+    """
+    Indica si la fecha final de una licitación ya pasó. fechas_finales guarda las fechas
+    ya interpretadas (muchas licitaciones comparten la misma).
+    """
+    try:
+        clave_fecha = (type(fecha_final), fecha_final)
+        if clave_fecha not in fechas_finales:
+            fechas_finales[clave_fecha] = pd.to_datetime(fecha_final, errors='coerce')
+        fecha_final_dt = fechas_finales[clave_fecha]
+        return bool(fecha_final_dt is not pd.NaT and fecha_final_dt < datetime.now())
+    except:
+        return False
+
+def huellas_de_licitaciones(licitaciones_df, ordenes_df):
+    """
+    Huella (hash del contenido) de los datos de los que depende el control de cada
+    licitación: sus filas del archivo de licitaciones, las filas de sus órdenes, las
+    columnas de ambos archivos y si su fecha final ya pasó. Mientras la huella no cambie,
+    el control calculado antes sigue siendo válido.
+    
+    Args:
+        licitaciones_df: DataFrame con información de licitaciones (columnas normalizadas)
+        ordenes_df: DataFrame con órdenes de compra (columnas normalizadas)
         
-        # Filtrar órdenes de esta licitación
-        ordenes_licitacion = ordenes_df[ordenes_df["numero_licitacion"] == numero_licitacion]
-        
-        if not ordenes_licitacion.empty:
-            # Ordenar por fecha si existe la columna fecha_envio_oc
-            if "fecha_envio_oc" in ordenes_licitacion.columns:
-                ordenes_licitacion = ordenes_licitacion.sort_values(by="fecha_envio_oc")
-            
-            # Asegurar que existe la columna estado
-            if "estado" not in ordenes_licitacion.columns:
-                st.warning(f"La columna 'estado' no existe en las órdenes. Se asumirá que todas están aceptadas.")
-                ordenes_licitacion["estado"] = "Recepcion Conforme"
-            
-            # Asegurar que existe la columna certificado
-            if "certificado" not in ordenes_licitacion.columns:
-                ordenes_licitacion["certificado"] = "NO"
-            
-            # Calcular montos por estado (con manejo seguro de valores)
-            try:
-                # Normalizar valores de estado
-                ordenes_licitacion["estado"] = ordenes_licitacion["estado"].astype(str).str.lower()
-                
-                # Normalizar valores de certificado
-                ordenes_licitacion["certificado"] = ordenes_licitacion["certificado"].astype(str).str.upper()
-                
-                # Filtrar órdenes aceptadas
-                ordenes_aceptadas = ordenes_licitacion[
-                    ordenes_licitacion["estado"].str.contains("aceptada|conforme|recepcion", case=False, na=False)
-                ]
-                
-                # Calcular montos
-                presupuesto_comprometido = float(ordenes_aceptadas[
-                    ordenes_aceptadas["certificado"] != "SÍ"
-                ]["total"].sum())
-                
-                presupuesto_certificado = float(ordenes_aceptadas[
-                    ordenes_aceptadas["certificado"] == "SÍ"
-                ]["total"].sum())
-                
-                # Actualizar resumen
-                control["resumen"]["presupuesto_comprometido"] = presupuesto_comprometido
-                control["resumen"]["presupuesto_certificado"] = presupuesto_certificado
-                control["resumen"]["presupuesto_ejecutado"] = presupuesto_comprometido + presupuesto_certificado
-                control["resumen"]["presupuesto_disponible"] = control["resumen"]["presupuesto_total"] - control["resumen"]["presupuesto_ejecutado"]
-                
-                # Calcular porcentajes con manejo de divisiones por cero
-                if control["resumen"]["presupuesto_total"] > 0:
-                    control["resumen"]["porcentaje_ejecucion"] = float((control["resumen"]["presupuesto_ejecutado"] / control["resumen"]["presupuesto_total"]) * 100)
-                    if control["resumen"]["presupuesto_ejecutado"] > 0:
-                        control["resumen"]["porcentaje_certificacion"] = float((presupuesto_certificado / control["resumen"]["presupuesto_ejecutado"]) * 100)
-            except Exception as e:
-                st.warning(f"Error al calcular montos para la licitación {numero_licitacion}: {e}")
-            
-            # Determinar estado
-            if control["resumen"]["presupuesto_disponible"] <= 0:
-                control["resumen"]["estado"] = "Completada"
-            else:
-                try:
-                    fecha_final_dt = pd.to_datetime(fecha_final, errors='coerce')
-                    if fecha_final_dt is not pd.NaT and fecha_final_dt < datetime.now():
-                        control["resumen"]["estado"] = "Vencida"
-                except:
-                    pass
-            
-            # Generar historial de movimientos
-            try:
-                saldo = control["resumen"]["presupuesto_total"]
-                for _, orden in ordenes_aceptadas.iterrows():
-                    # Convertir valores a tipos Python nativos
-                    fecha_orden = orden.get("fecha_envio_oc")
-                    if isinstance(fecha_orden, (pd.Timestamp, datetime)):
-                        fecha_orden = fecha_orden.strftime('%Y-%m-%d')
-                    
-                    monto = float(orden.get("total", 0))
-                    saldo_anterior = float(saldo)
-                    saldo -= monto
-                    
-                    # Calcular porcentaje acumulado
-                    porcentaje_acumulado = 0
-                    if control["resumen"]["presupuesto_total"] > 0:
-                        porcentaje_acumulado = float(((control["resumen"]["presupuesto_total"] - saldo) / control["resumen"]["presupuesto_total"]) * 100)
-                    
-                    # Agregar al historial
-                    control["historial"].append({
-                        "fecha": fecha_orden,
-                        "orden_compra": str(orden.get("orden_de_compra", "")),
-                        "proveedor": str(orden.get("proveedor", "")),
-                        "descripcion": str(orden.get("nombre_orden", "")),
-                        "monto": monto,
-                        "saldo_anterior": saldo_anterior,
-                        "saldo_disponible": float(saldo),
-                        "certificado": str(orden.get("certificado", "NO")),
-                        "porcentaje_acumulado": porcentaje_acumulado
-                    })
-            except Exception as e:
-                st.warning(f"Error al generar historial para la licitación {numero_licitacion}: {e}")
+    Returns:
+        dict: Número de licitación (texto) -> huella, en el orden del control
+    """
+    columnas = repr([CONTROL_VERSION] + [
+        [(str(col), str(tipo)) for col, tipo in df.dtypes.items()]
+        for df in (licitaciones_df, ordenes_df)
+    ]).encode("utf-8")
+    filas_licitaciones = pd.util.hash_pandas_object(licitaciones_df, index=False).to_numpy()
+    filas_ordenes = pd.util.hash_pandas_object(ordenes_df, index=False).to_numpy()
+    posiciones_por_licitacion = ordenes_df.groupby(_como_texto(ordenes_df["numero_licitacion"]), sort=False).indices
+    
+    vencidas = _licitaciones_vencidas(_fechas_como_texto(licitaciones_df, "fecha_final"))
+    
+    huellas = {}
+    for i, (numero_licitacion, vencida) in enumerate(zip(_como_texto(licitaciones_df["numero_licitacion"]), vencidas)):
+        huella = huellas.setdefault(numero_licitacion, hashlib.md5(columnas))
+        posiciones = posiciones_por_licitacion.get(numero_licitacion, np.array([], dtype=np.intp))
+        huella.update(filas_licitaciones[i].tobytes())
+        huella.update(f"{vencida}:{len(posiciones)}".encode("utf-8"))
+        huella.update(filas_ordenes[posiciones].tobytes())
+    return {numero_licitacion: huella.hexdigest() for numero_licitacion, huella in huellas.items()}
+
+def control_incremental_de_gastos(licitaciones_df, ordenes_df):
+    """
+    Control de gastos que solo recalcula las licitaciones cuyos datos cambiaron desde el
+    último control guardado en la base de datos (según su huella); el control de las
+    demás se toma de la base de datos.
+    
+    Args:
+        licitaciones_df: DataFrame con información de licitaciones
+        ordenes_df: DataFrame con órdenes de compra
         
-        controles[str(numero_licitacion)] = control
+    Returns:
+        tuple: (controles como en control_avanzado_de_gastos, huellas de las licitaciones
+            o None si no se pudieron calcular)
+    """
+    # Asegurar que las columnas están normalizadas
+    licitaciones_df.columns = [col.lower().strip().replace(" ", "_") for col in licitaciones_df.columns]
+    ordenes_df.columns = [col.lower().strip().replace(" ", "_") for col in ordenes_df.columns]
     
-    return controles
+    # Sin número de licitación no hay huellas; control_avanzado_de_gastos informa el error
+    if 'numero_licitacion' not in licitaciones_df.columns or 'numero_licitacion' not in ordenes_df.columns:
+        return control_avanzado_de_gastos(licitaciones_df, ordenes_df), None
+    
+    huellas = huellas_de_licitaciones(licitaciones_df, ordenes_df)
+    try:
+        anteriores = load_controles(STORE_FILE, huellas)
+    except Exception as e:
+        print(f"Advertencia: no se pudo leer el control anterior, se recalculará completo: {e}")
+        anteriores = {}
+    
+    pendientes = {numero_licitacion for numero_licitacion in huellas if numero_licitacion not in anteriores}
+    if len(pendientes) == len(huellas):
+        nuevos = control_avanzado_de_gastos(licitaciones_df, ordenes_df)
+    elif pendientes:
+        # Solo las licitaciones que cambiaron, con sus órdenes
+        licitaciones_pendientes = licitaciones_df[_como_texto(licitaciones_df["numero_licitacion"]).isin(pendientes)]
+        ordenes_pendientes = ordenes_df[_como_texto(ordenes_df["numero_licitacion"]).isin(pendientes)]
+        nuevos = control_avanzado_de_gastos(licitaciones_pendientes, ordenes_pendientes)
+    else:
+        nuevos = {}
+    
+    if anteriores:
+        st.info(f"Se recalculó el control de {len(pendientes)} de {len(huellas)} licitaciones; las demás no cambiaron desde el último control.")
+    
+    controles = {
+        numero_licitacion: nuevos[numero_licitacion] if numero_licitacion in pendientes else anteriores[numero_licitacion]
+        for numero_licitacion in huellas
+    }
+    return controles, huellas
 
 def generar_control_de_ordenes(ordenes_df):
     """
@@ -215,17 +368,47 @@ def generar_control_de_ordenes(ordenes_df):
         return False
     
     # Agrupar las órdenes por número de licitación
-    return guardar_dataframe_por_hojas(
+    exito = guardar_dataframe_por_hojas(
         ordenes_df, 
         PERSISTENT_ORDERS_FILE, 
         "numero_licitacion",
         "xlsxwriter"
     )
+    
+    # Actualizar la copia en Parquet con las mismas hojas
+    if exito:
+        write_mirror(
+            PERSISTENT_ORDERS_FILE,
+            {str(nombre)[:31]: grupo for nombre, grupo in ordenes_df.groupby("numero_licitacion")}
+        )
+    return exito
+
+def _hoja_de_control(control):
+    """
+    Hoja del control de gastos de una licitación: su resumen seguido de su historial.
+    """
+    # Crear DataFrame con el historial
+    historial_df = pd.DataFrame(control["historial"]) if control["historial"] else pd.DataFrame()
+    
+    # Crear DataFrame con el resumen
+    resumen_df = pd.DataFrame([control["resumen"]])
+    
+    # Si hay historial, combinarlo con el resumen
+    if not historial_df.empty:
+        # Asegurar que todas las columnas del resumen estén presentes
+        for col in resumen_df.columns:
+            if col not in historial_df.columns:
+                historial_df[col] = None
+        
+        # Combinar resumen con historial
+        return pd.concat([resumen_df, historial_df], ignore_index=True)
+    return resumen_df
 
-def generar_control_de_gasto(controles):
+def generar_control_de_gasto(controles, huellas=None):
     """
     Genera el archivo `control_de_gasto_de_licitaciones.xlsx` y el resumen en JSON
-    basado en el control avanzado de gastos.
+    basado en el control avanzado de gastos. Con las huellas de las licitaciones (ver
+    huellas_de_licitaciones), solo se reescriben las hojas de las que cambiaron.
     """
     # Asegurar que el directorio para el usuario actual existe
     if "user" in st.session_state and st.session_state.user:
@@ -237,50 +420,45 @@ def generar_control_de_gasto(controles):
         st.error("No hay datos de control para generar el archivo.")
         return False
     
-    # Crear un DataFrame para cada licitación
-    hojas = {}
-    resumenes = []
+    # Extraer los resúmenes para guardarlos en JSON
+    resumenes = [control["resumen"] for control in controles.values()]
     
-    for numero_licitacion, control in controles.items():
-        # Extraer el resumen para guardarlo en JSON
-        resumenes.append(control["resumen"])
-        
-        # Crear DataFrame con el historial
-        historial_df = pd.DataFrame(control["historial"]) if control["historial"] else pd.DataFrame()
-        
-        # Crear DataFrame con el resumen
-        resumen_df = pd.DataFrame([control["resumen"]])
+    # Nombre de la hoja de cada licitación (límite de 31 caracteres de Excel) y huella de su control
+    nombres_hojas = {str(numero_licitacion)[:31]: numero_licitacion for numero_licitacion in controles}
+    huellas_hojas = {nombre: huellas.get(numero) for nombre, numero in nombres_hojas.items()} if huellas else None
+    
+    # Si el libro guardado tiene las mismas hojas, reescribir solo las de licitaciones cuya huella cambió
+    actualizado = False
+    anteriores = get_sheet_fingerprints(PERSISTENT_EXPENSES_FILE) if huellas else None
+    if anteriores is not None and list(anteriores) == list(nombres_hojas):
+        hojas = {
+            nombre: _hoja_de_control(controles[numero_licitacion])
+            for nombre, numero_licitacion in nombres_hojas.items()
+            if anteriores[nombre] is None or anteriores[nombre] != huellas_hojas[nombre]
+        }
+        actualizado = not hojas or replace_sheets(PERSISTENT_EXPENSES_FILE, hojas, huellas_hojas)
+    
+    if not actualizado:
+        # Crear un DataFrame para cada licitación
+        hojas = {nombre: _hoja_de_control(controles[numero_licitacion]) for nombre, numero_licitacion in nombres_hojas.items()}
         
-        # Si hay historial, combinarlo con el resumen
-        if not historial_df.empty:
-            # Asegurar que todas las columnas del resumen estén presentes
-            for col in resumen_df.columns:
-                if col not in historial_df.columns:
-                    historial_df[col] = None
-            
-            # Combinar resumen con historial
-            hoja_df = pd.concat([resumen_df, historial_df], ignore_index=True)
-        else:
-            hoja_df = resumen_df
+        # Guardar el archivo Excel con múltiples hojas
+        try:
+            with pd.ExcelWriter(PERSISTENT_EXPENSES_FILE, engine="xlsxwriter") as writer:
+                for sheet_name, df in hojas.items():
+                    df.to_excel(writer, index=False, sheet_name=sheet_name)
+        except Exception as e:
+            st.error(f"Error al guardar el archivo Excel: {e}")
+            return False
         
-        # Guardar en el diccionario de hojas
-        hojas[numero_licitacion] = hoja_df
-    
-    # Guardar el archivo Excel con múltiples hojas
-    try:
-        with pd.ExcelWriter(PERSISTENT_EXPENSES_FILE, engine="xlsxwriter") as writer:
-            for sheet_name, df in hojas.items():
-                # Limitar nombre de hoja a 31 caracteres (límite de Excel)
-                sheet_name_clean = str(sheet_name)[:31]
-                df.to_excel(writer, index=False, sheet_name=sheet_name_clean)
-    except Exception as e:
-        st.error(f"Error al guardar el archivo Excel: {e}")
-        return False
+        # Actualizar la copia en Parquet con las mismas hojas
+        write_mirror(PERSISTENT_EXPENSES_FILE, hojas, huellas_hojas)
     
     # Guardar el resumen en formato JSON con el manejador personalizado
     try:
         with open(CONTROL_SUMMARY_FILE, 'w', encoding='utf-8') as f:
             json.dump(resumenes, f, default=json_serial, ensure_ascii=False, indent=2)
+        invalidate_cache(CONTROL_SUMMARY_FILE)
     except Exception as e:
         st.error(f"Error al guardar el archivo JSON: {e}")
         return False
@@ -360,9 +538,9 @@ def pagina_2():
                         except Exception as e:
                             st.error(f"Error al leer el archivo de licitaciones: {e}")
                             # Intentar leer la primera hoja disponible
-                            excel = pd.ExcelFile(licitaciones_file, engine="openpyxl")
-                            st.warning(f"Intentando con la primera hoja disponible: {excel.sheet_names[0]}")
-                            licitaciones_df = pd.read_excel(licitaciones_file, sheet_name=excel.sheet_names[0], engine="openpyxl")
+                            primera_hoja = list_sheets(licitaciones_file)[0]
+                            st.warning(f"Intentando con la primera hoja disponible: {primera_hoja}")
+                            licitaciones_df = pd.read_excel(licitaciones_file, sheet_name=primera_hoja, engine="openpyxl")
                         
                         # Mostrar primeras filas de licitaciones
                         st.write("Vista previa de licitaciones:")
@@ -393,9 +571,9 @@ def pagina_2():
                         except Exception as e:
                             st.error(f"Error al leer el archivo de órdenes: {e}")
                             # Intentar leer la primera hoja disponible
-                            excel = pd.ExcelFile(ordenes_file, engine="openpyxl")
-                            st.warning(f"Intentando con la primera hoja disponible: {excel.sheet_names[0]}")
-                            ordenes_df = pd.read_excel(ordenes_file, sheet_name=excel.sheet_names[0], engine="openpyxl")
+                            primera_hoja = list_sheets(ordenes_file)[0]
+                            st.warning(f"Intentando con la primera hoja disponible: {primera_hoja}")
+                            ordenes_df = pd.read_excel(ordenes_file, sheet_name=primera_hoja, engine="openpyxl")
                         
                         # Mostrar primeras filas de órdenes
                         st.write("Vista previa de órdenes:")
@@ -436,19 +614,24 @@ def pagina_2():
                         if "usuario" not in ordenes_df.columns:
                             ordenes_df["usuario"] = current_user
                         
-                        # Generar control avanzado de gastos
-                        controles = control_avanzado_de_gastos(licitaciones_df, ordenes_df)
+                        # Generar control avanzado de gastos (solo de las licitaciones que cambiaron)
+                        controles, huellas = control_incremental_de_gastos(licitaciones_df, ordenes_df)
                         
                         # Verificar si se generaron controles
                         if not controles:
                             st.error("No se pudieron generar controles de gastos.")
                             return
                         
-                        # Generar archivo de control de órdenes
+                        # Guardar el control en la base de datos del usuario
+                        if not save_control(STORE_FILE, ordenes_df, controles, huellas):
+                            st.error("❌ Error al guardar el control en la base de datos.")
+                            return
+                        
+                        # Exportar el archivo de control de órdenes
                         exito_ordenes = generar_control_de_ordenes(ordenes_df)
                         
-                        # Generar archivo de control de gastos
-                        exito_gastos = generar_control_de_gasto(controles)
+                        # Exportar el archivo de control de gastos
+                        exito_gastos = generar_control_de_gasto(controles, huellas)
                         
                         if exito_ordenes and exito_gastos:
                             st.success("✅ Archivos de control generados correctamente.")
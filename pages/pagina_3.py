@@ -6,6 +6,12 @@ import json
 import traceback
 from utils.certificate_utils import generate_certificate
 from utils.file_operations import consolidar_hojas_excel
+from utils.workbook_mirror import get_row_index, write_cells
+from utils.dataset_cache import load_cached, invalidate_cache
+from utils.order_store import (
+    list_licitaciones, load_ordenes, load_gastos, load_resumenes, load_certificados,
+    set_certificado, add_certificado
+)
 
 # Importar funciones de gestión de usuarios
 from user_management import get_user_data_path
@@ -15,6 +21,7 @@ GASTOS_FILE = "data/control_de_gasto_de_licitaciones.xlsx"
 ORDENES_FILE = "data/control_de_ordenes_de_compra.xlsx"
 CONTROL_SUMMARY_FILE = "data/resumen_control_licitaciones.json"
 CERTIFICADOS_LOG_FILE = "data/registro_certificados.json"
+STORE_FILE = "data/sistema_oc.db"
 
 def actualizar_estado_certificado(orden_compra, valor="SÍ"):
     """
@@ -33,60 +40,30 @@ def actualizar_estado_certificado(orden_compra, valor="SÍ"):
         st.write(f"Debug - Actualizando estado de certificado para orden: {orden_compra}")
         st.write(f"Debug - Valor a establecer: {valor}")
         
-        # Cargar el archivo de órdenes
-        ordenes_excel = pd.ExcelFile(ORDENES_FILE)
-        hojas_actualizadas = {}
-        orden_encontrada = False
+        # Actualizar la base de datos del control
+        if not set_certificado(STORE_FILE, orden_compra, valor):
+            st.warning(f"La orden de compra '{orden_compra}' no se encontró en el control de órdenes.")
+            return False
         
-        # Procesar cada hoja (licitación)
-        for hoja in ordenes_excel.sheet_names:
-            # Cargar la hoja
-            df_hoja = ordenes_excel.parse(hoja)
-            
-            # Normalizar nombres de columnas
-            df_hoja.columns = [col.lower().strip() for col in df_hoja.columns]
-            
-            # Imprimir información de depuración
-            st.write(f"Debug - Procesando hoja: {hoja}")
-            st.write(f"Debug - Columnas en la hoja: {list(df_hoja.columns)}")
-            
-            # Buscar la orden de compra en esta hoja
-            if "orden_de_compra" in df_hoja.columns:
-                # Convertir a string para comparación segura
-                df_hoja["orden_de_compra"] = df_hoja["orden_de_compra"].astype(str)
-                
-                # Ver si la orden existe en esta hoja
-                if orden_compra in df_hoja["orden_de_compra"].values:
-                    st.write(f"Debug - Orden encontrada en hoja: {hoja}")
-                    # Actualizar el estado del certificado
-                    mask = df_hoja["orden_de_compra"] == orden_compra
-                    
-                    # Asegurar que existe la columna certificado
-                    if "certificado" not in df_hoja.columns:
-                        st.write("Debug - Agregando columna 'certificado' que no existía")
-                        df_hoja["certificado"] = "NO"
-                    
-                    # Actualizar el valor
-                    st.write(f"Debug - Actualizando {sum(mask)} filas con el valor: {valor}")
-                    df_hoja.loc[mask, "certificado"] = valor
-                    orden_encontrada = True
-            
-            # Guardar la hoja actualizada
-            hojas_actualizadas[hoja] = df_hoja
+        # Mantener actualizado el archivo Excel exportado
+        if not os.path.exists(ORDENES_FILE):
+            st.success(f"✅ Estado de certificado actualizado correctamente para la orden {orden_compra}")
+            return True
         
-        if not orden_encontrada:
+        # Ubicar la orden con el índice de órdenes del libro (hoja y fila), sin recorrer las hojas
+        ubicaciones = get_row_index(ORDENES_FILE, "orden_de_compra").get(str(orden_compra), [])
+        if not ubicaciones:
             st.warning(f"La orden de compra '{orden_compra}' no se encontró en ninguna hoja del archivo.")
             return False
         
-        # Guardar todas las hojas actualizadas al archivo
+        for hoja, posicion in ubicaciones:
+            st.write(f"Debug - Orden encontrada en hoja: {hoja} (fila {posicion + 2})")
+        
+        # Escribir solo la celda "certificado" de la orden; el resto del libro no se reescribe
         st.write("Debug - Guardando archivo actualizado...")
-        with pd.ExcelWriter(ORDENES_FILE, engine="openpyxl") as writer:
-            for hoja, df in hojas_actualizadas.items():
-                # Verificar si la columna certificado existe y tiene el valor esperado
-                if "certificado" in df.columns:
-                    certificados_si = sum(df["certificado"] == valor)
-                    st.write(f"Debug - Hoja {hoja}: {certificados_si} órdenes con certificado = '{valor}'")
-                df.to_excel(writer, sheet_name=hoja, index=False)
+        if not write_cells(ORDENES_FILE, [(hoja, posicion, "certificado", valor) for hoja, posicion in ubicaciones]):
+            st.error(f"No se pudo guardar el estado del certificado en {ORDENES_FILE}.")
+            return False
         
         st.success(f"✅ Estado de certificado actualizado correctamente para la orden {orden_compra}")
         return True
@@ -112,13 +89,6 @@ def registrar_certificado(datos_certificado):
             user_data_path = get_user_data_path(st.session_state.user["username"])
             os.makedirs(user_data_path, exist_ok=True)
         
-        # Cargar registro existente o crear uno nuevo
-        if os.path.exists(CERTIFICADOS_LOG_FILE):
-            with open(CERTIFICADOS_LOG_FILE, 'r', encoding='utf-8') as f:
-                registro = json.load(f)
-        else:
-            registro = []
-        
         # Añadir fecha de generación
         datos_certificado["fecha_generacion"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
         
@@ -132,11 +102,13 @@ def registrar_certificado(datos_certificado):
                 datos_certificado[key] = value.strftime("%Y-%m-%d")
         
         # Añadir nuevo certificado al registro
-        registro.append(datos_certificado)
+        add_certificado(STORE_FILE, datos_certificado)
         
-        # Guardar registro actualizado
+        # Exportar el registro actualizado
+        registro = load_cached(STORE_FILE, load_certificados)
         with open(CERTIFICADOS_LOG_FILE, 'w', encoding='utf-8') as f:
             json.dump(registro, f, ensure_ascii=False, indent=2)
+        invalidate_cache(CERTIFICADOS_LOG_FILE)
         
         return True
     
@@ -147,33 +119,16 @@ def registrar_certificado(datos_certificado):
 
 def listar_licitaciones_disponibles():
     """
-    Lista todas las licitaciones disponibles en los archivos de control.
+    Lista todas las licitaciones disponibles en el control del usuario.
     
     Returns:
         list: Lista de nombres de licitaciones disponibles
     """
-    licitaciones = []
-    
-    # Verificar archivo de gastos
-    if os.path.exists(GASTOS_FILE):
-        try:
-            gastos_data = pd.ExcelFile(GASTOS_FILE)
-            licitaciones.extend(gastos_data.sheet_names)
-        except Exception as e:
-            st.warning(f"No se pudieron leer las licitaciones del archivo de gastos: {e}")
-    
-    # Verificar archivo de órdenes
-    if os.path.exists(ORDENES_FILE):
-        try:
-            ordenes_data = pd.ExcelFile(ORDENES_FILE)
-            licitaciones.extend(ordenes_data.sheet_names)
-        except Exception as e:
-            st.warning(f"No se pudieron leer las licitaciones del archivo de órdenes: {e}")
-    
-    # Eliminar duplicados y ordenar
-    licitaciones = sorted(list(set(licitaciones)))
-    
-    return licitaciones
+    try:
+        return load_cached(STORE_FILE, list_licitaciones)
+    except Exception as e:
+        st.warning(f"No se pudieron leer las licitaciones del control: {e}")
+        return []
 
 def cargar_ordenes_licitacion(licitacion):
     """
@@ -185,23 +140,14 @@ def cargar_ordenes_licitacion(licitacion):
     Returns:
         DataFrame: DataFrame con las órdenes de la licitación, o None si hay error
     """
-    if not os.path.exists(ORDENES_FILE):
-        st.error(f"El archivo de órdenes '{ORDENES_FILE}' no existe.")
-        return None
-    
     try:
-        # Cargar el archivo Excel
-        ordenes_excel = pd.ExcelFile(ORDENES_FILE)
+        df = load_cached(STORE_FILE, load_ordenes, licitacion)
         
-        # Verificar si la licitación existe como hoja
-        if licitacion not in ordenes_excel.sheet_names:
-            st.error(f"La licitación '{licitacion}' no se encontró en el archivo de órdenes.")
-            st.info(f"Hojas disponibles: {', '.join(ordenes_excel.sheet_names)}")
+        # Verificar si la licitación tiene órdenes
+        if df.empty:
+            st.error(f"La licitación '{licitacion}' no tiene órdenes en el control.")
             return None
         
-        # Cargar la hoja correspondiente
-        df = ordenes_excel.parse(licitacion)
-        
         # Normalizar nombres de columnas
         df.columns = [col.lower().strip() for col in df.columns]
         
@@ -222,23 +168,14 @@ def cargar_gastos_licitacion(licitacion):
     Returns:
         DataFrame: DataFrame con los gastos de la licitación, o None si hay error
     """
-    if not os.path.exists(GASTOS_FILE):
-        st.error(f"El archivo de gastos '{GASTOS_FILE}' no existe.")
-        return None
-    
     try:
-        # Cargar el archivo Excel
-        gastos_excel = pd.ExcelFile(GASTOS_FILE)
+        df = load_cached(STORE_FILE, load_gastos, licitacion)
         
-        # Verificar si la licitación existe como hoja
-        if licitacion not in gastos_excel.sheet_names:
-            st.error(f"La licitación '{licitacion}' no se encontró en el archivo de gastos.")
-            st.info(f"Hojas disponibles: {', '.join(gastos_excel.sheet_names)}")
+        # Verificar si la licitación tiene control de gastos
+        if df.empty:
+            st.error(f"La licitación '{licitacion}' no se encontró en el control de gastos.")
             return None
         
-        # Cargar la hoja correspondiente
-        df = gastos_excel.parse(licitacion)
-        
         # Normalizar nombres de columnas
         df.columns = [col.lower().strip() for col in df.columns]
         
@@ -259,23 +196,11 @@ def obtener_certificados_licitacion(licitacion):
     Returns:
         list: Lista de certificados generados previamente
     """
-    certificados = []
-    
-    # Verificar si existe el archivo de certificados
-    if not os.path.exists(CERTIFICADOS_LOG_FILE):
-        return certificados
-    
     try:
-        with open(CERTIFICADOS_LOG_FILE, 'r', encoding='utf-8') as f:
-            all_certificados = json.load(f)
-        
-        # Filtrar certificados de la licitación
-        certificados = [cert for cert in all_certificados if cert.get("licitacion") == licitacion]
-        
-        return certificados
+        return load_cached(STORE_FILE, load_certificados, licitacion)
     except Exception as e:
         st.warning(f"Error al cargar certificados previos: {e}")
-        return certificados
+        return []
 
 def calcular_saldos_licitacion(licitacion, presupuesto_total, monto_actual):
     """
@@ -340,28 +265,16 @@ def pagina_3():
     formulario_container = st.container()
     descarga_container = st.container()
     
-    # Validar si ambos archivos persistentes existen
-    with verificacion_container:
-        archivos_faltantes = []
-        
-        if not os.path.exists(GASTOS_FILE):
-            archivos_faltantes.append(GASTOS_FILE)
-        
-        if not os.path.exists(ORDENES_FILE):
-            archivos_faltantes.append(ORDENES_FILE)
-        
-        if archivos_faltantes:
-            st.error(f"No se encontraron los siguientes archivos: {', '.join(archivos_faltantes)}. Por favor, genera estos archivos en la página 2.")
-            return
-        
-        st.success("✅ Se han cargado los archivos de control de gastos y órdenes de compra.")
-    
     # Obtener licitaciones disponibles
     licitaciones_disponibles = listar_licitaciones_disponibles()
     
-    if not licitaciones_disponibles:
-        st.warning("No se encontraron licitaciones disponibles en los archivos de control.")
-        return
+    # Validar si existe el control de gastos y órdenes
+    with verificacion_container:
+        if not licitaciones_disponibles:
+            st.error("No se encontró el control de gastos y órdenes de compra. Por favor, genéralo en la página 2.")
+            return
+        
+        st.success("✅ Se ha cargado el control de gastos y órdenes de compra.")
     
     # Selección de licitación y orden de compra
     with seleccion_container:
@@ -513,19 +426,17 @@ def pagina_3():
         
         # Si aún no tenemos un presupuesto total, usar un valor predeterminado
         if presupuesto_total == 0:
-            # Intentar obtener del archivo de resumen
-            if os.path.exists(CONTROL_SUMMARY_FILE):
-                try:
-                    with open(CONTROL_SUMMARY_FILE, 'r', encoding='utf-8') as f:
-                        resumenes = json.load(f)
-                        
-                    # Buscar la licitación en los resúmenes
-                    for resumen in resumenes:
-                        if resumen.get("numero_licitacion") == selected_licitacion:
-                            presupuesto_total = resumen.get("presupuesto_total", 0)
-                            break
-                except:
-                    pass
+            # Intentar obtener de los resúmenes del control
+            try:
+                resumenes = load_cached(STORE_FILE, load_resumenes)
+                
+                # Buscar la licitación en los resúmenes
+                for resumen in resumenes:
+                    if resumen.get("numero_licitacion") == selected_licitacion:
+                        presupuesto_total = resumen.get("presupuesto_total", 0)
+                        break
+            except:
+                pass
             
             # Si aún no tenemos valor, usar un valor por defecto basado en la orden actual
             if presupuesto_total == 0:
@@ -9,12 +9,15 @@ from datetime import datetime
 
 # Importar funciones de gestión de usuarios
 from user_management import get_user_data_path
+from utils.order_store import list_licitaciones, load_ordenes, load_gastos, load_resumenes, load_certificados
+from utils.dataset_cache import load_cached
 
 # Archivos de entrada - Serán modificadas en auth_app.py para cada usuario
 ORDENES_FILE = "data/control_de_ordenes_de_compra.xlsx"
 GASTOS_FILE = "data/control_de_gasto_de_licitaciones.xlsx"
 CONTROL_SUMMARY_FILE = "data/resumen_control_licitaciones.json"
 CERTIFICADOS_LOG_FILE = "data/registro_certificados.json"
+STORE_FILE = "data/sistema_oc.db"
 
 def cargar_datos():
     """
@@ -28,46 +31,19 @@ def cargar_datos():
         st.error("Debes iniciar sesión para acceder a esta funcionalidad.")
         return None, None, None, None, []
     
-    # Validar si ambos archivos existen
-    if not (os.path.exists(ORDENES_FILE) and os.path.exists(GASTOS_FILE)):
-        return None, None, None, None, []
-    
     try:
-        # Cargar datos de órdenes
-        ordenes_excel = pd.ExcelFile(ORDENES_FILE)
-        ordenes_sheets = []
-        
         # Obtener lista de licitaciones disponibles
-        licitaciones_disponibles = ordenes_excel.sheet_names
-        
-        for sheet in ordenes_excel.sheet_names:
-            sheet_df = ordenes_excel.parse(sheet)
-            sheet_df["numero_licitacion"] = sheet
-            ordenes_sheets.append(sheet_df)
-        
-        ordenes_df = pd.concat(ordenes_sheets, ignore_index=True)
-        
-        # Cargar datos de gastos
-        gastos_excel = pd.ExcelFile(GASTOS_FILE)
-        gastos_sheets = []
-        
-        for sheet in gastos_excel.sheet_names:
-            sheet_df = gastos_excel.parse(sheet)
-            sheet_df["numero_licitacion"] = sheet
-            gastos_sheets.append(sheet_df)
+        licitaciones_disponibles = load_cached(STORE_FILE, list_licitaciones)
+        if not licitaciones_disponibles:
+            return None, None, None, None, []
         
-        gastos_df = pd.concat(gastos_sheets, ignore_index=True)
+        # Cargar datos de órdenes y gastos
+        ordenes_df = load_cached(STORE_FILE, load_ordenes)
+        gastos_df = load_cached(STORE_FILE, load_gastos)
         
         # Cargar resúmenes y certificados
-        resumenes = []
-        if os.path.exists(CONTROL_SUMMARY_FILE):
-            with open(CONTROL_SUMMARY_FILE, 'r', encoding='utf-8') as f:
-                resumenes = json.load(f)
-        
-        certificados = []
-        if os.path.exists(CERTIFICADOS_LOG_FILE):
-            with open(CERTIFICADOS_LOG_FILE, 'r', encoding='utf-8') as f:
-                certificados = json.load(f)
+        resumenes = load_cached(STORE_FILE, load_resumenes)
+        certificados = load_cached(STORE_FILE, load_certificados)
         
         return ordenes_df, gastos_df, resumenes, certificados, licitaciones_disponibles
     
@@ -0,0 +1,50 @@
+"""
+Vuelve a aplicar las reglas de extracción vigentes (utils/pdf_extraction.py) sobre el texto
+guardado de los PDFs de un usuario y corrige las órdenes de su perfil sin volver a leer los PDFs.
+
+Uso:
+    python reextraer_ordenes.py --usuario NOMBRE [--simular] [--detalle]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.text_store import reextract_orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extrae los campos de las órdenes de compra desde el texto guardado.")
+    parser.add_argument("--usuario", required=True, help="Nombre de usuario (carpeta data/users/<usuario>)")
+    parser.add_argument("--simular", action="store_true", help="Mostrar los cambios sin escribir archivos")
+    parser.add_argument("--detalle", action="store_true", help="Mostrar cada campo modificado")
+    args = parser.parse_args()
+
+    user_data_path = os.path.join("data", "users", args.usuario)
+    if not os.path.isdir(user_data_path):
+        print(f"No existe la carpeta de datos del usuario: {user_data_path}")
+        return 1
+
+    inicio = time.perf_counter()
+    resumen = reextract_orders(user_data_path, dry_run=args.simular)
+    segundos = time.perf_counter() - inicio
+
+    if args.detalle:
+        for orden, campo, anterior, nuevo in resumen["cambios"]:
+            print(f"{orden} · {campo}: {anterior!r} -> {nuevo!r}")
+
+    print(f"Documentos con texto guardado: {resumen['documentos']}")
+    print(f"Filas actualizadas: {resumen['filas_actualizadas']} ({resumen['campos_modificados']} campo(s) modificados)")
+    print(f"Sin orden guardada en el perfil: {resumen['sin_fila']}")
+    print(f"Sin texto guardado: {resumen['sin_texto']}")
+    print(f"Tiempo: {segundos:.2f} s")
+    if args.simular:
+        print("Simulación: no se escribieron archivos.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
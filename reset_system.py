@@ -4,6 +4,9 @@ import pandas as pd
 from datetime import datetime
 import streamlit as st
 import hashlib  # Importación necesaria para calcular el hash de la contraseña
+from utils.order_store import reset_certificados
+from utils.workbook_mirror import read_workbook, write_mirror
+from utils.workbook_lock import workbook_lock
 
 # Función para crear una copia de seguridad de la carpeta "data"
 def crear_backup():
@@ -45,16 +48,22 @@ def reiniciar_certificados():
 
         # Reiniciar el archivo de órdenes de compra
         if os.path.exists("data/control_de_ordenes_de_compra.xlsx"):
-            ordenes_excel = pd.ExcelFile("data/control_de_ordenes_de_compra.xlsx")
-            with pd.ExcelWriter("data/control_de_ordenes_de_compra.xlsx", engine="openpyxl") as writer:
-                for sheet_name in ordenes_excel.sheet_names:
-                    df = ordenes_excel.parse(sheet_name)
-                    df.columns = [col.lower().strip() for col in df.columns]
-                    if "certificado" in df.columns:
-                        df["certificado"] = "NO"
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+            with workbook_lock("data/control_de_ordenes_de_compra.xlsx"):
+                ordenes_hojas = read_workbook("data/control_de_ordenes_de_compra.xlsx")
+                with pd.ExcelWriter("data/control_de_ordenes_de_compra.xlsx", engine="openpyxl") as writer:
+                    for sheet_name, df in ordenes_hojas.items():
+                        df.columns = [col.lower().strip() for col in df.columns]
+                        if "certificado" in df.columns:
+                            df["certificado"] = "NO"
+                        df.to_excel(writer, sheet_name=sheet_name, index=False)
+                write_mirror("data/control_de_ordenes_de_compra.xlsx", ordenes_hojas)
             st.info("Archivo de órdenes de compra reiniciado.")
         
+        # Reiniciar los certificados en la base de datos del control
+        if os.path.exists("data/sistema_oc.db"):
+            reset_certificados("data/sistema_oc.db")
+            st.info("Certificados de la base de datos reiniciados.")
+        
         return True
     except Exception as e:
         st.error(f"Error al reiniciar certificados: {e}")
@@ -0,0 +1,649 @@
+import os
+import hashlib
+import unicodedata
+import pandas as pd
+from io import BytesIO
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # Windows: sin medición de memoria por documento
+    resource = None
+
+from utils.pdf_extraction import extract_fields_from_pdf, register_extracted_order, split_pdf_orders
+from utils.text_backends import resolve_text_backend
+from utils.layout_templates import LAYOUT_TEMPLATES_FINGERPRINT
+from utils.extraction_cache import get_cached_extraction, store_cached_extraction, evict_extraction_cache
+from utils.text_store import store_page_texts, update_text_store_index
+from utils.isolated_extraction import IsolatedExtractionPool
+from utils.workbook_lock import unique_temp_path
+from utils.order_store import load_estados_extraidos, load_ordenes_extraidas, upsert_ordenes_extraidas
+
+# Número máximo de procesos de trabajo para la extracción en paralelo.
+# Puede ajustarse con la variable de entorno OC_EXTRACTION_WORKERS (1 = modo serial).
+MAX_EXTRACTION_WORKERS = int(os.environ.get("OC_EXTRACTION_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Cantidad mínima de documentos para que valga la pena levantar procesos de trabajo
+MIN_PARALLEL_BATCH = 4
+
+# Verdadero solo dentro de los procesos de trabajo (ver _init_extraction_worker)
+_EN_PROCESO_DE_TRABAJO = False
+
+# Los documentos se procesan en ventanas de a lo más esta cantidad y tamaño total, de modo
+# que un origen grande (p. ej. un ZIP con cientos de PDFs) no se carga entero en memoria
+EXTRACTION_WINDOW_DOCS = 64
+EXTRACTION_WINDOW_BYTES = 64 * 1024 * 1024
+
+# Avance normal del estado de una orden de compra: un PDF con un estado anterior al guardado
+# (p. ej. una copia antigua de la orden) no lo retrocede. Los demás estados (cancelada, etc.)
+# se aplican siempre.
+ORDER_STATUS_PROGRESSION = ["enviada a proveedor", "aceptada", "recepcion conforme"]
+
+
+def compute_content_hash(content):
+    """
+    Genera el hash MD5 del contenido de un archivo (mismo criterio que generate_file_hash).
+    """
+    return hashlib.md5(content).hexdigest()
+
+
+def load_processed_orders(store_file, user_id=None):
+    """
+    Carga las órdenes de compra ya guardadas de un usuario con la misma clave que usa
+    register_extracted_order, para no volver a registrarlas.
+    :return: Conjunto de claves de órdenes procesadas (vacío si no hay órdenes guardadas).
+    """
+    processed_orders = set()
+    try:
+        guardadas = load_estados_extraidos(store_file)
+    except Exception as e:
+        print(f"Advertencia: error al cargar órdenes existentes: {e}")
+        return processed_orders
+    for order, _ in guardadas:
+        if order:
+            processed_orders.add(f"{user_id}_{order}" if user_id else order)
+    return processed_orders
+
+
+def load_order_states(store_file):
+    """
+    Carga el estado guardado de cada orden de compra del usuario.
+    :return: Diccionario orden de compra -> estado (vacío si no hay órdenes guardadas).
+    """
+    try:
+        guardadas = load_estados_extraidos(store_file)
+    except Exception as e:
+        print(f"Advertencia: error al cargar órdenes existentes: {e}")
+        return {}
+    return {orden: _cell_text(estado) for orden, estado in guardadas if orden}
+
+
+def _cell_text(valor):
+    """
+    Texto comparable de una celda: vacío para celdas sin valor y sin ".0" en números enteros.
+    """
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _status_rank(estado):
+    texto = unicodedata.normalize("NFKD", _cell_text(estado).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return ORDER_STATUS_PROGRESSION.index(texto) if texto in ORDER_STATUS_PROGRESSION else None
+
+
+def is_status_update(estado_anterior, estado_nuevo):
+    """
+    Indica si el estado leído de un PDF debe reemplazar al guardado: debe ser distinto y no
+    retroceder en el avance Enviada a Proveedor -> Aceptada -> Recepcion Conforme.
+    """
+    if not _cell_text(estado_nuevo) or _cell_text(estado_anterior) == _cell_text(estado_nuevo):
+        return False
+    anterior, nuevo = _status_rank(estado_anterior), _status_rank(estado_nuevo)
+    if anterior is not None and nuevo is not None:
+        return nuevo > anterior
+    return True
+
+
+def _save_workbook_atomic(orders_file, save):
+    """
+    Guarda un libro en un temporal y lo reemplaza de forma atómica, para que nadie lea uno
+    a medio escribir.
+    """
+    os.makedirs(os.path.dirname(orders_file) or ".", exist_ok=True)
+    # Nombre único: dos escritores nunca comparten el temporal
+    tmp_path = unique_temp_path(orders_file)
+    try:
+        save(tmp_path)
+        os.replace(tmp_path, orders_file)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def upsert_orders(rows, store_file):
+    """
+    Guarda órdenes extraídas en el perfil del usuario ("Guardar en Mi Perfil") usando
+    "Orden de Compra" como clave: las órdenes nuevas se agregan al final y en las ya
+    guardadas solo se cambian los campos distintos. Un estado que retrocede (ver
+    is_status_update) no se aplica.
+
+    Args:
+        rows (list): Diccionarios con los datos de cada orden (una orden repetida: gana la última).
+        store_file (str): Ruta de la base de datos del usuario (ver order_store.get_store_file).
+
+    Returns:
+        dict: {"nuevas": int, "actualizadas": int, "cambios_estado": lista de
+        {"orden_de_compra", "estado_anterior", "estado_nuevo"}}.
+    """
+    cambios_estado = []
+
+    def cambios_de(guardada, fila):
+        estado_distinto = "Estado" in fila and _cell_text(guardada.get("Estado")) != _cell_text(fila["Estado"])
+        if estado_distinto and not is_status_update(guardada.get("Estado"), fila["Estado"]):
+            return {}  # PDF más antiguo que lo guardado
+        cambios = {
+            col: valor for col, valor in fila.items()
+            if _cell_text(guardada.get(col)) != _cell_text(valor)
+        }
+        if "Estado" in cambios:
+            cambios_estado.append({
+                "orden_de_compra": _cell_text(fila.get("Orden de Compra")),
+                "estado_anterior": _cell_text(guardada.get("Estado")),
+                "estado_nuevo": _cell_text(fila["Estado"]),
+            })
+        return cambios
+
+    nuevas, actualizadas = upsert_ordenes_extraidas(store_file, rows, cambios_de)
+    return {"nuevas": nuevas, "actualizadas": actualizadas, "cambios_estado": cambios_estado}
+
+
+def export_orders_to_excel(store_file, destino):
+    """
+    Genera ordenes_de_compra.xlsx con las órdenes guardadas en el perfil del usuario
+    (la base de datos es el registro; el Excel es solo una exportación).
+    :param destino: Ruta del libro (se reemplaza de forma atómica) o archivo en memoria (BytesIO).
+    :return: Cantidad de órdenes exportadas.
+    """
+    orders_df = load_ordenes_extraidas(store_file)
+    if isinstance(destino, str):
+        _save_workbook_atomic(destino, lambda path: orders_df.to_excel(path, index=False, engine='openpyxl'))
+    else:
+        orders_df.to_excel(destino, index=False, engine='openpyxl')
+    return len(orders_df)
+
+
+def _init_extraction_worker():
+    """
+    Inicializador de cada proceso de trabajo: importa pdfplumber una sola vez
+    para no pagar el costo de importación en cada documento.
+    """
+    global _EN_PROCESO_DE_TRABAJO
+    _EN_PROCESO_DE_TRABAJO = True
+    import pdfplumber  # noqa: F401
+
+
+def _read_status_mb(campo):
+    """
+    Devuelve en MB un campo de memoria de /proc/self/status (p. ej. "VmRSS:") o None si
+    no se puede leer (sistemas distintos de Linux).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith(campo):
+                    return int(linea.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _read_peak_rss_mb():
+    """
+    Devuelve el máximo de memoria residente del proceso en MB (VmHWM en Linux; en otros
+    sistemas, ru_maxrss, que es el máximo desde que inició el proceso) o None si no se puede medir.
+    """
+    maximo = _read_status_mb("VmHWM:")
+    if maximo is not None or resource is None:
+        return maximo
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return maximo / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024)
+
+
+def _start_rss_measure():
+    """
+    Inicia la medición de memoria de un documento: reinicia el máximo de memoria residente
+    del proceso (solo Linux, vía /proc/self/clear_refs) y devuelve la memoria de partida en MB.
+    Solo se mide en los procesos de trabajo: en el proceso del servidor (modo serial) el
+    reinicio alteraría sus propios contadores y devuelve None.
+    """
+    if not _EN_PROCESO_DE_TRABAJO:
+        return None
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        # Sin reinicio posible: se mide cuánto sube el máximo histórico del proceso
+        return _read_peak_rss_mb()
+    return _read_status_mb("VmRSS:")
+
+
+def _rss_increase_mb(inicio):
+    """
+    Devuelve cuánto subió el pico de memoria residente sobre la memoria de partida
+    (ver _start_rss_measure), en MB, o None si no se midió. La memoria heredada del
+    proceso padre al crear el proceso de trabajo queda dentro de la de partida.
+    """
+    if inicio is None:
+        return None
+    pico = _read_peak_rss_mb()
+    return None if pico is None else round(max(pico - inicio, 0.0), 1)
+
+
+def _extract_fields_from_bytes(task, incremental=False, total_from_end=False, backend=None, keep_texts=False,
+                               layout=False, split_orders=False):
+    """
+    Ejecuta la extracción de campos sobre el contenido en bytes de un PDF.
+    Los objetos UploadedFile de Streamlit no se pueden enviar a otros procesos,
+    por lo que se transfieren solo los bytes.
+    :param task: Contenido del PDF o tupla (contenido, [inicio, fin)) para extraer solo
+        un segmento de páginas (una de las órdenes de un PDF con varias).
+    :param split_orders: Detectar primero las órdenes del PDF; si hay más de una, no se extrae
+        nada y los segmentos se devuelven en stats["segmentos"] para extraerlos por separado.
+    :return: Tupla (datos extraídos o None, estadísticas de páginas y aumento del pico de
+        memoria "rss_pico_mb", texto de cada página o None).
+    """
+    content, pages = task if isinstance(task, tuple) else (task, None)
+    stats = {}
+    page_texts = [] if keep_texts else None
+    rss_inicio = _start_rss_measure()
+
+    paginas_segmentacion = 0
+    if split_orders and pages is None:
+        segment_stats = {}
+        segments = split_pdf_orders(BytesIO(content), backend, segment_stats)
+        if segments:
+            paginas_segmentacion = segment_stats["paginas_leidas"]
+            if len(segments) > 1:
+                stats.update(segment_stats, segmentos=segments, rss_pico_mb=_rss_increase_mb(rss_inicio))
+                return None, stats, None
+
+    datos = extract_fields_from_pdf(
+        BytesIO(content), incremental, total_from_end, stats, backend, page_texts=page_texts,
+        layout=layout, pages=pages
+    )
+    if split_orders and pages is None and paginas_segmentacion:
+        # PDF con una sola orden: se registra para no volver a segmentarlo
+        stats["segmentos"] = segments
+        stats["paginas_leidas"] = stats.get("paginas_leidas", 0) + paginas_segmentacion
+    stats["rss_pico_mb"] = _rss_increase_mb(rss_inicio)
+    return datos, stats, page_texts
+
+
+def _cache_key(file_hash, layout, pages=None, backend=None, incremental=False, total_from_end=False):
+    """
+    Clave de la caché de extracción: los resultados por plantilla se guardan aparte
+    (y se invalidan si cambian los recuadros de las plantillas), y cada orden de un PDF
+    con varias se guarda con su rango de páginas. El backend de texto y los modos
+    incremental y total desde el final también forman parte de la clave, porque pueden
+    dar resultados distintos para el mismo PDF.
+    """
+    key = f"{file_hash}_{LAYOUT_TEMPLATES_FINGERPRINT}" if layout else file_hash
+    if backend:
+        key = f"{key}_{backend}"
+    if incremental:
+        key = f"{key}_incremental"
+    if total_from_end:
+        key = f"{key}_total_final"
+    if pages is not None:
+        key = f"{key}_{pages[0]}-{pages[1]}"
+    return key
+
+
+def _segments_key(file_hash):
+    """
+    Clave de la caché donde se guardan los segmentos (órdenes) detectados en un PDF.
+    """
+    return f"{file_hash}_segmentos"
+
+
+def _segment_info(numero, segments):
+    """
+    Describe el segmento de un resultado: número de orden dentro del PDF y páginas (desde 1).
+    """
+    inicio, fin = segments[numero]
+    return {"numero": numero + 1, "total": len(segments), "pagina_inicial": inicio + 1, "pagina_final": fin}
+
+
+def format_result_name(resultado):
+    """
+    Nombre a mostrar para un resultado de iter_extract_batch: en los PDFs con varias
+    órdenes de compra indica cuál es y en qué páginas está.
+    """
+    segmento = resultado["segmento"]
+    if not segmento:
+        return resultado["nombre"]
+    return (
+        f"{resultado['nombre']} (OC {segmento['numero']} de {segmento['total']}, "
+        f"págs. {segmento['pagina_inicial']}-{segmento['pagina_final']})"
+    )
+
+
+def _build_result(nombre, file_hash, datos, stats, desde_cache, processed_orders, user_id, segmento=None):
+    """
+    Arma el resultado de un documento (o de una orden dentro de un PDF con varias) y
+    valida la duplicidad de su orden de compra.
+    """
+    resultado = {
+        "nombre": nombre,
+        "hash": file_hash,
+        "estado": "error",
+        "motivo": None,
+        "datos": None,
+        "datos_duplicado": None,
+        "desde_cache": desde_cache,
+        "paginas_leidas": stats.get("paginas_leidas", 0),
+        "paginas_totales": stats.get("paginas_totales", 0),
+        "rss_pico_mb": stats.get("rss_pico_mb"),
+        "plantilla": stats.get("plantilla"),
+        "error_backend": stats.get("error_backend"),
+        "segmento": segmento,
+    }
+    if datos is not None:
+        registrados = register_extracted_order(datos, processed_orders, user_id)
+        resultado["estado"] = "ok" if registrados is not None else "duplicado"
+        resultado["datos"] = registrados
+        if registrados is None:
+            # Los datos de una orden ya guardada permiten detectar que cambió su estado
+            resultado["datos_duplicado"] = datos
+    else:
+        if stats.get("sin_texto"):
+            # PDF escaneado: no es un error de lectura, va a la cola de ingreso manual
+            resultado["estado"] = "manual"
+        resultado["motivo"] = stats.get("error") or "No se pudo leer el PDF"
+    return resultado
+
+
+def _iter_windows(documents, max_docs=EXTRACTION_WINDOW_DOCS, max_bytes=EXTRACTION_WINDOW_BYTES):
+    """
+    Agrupa un iterable de documentos en ventanas acotadas por cantidad y tamaño.
+    """
+    ventana = []
+    tamano = 0
+    for documento in documents:
+        ventana.append(documento)
+        tamano += len(documento[1])
+        if len(ventana) >= max_docs or tamano >= max_bytes:
+            yield ventana
+            ventana = []
+            tamano = 0
+    if ventana:
+        yield ventana
+
+
+def _get_pool_executor(pool, pendientes, min_batch=MIN_PARALLEL_BATCH):
+    """
+    Devuelve el pool de procesos del lote (creándolo la primera vez) o None si la
+    ventana se debe procesar en serie.
+    """
+    if pool["max_workers"] <= 1 or pendientes < min_batch:
+        return None
+    if pool["executor"] is None:
+        try:
+            pool["executor"] = ProcessPoolExecutor(
+                max_workers=pool["max_workers"], initializer=_init_extraction_worker
+            )
+        except (OSError, RuntimeError, NotImplementedError) as e:
+            print(f"Advertencia: no se pudo iniciar la extracción en paralelo ({e}). Procesando en modo serial.")
+            pool["max_workers"] = 1
+            return None
+    return pool["executor"]
+
+
+def _iter_extract(contents, extractor, pool, min_batch=MIN_PARALLEL_BATCH):
+    """
+    Extrae los contenidos y entrega cada resultado apenas está listo, en el orden de entrada.
+    Usa el pool de procesos si la ventana es suficientemente grande (al menos min_batch
+    documentos); si el pool falla, continúa en serie con los documentos que faltan.
+    """
+    if pool["aislado"] is not None:
+        # Cada documento en un proceso aislado, con tiempo límite y límite de memoria
+        yield from pool["aislado"].imap(contents)
+        return
+
+    executor = _get_pool_executor(pool, len(contents), min_batch)
+    if executor is not None:
+        entregados = 0
+        try:
+            # executor.map conserva el orden de entrada y entrega los resultados a medida que terminan
+            for resultado in executor.map(extractor, contents):
+                entregados += 1
+                yield resultado
+            return
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # Entornos sin soporte para procesos (o un proceso caído): continuar en serie
+            print(f"Advertencia: la extracción en paralelo falló ({e}). Procesando en modo serial.")
+            executor.shutdown(wait=False, cancel_futures=True)
+            pool["executor"] = None
+            pool["max_workers"] = 1
+            contents = contents[entregados:]
+
+    for content in contents:
+        yield extractor(content)
+
+
+def iter_extract_batch(documents, processed_orders, user_id=None, max_workers=None, cache_dir=None,
+                       incremental=False, total_from_end=False, backend=None, text_store_dir=None,
+                       isolated=False, layout=False, split_orders=False):
+    """
+    Extrae los datos de un lote de PDFs y entrega el resultado de cada documento apenas
+    termina, en el orden de subida, para poder mostrar el avance mientras se procesa.
+    La validación de duplicidad se aplica en ese mismo orden, por lo que el resultado es
+    idéntico al del modo serial.
+
+    Args:
+        documents (iterable): Tuplas (nombre, contenido_en_bytes) o (nombre, contenido, hash)
+            si el hash ya se calculó. Puede ser un generador: se consume por ventanas
+            (EXTRACTION_WINDOW_DOCS / EXTRACTION_WINDOW_BYTES) para acotar la memoria.
+        processed_orders (set): Conjunto de órdenes de compra ya procesadas.
+        user_id (str, optional): Usuario que procesa los archivos.
+        max_workers (int, optional): Número de procesos; por defecto MAX_EXTRACTION_WORKERS.
+        cache_dir (str, optional): Carpeta de caché de extracción (ver get_extraction_cache_dir).
+            Los documentos ya presentes en la caché no se vuelven a leer.
+        incremental (bool): Leer página por página y detenerse al encontrar todos los campos.
+        total_from_end (bool): En modo incremental, buscar el Total desde la última página.
+        backend (str, optional): Backend de texto; por defecto DEFAULT_TEXT_BACKEND.
+        text_store_dir (str, optional): Carpeta donde guardar el texto de cada PDF leído
+            (ver get_text_store_dir), para poder volver a aplicar las reglas sin leerlo.
+        isolated (bool): Extraer cada documento en un proceso aislado con tiempo límite y
+            límite de memoria (ver IsolatedExtractionPool): un PDF que cuelga o hace caer el
+            proceso solo marca ese documento como error.
+        layout (bool): Buscar cada campo solo en su recuadro según las plantillas de posiciones
+            (utils/layout_templates.py); los PDFs que no siguen ninguna se leen completos.
+            Sus resultados se guardan en la caché por separado, ya que el texto de un recuadro
+            no arrastra el de las líneas vecinas.
+        split_orders (bool): Detectar los PDFs que contienen varias órdenes de compra y entregar
+            un resultado por orden (ver split_pdf_orders). Las órdenes de un mismo PDF se extraen
+            en paralelo y cada una pasa por la validación de duplicidad por separado. Requiere
+            leer todas las páginas de cada PDF; los resultados posteriores a un PDF con varias
+            órdenes se entregan cuando termina la ventana, para conservar el orden.
+
+    Yields:
+        dict: Un diccionario por documento (o por orden, en los PDFs con varias) con las claves
+        "nombre", "hash", "estado" ("ok", "duplicado", "error" o "manual" si el PDF no tiene
+        capa de texto), "motivo" (causa del error o None), "datos", "datos_duplicado" (datos
+        leídos de una orden duplicada, para detectar cambios de estado; None en los demás casos),
+        "desde_cache", "paginas_leidas", "paginas_totales", "rss_pico_mb" (cuánto subió
+        la memoria residente del proceso de trabajo al leer el PDF, en MB; None si vino de la
+        caché, se leyó en modo serial o no se pudo medir),
+        "plantilla" (plantilla de posiciones usada o None) y "segmento" (None o, en los PDFs con
+        varias órdenes, {"numero", "total", "pagina_inicial", "pagina_final"}).
+    """
+    if max_workers is None:
+        max_workers = MAX_EXTRACTION_WORKERS
+
+    # El backend se resuelve aquí: los procesos de trabajo no ven cambios globales hechos en este proceso
+    backend = resolve_text_backend(backend)
+    extractor = partial(
+        _extract_fields_from_bytes,
+        incremental=incremental,
+        total_from_end=total_from_end,
+        backend=backend,
+        keep_texts=text_store_dir is not None,
+        layout=layout,
+        split_orders=split_orders
+    )
+    # El pool se crea solo si alguna ventana lo justifica y se reutiliza en las siguientes
+    # Los resultados de otro backend o modo de extracción no se reutilizan
+    cache_key = partial(
+        _cache_key, layout=layout, backend=backend, incremental=incremental, total_from_end=total_from_end
+    )
+    pool = {"executor": None, "max_workers": max(1, max_workers), "aislado": None}
+    if isolated:
+        pool["aislado"] = IsolatedExtractionPool(
+            extractor, max_workers=pool["max_workers"], initializer=_init_extraction_worker
+        )
+    indice_textos = {}
+    hubo_lecturas = False
+
+    def guardar(nombre, file_hash, datos, page_texts, pages=None):
+        if cache_dir and datos is not None:
+            store_cached_extraction(cache_dir, cache_key(file_hash, pages=pages), datos)
+        # Con plantilla de posiciones no hay texto completo (page_texts queda vacío)
+        if text_store_dir and datos is not None and page_texts:
+            clave_texto = file_hash if pages is None else f"{file_hash}_{pages[0]}-{pages[1]}"
+            store_page_texts(text_store_dir, clave_texto, page_texts)
+            indice_textos[clave_texto] = {"nombre": nombre, "orden_de_compra": datos.get("Orden de Compra")}
+
+    try:
+        for ventana in _iter_windows(documents):
+            hashes = [
+                documento[2] if len(documento) > 2 else compute_content_hash(documento[1])
+                for documento in ventana
+            ]
+
+            # Consultar la caché antes de leer ningún PDF de la ventana
+            cacheados = {}
+            segmentos = {}  # índice -> rangos de páginas de los PDFs con varias órdenes
+            pendientes = []
+            for i, file_hash in enumerate(hashes):
+                if split_orders:
+                    rangos = get_cached_extraction(cache_dir, _segments_key(file_hash)) if cache_dir else None
+                    if rangos is None:
+                        # Nunca se segmentó: se lee aunque exista su resultado como documento completo
+                        pendientes.append(i)
+                        continue
+                    if len(rangos) > 1:
+                        segmentos[i] = rangos
+                        continue
+                datos = get_cached_extraction(cache_dir, cache_key(file_hash)) if cache_dir else None
+                if datos is not None:
+                    cacheados[i] = datos
+                else:
+                    pendientes.append(i)
+            hubo_lecturas = hubo_lecturas or bool(pendientes) or bool(segmentos)
+
+            # Primera pasada: un trabajo por PDF. Desde el primer PDF con varias órdenes, los
+            # resultados se guardan en "diferidos" hasta extraer sus órdenes en la segunda pasada
+            diferidos = {}
+            primer_diferido = min(segmentos) if segmentos else None
+            deteccion = {}  # índice -> estadísticas de la segmentación
+            nuevos = _iter_extract([ventana[i][1] for i in pendientes], extractor, pool)
+            try:
+                for i, (documento, file_hash) in enumerate(zip(ventana, hashes)):
+                    nombre = documento[0]
+                    if i in segmentos:
+                        continue
+                    stats = {}
+                    if i in cacheados:
+                        datos = cacheados[i]
+                    else:
+                        datos, stats, page_texts = next(nuevos)
+                        rangos = stats.get("segmentos")
+                        if cache_dir and rangos:
+                            store_cached_extraction(cache_dir, _segments_key(file_hash), rangos)
+                        if rangos and len(rangos) > 1:
+                            segmentos[i] = rangos
+                            deteccion[i] = stats
+                            if primer_diferido is None or i < primer_diferido:
+                                primer_diferido = i
+                            continue
+                        guardar(nombre, file_hash, datos, page_texts)
+
+                    if primer_diferido is not None and i > primer_diferido:
+                        diferidos[i] = [(datos, stats, i in cacheados, None)]
+                    else:
+                        yield _build_result(nombre, file_hash, datos, stats, i in cacheados, processed_orders, user_id)
+            finally:
+                nuevos.close()
+
+            if not segmentos:
+                continue
+
+            # Segunda pasada: las órdenes de los PDFs con varias, todas en paralelo
+            tareas = []
+            for i, rangos in sorted(segmentos.items()):
+                diferidos[i] = []
+                for numero, rango in enumerate(rangos):
+                    datos = None
+                    if cache_dir and i not in deteccion:
+                        datos = get_cached_extraction(cache_dir, cache_key(hashes[i], pages=rango))
+                    diferidos[i].append((datos, {}, datos is not None, numero))
+                    if datos is None:
+                        tareas.append((i, numero, rango))
+            hubo_lecturas = hubo_lecturas or bool(tareas)
+
+            nuevos = _iter_extract(
+                [(ventana[i][1], rango) for i, _, rango in tareas], extractor, pool, min_batch=2
+            )
+            try:
+                for i, numero, rango in tareas:
+                    datos, stats, page_texts = next(nuevos)
+                    if numero == 0 and i in deteccion:
+                        # La lectura completa para detectar las órdenes se atribuye a la primera
+                        stats["paginas_leidas"] = stats.get("paginas_leidas", 0) + deteccion[i]["paginas_leidas"]
+                    guardar(f"{ventana[i][0]} (págs. {rango[0] + 1}-{rango[1]})", hashes[i], datos, page_texts, rango)
+                    diferidos[i][numero] = (datos, stats, False, numero)
+            finally:
+                nuevos.close()
+
+            for i in range(primer_diferido, len(ventana)):
+                for datos, stats, desde_cache, numero in diferidos.get(i, []):
+                    segmento = None if numero is None else _segment_info(numero, segmentos[i])
+                    yield _build_result(
+                        ventana[i][0], hashes[i], datos, stats, desde_cache, processed_orders, user_id, segmento
+                    )
+    finally:
+        # También se ejecuta si el lote se interrumpe: lo ya leído queda en la caché y el índice
+        if pool["aislado"] is not None:
+            pool["aislado"].close()
+        if pool["executor"] is not None:
+            # Si el consumidor abandona el lote (p. ej. una recarga de Streamlit) no esperar a los pendientes
+            pool["executor"].shutdown(wait=False, cancel_futures=True)
+        if text_store_dir:
+            update_text_store_index(text_store_dir, indice_textos)
+        if cache_dir and hubo_lecturas:
+            evict_extraction_cache(cache_dir)
+
+
+def extract_batch(documents, processed_orders, user_id=None, max_workers=None, cache_dir=None,
+                  incremental=False, total_from_end=False, backend=None, text_store_dir=None,
+                  isolated=False, layout=False, split_orders=False):
+    """
+    Extrae los datos de un lote de PDFs, en paralelo si hay más de un proceso disponible.
+    Recibe los mismos argumentos que iter_extract_batch.
+
+    Returns:
+        list: Un diccionario por documento, en el orden de entrada (ver iter_extract_batch).
+    """
+    return list(iter_extract_batch(
+        documents, processed_orders, user_id, max_workers, cache_dir,
+        incremental, total_from_end, backend, text_store_dir, isolated, layout, split_orders
+    ))
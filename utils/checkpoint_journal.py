@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+# Bitácora (dentro del directorio de datos de cada usuario) con el avance del lote en curso
+CHECKPOINT_FILENAME = "lote_en_curso.jsonl"
+
+# Cantidad de documentos entre cada escritura de la bitácora (variable de entorno OC_CHECKPOINT_DOCS)
+CHECKPOINT_EVERY_DOCS = max(1, int(os.environ.get("OC_CHECKPOINT_DOCS", 10)))
+
+
+def get_checkpoint_file(user_data_path):
+    """
+    Devuelve la ruta de la bitácora del lote en curso de un usuario.
+    """
+    return os.path.join(user_data_path, CHECKPOINT_FILENAME)
+
+
+def batch_id(file_hashes):
+    """
+    Identifica un lote por el conjunto de archivos subidos (independiente del orden de subida).
+    """
+    return hashlib.md5("\n".join(sorted(file_hashes)).encode("utf-8")).hexdigest()
+
+
+def _read_header(journal_file):
+    try:
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def load_checkpoint(journal_file, lote, opciones):
+    """
+    Carga los resultados guardados en la bitácora si corresponden al mismo lote y a las
+    mismas opciones de extracción.
+    Una línea incompleta al final (el proceso se detuvo mientras escribía) se ignora.
+    :return: Tupla (hash del PDF -> lista de resultados de iter_extract_batch, uno por orden;
+        hash del PDF -> hash del archivo subido que lo contiene).
+    """
+    resultados = {}
+    origenes = {}
+    if not os.path.exists(journal_file):
+        return resultados, origenes
+    try:
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            encabezado = json.loads(f.readline() or "null")
+            if not encabezado or encabezado.get("lote") != lote or encabezado.get("opciones") != list(opciones):
+                return resultados, origenes
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    continue
+                resultados[entrada["hash"]] = entrada["resultados"]
+                origenes[entrada["hash"]] = entrada["origen"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Advertencia: no se pudo leer la bitácora del lote: {e}")
+        return {}, {}
+    return resultados, origenes
+
+
+class CheckpointJournal:
+    """
+    Escritor de la bitácora del lote en curso: acumula los resultados de cada PDF y los
+    escribe en disco cada `every` documentos, de modo que si el lote se interrumpe (recarga
+    del navegador, caída del servidor) al retomarlo solo se procesan los PDFs que faltan.
+    Si la bitácora existente es de otro lote u otras opciones, se reemplaza.
+    """
+
+    def __init__(self, journal_file, lote, opciones, every=CHECKPOINT_EVERY_DOCS):
+        self.journal_file = journal_file
+        self.every = max(1, every)
+        self._pendientes = []
+        encabezado = _read_header(journal_file)
+        if not encabezado or encabezado.get("lote") != lote or encabezado.get("opciones") != list(opciones):
+            os.makedirs(os.path.dirname(journal_file) or ".", exist_ok=True)
+            with open(journal_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    "lote": lote,
+                    "opciones": list(opciones),
+                    "creado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                }, ensure_ascii=False) + "\n")
+        else:
+            # Si el proceso anterior se detuvo a mitad de una línea, cerrarla para no corromper la siguiente
+            with open(journal_file, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def add(self, file_hash, origen, resultados):
+        """
+        Registra los resultados de un PDF (y el archivo subido que lo contiene, p. ej. su ZIP);
+        escribe la bitácora al completar `every` documentos.
+        """
+        self._pendientes.append({"hash": file_hash, "origen": origen, "resultados": resultados})
+        if len(self._pendientes) >= self.every:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe en disco los resultados acumulados.
+        """
+        if not self._pendientes:
+            return
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                for entrada in self._pendientes:
+                    f.write(json.dumps(entrada, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pendientes = []
+        except OSError as e:
+            print(f"Advertencia: no se pudo escribir la bitácora del lote: {e}")
+
+
+def clear_checkpoint(journal_file):
+    """
+    Elimina la bitácora una vez que los resultados del lote se guardaron en el perfil.
+    """
+    try:
+        os.remove(journal_file)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Advertencia: no se pudo eliminar la bitácora del lote: {e}")
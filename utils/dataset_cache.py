@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Memoria máxima de la caché de datos compartida por todas las sesiones del proceso
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("OC_DATASET_CACHE_MB", 256)) * 1024 * 1024
+
+# (ruta, función, argumentos) -> (versión del archivo, datos, bytes estimados), del menos
+# al más recientemente usado
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+def _file_version(path):
+    """
+    Versión de un archivo según su fecha de modificación y su tamaño. En una base SQLite en
+    modo WAL las escrituras quedan primero en el archivo -wal, que también se considera.
+    """
+    version = []
+    for ruta in (path, f"{path}-wal"):
+        try:
+            stat = os.stat(ruta)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def _estimate_size(valor):
+    """
+    Memoria aproximada de los datos cargados (DataFrames, listas y diccionarios de JSON).
+    """
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_estimate_size(k) + _estimate_size(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_estimate_size(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def _copy_on_write():
+    """
+    Indica si pandas tiene activa la copia al escribir (siempre desde pandas 3; en pandas 2
+    solo si se activó la opción mode.copy_on_write).
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+
+def _share(valor):
+    """
+    Copia que se entrega a quien pide los datos: las páginas renombran columnas, asignan
+    valores en su lugar (df.loc[...] = ..., inplace=True) o modifican diccionarios, y eso no
+    debe alterar lo guardado para las demás sesiones. Con copia al escribir los DataFrames
+    se copian sin duplicar sus datos; sin ella (pandas 2 por defecto), una copia superficial
+    comparte los datos con la caché, por lo que se copian completos.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy(deep=not _copy_on_write())
+    if isinstance(valor, dict):
+        return {k: _share(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_share(v) for v in valor]
+    return valor
+
+
+def _evict(max_bytes):
+    global _cache_bytes
+    while _cache and _cache_bytes > max_bytes:
+        _, (_, _, tamano) = _cache.popitem(last=False)
+        _cache_bytes -= tamano
+
+
+def load_cached(path, loader, *args, **kwargs):
+    """
+    Devuelve loader(path, *args, **kwargs) desde la caché compartida por todas las páginas y
+    sesiones del proceso. Los datos se vuelven a cargar cuando el archivo cambia (fecha de
+    modificación y tamaño) o cuando quien lo escribe llama a invalidate_cache. Al superar
+    DATASET_CACHE_MAX_BYTES se descartan los datos usados hace más tiempo.
+
+    Args:
+        path (str): Archivo del que dependen los datos (libro Excel, JSON o base SQLite).
+        loader (callable): Función que carga los datos; recibe path como primer argumento.
+
+    Returns:
+        Lo que devuelve loader (una copia independiente para cada llamada).
+    """
+    global _cache_bytes
+    # Los argumentos pueden incluir listas (p. ej. columnas): se comparan por su representación
+    clave = (os.path.abspath(path), f"{loader.__module__}.{loader.__qualname__}", repr((args, sorted(kwargs.items()))))
+    version = _file_version(path)
+    with _lock:
+        guardado = _cache.get(clave)
+        if guardado and guardado[0] == version:
+            _cache.move_to_end(clave)
+            return _share(guardado[1])
+
+    datos = loader(path, *args, **kwargs)
+    tamano = _estimate_size(datos)
+    if tamano <= DATASET_CACHE_MAX_BYTES:
+        with _lock:
+            anterior = _cache.pop(clave, None)
+            if anterior:
+                _cache_bytes -= anterior[2]
+            _cache[clave] = (version, datos, tamano)
+            _cache_bytes += tamano
+            _evict(DATASET_CACHE_MAX_BYTES)
+    return _share(datos)
+
+
+def invalidate_cache(path):
+    """
+    Descarta los datos guardados de un archivo. La llaman quienes lo escriben, para que la
+    siguiente lectura no dependa de la resolución de la fecha de modificación.
+    """
+    global _cache_bytes
+    ruta = os.path.abspath(path)
+    with _lock:
+        for clave in [clave for clave in _cache if clave[0] == ruta]:
+            _cache_bytes -= _cache.pop(clave)[2]
+
+
+def read_json_file(path):
+    """
+    Lee un archivo JSON (para usar con load_cached).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
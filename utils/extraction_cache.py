@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import shutil
+
+from utils.pdf_extraction import EXTRACTION_RULES_FINGERPRINT
+
+# Nombre de la carpeta de caché dentro del directorio de datos de cada usuario
+EXTRACTION_CACHE_DIRNAME = "cache_extraccion"
+
+# Límites de la caché: tamaño total en disco y antigüedad máxima de cada entrada
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_MAX_AGE_DAYS = 90
+
+
+def get_extraction_cache_dir(user_data_path):
+    """
+    Devuelve la carpeta de caché de extracción para las reglas vigentes.
+    Cada versión de las reglas usa su propia subcarpeta, de modo que un cambio en
+    los patrones invalida automáticamente los resultados anteriores.
+    """
+    return os.path.join(user_data_path, EXTRACTION_CACHE_DIRNAME, EXTRACTION_RULES_FINGERPRINT)
+
+
+def _entry_path(cache_dir, file_hash):
+    return os.path.join(cache_dir, f"{file_hash}.json")
+
+
+def get_cached_extraction(cache_dir, file_hash, max_age_days=CACHE_MAX_AGE_DAYS):
+    """
+    Busca en la caché el resultado de extract_fields_from_pdf para un hash de contenido.
+    :return: Diccionario con los datos extraídos o None si no hay una entrada vigente.
+    """
+    path = _entry_path(cache_dir, file_hash)
+    try:
+        if time.time() - os.path.getmtime(path) > max_age_days * 86400:
+            os.remove(path)
+            return None
+
+        with open(path, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+
+        # Marcar la entrada como usada recientemente (la expulsión elimina primero las más antiguas)
+        os.utime(path, None)
+        return datos
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: entrada de caché inválida para {file_hash}: {e}")
+        return None
+
+
+def store_cached_extraction(cache_dir, file_hash, datos):
+    """
+    Guarda en la caché el resultado de extract_fields_from_pdf para un hash de contenido.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _entry_path(cache_dir, file_hash)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Advertencia: no se pudo guardar la caché de extracción: {e}")
+
+
+def evict_extraction_cache(cache_dir, max_bytes=CACHE_MAX_BYTES, max_age_days=CACHE_MAX_AGE_DAYS):
+    """
+    Depura la caché: elimina las carpetas de reglas antiguas, las entradas vencidas y,
+    si se supera el tamaño máximo, las entradas usadas hace más tiempo.
+    :return: Número de entradas eliminadas.
+    """
+    eliminadas = 0
+    base_dir = os.path.dirname(cache_dir)
+    if not os.path.isdir(base_dir):
+        return eliminadas
+
+    # Eliminar cachés generadas con reglas de extracción anteriores
+    for nombre in os.listdir(base_dir):
+        ruta = os.path.join(base_dir, nombre)
+        if os.path.isdir(ruta) and ruta != cache_dir:
+            shutil.rmtree(ruta, ignore_errors=True)
+
+    if not os.path.isdir(cache_dir):
+        return eliminadas
+
+    ahora = time.time()
+    entradas = []
+    for nombre in os.listdir(cache_dir):
+        ruta = os.path.join(cache_dir, nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            continue
+        if ahora - info.st_mtime > max_age_days * 86400:
+            os.remove(ruta)
+            eliminadas += 1
+        else:
+            entradas.append((info.st_mtime, info.st_size, ruta))
+
+    # Expulsar las entradas menos usadas hasta respetar el tamaño máximo
+    total = sum(tamano for _, tamano, _ in entradas)
+    for _, tamano, ruta in sorted(entradas):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(ruta)
+            eliminadas += 1
+            total -= tamano
+        except OSError:
+            pass
+
+    return eliminadas
@@ -0,0 +1,214 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # Windows: sin límite de memoria por proceso (solo tiempo límite y aislamiento)
+    resource = None
+
+# Tiempo máximo (segundos) para extraer un documento antes de terminar su proceso
+EXTRACTION_TIMEOUT_SECONDS = float(os.environ.get("OC_EXTRACTION_TIMEOUT", 120))
+
+# Memoria (MB de espacio de direcciones) que cada proceso de extracción puede reservar además
+# de la que ya ocupa al iniciarse; 0 = sin límite
+EXTRACTION_MEMORY_LIMIT_MB = int(os.environ.get("OC_EXTRACTION_MEMORY_MB", 2048))
+
+
+def _address_space_bytes():
+    """
+    Espacio de direcciones actual del proceso (VmSize), o None si no se puede medir.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _apply_memory_limit(memory_limit_mb):
+    """
+    Limita el espacio de direcciones del proceso actual (solo en sistemas con el módulo resource).
+    Un proceso creado con fork hereda el espacio de direcciones del servidor (bibliotecas,
+    hilos, pyarrow), que puede superar por sí solo el presupuesto: el límite es lo que el
+    proceso ya ocupa más memory_limit_mb.
+    """
+    if resource is None or not memory_limit_mb:
+        return
+    actual = _address_space_bytes()
+    if actual is None:
+        print("Advertencia: no se pudo medir la memoria del proceso de extracción; se extrae sin límite de memoria.")
+        return
+    limite = actual + memory_limit_mb * 1024 * 1024
+    try:
+        _, maximo = resource.getrlimit(resource.RLIMIT_AS)
+        if maximo != resource.RLIM_INFINITY:
+            limite = min(limite, maximo)
+        resource.setrlimit(resource.RLIMIT_AS, (limite, maximo))
+    except (ValueError, OSError) as e:
+        print(f"Advertencia: no se pudo aplicar el límite de memoria: {e}")
+
+
+def _failure(motivo):
+    """
+    Resultado de un documento que no se pudo extraer, con el mismo formato que el extractor.
+    """
+    return None, {"error": motivo}, None
+
+
+def _worker_main(conn, extractor, memory_limit_mb, initializer):
+    """
+    Bucle de un proceso de extracción: recibe contenidos por la tubería y devuelve resultados.
+    """
+    _apply_memory_limit(memory_limit_mb)
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            contenido = conn.recv()
+        except (EOFError, OSError):
+            break
+        if contenido is None:
+            break
+        try:
+            resultado = extractor(contenido)
+        except MemoryError:
+            resultado = _failure(f"Memoria insuficiente (límite de {memory_limit_mb} MB adicionales)")
+        except Exception as e:
+            resultado = _failure(f"{type(e).__name__}: {e}")
+        try:
+            conn.send(resultado)
+        except MemoryError:
+            conn.send(_failure(f"Memoria insuficiente (límite de {memory_limit_mb} MB adicionales)"))
+
+
+class _Worker:
+    """
+    Proceso de extracción reutilizable, comunicado por una tubería propia.
+    """
+
+    def __init__(self, extractor, memory_limit_mb, initializer):
+        self.conn, conn_hijo = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(conn_hijo, extractor, memory_limit_mb, initializer), daemon=True
+        )
+        self.process.start()
+        conn_hijo.close()
+        self.tarea = None  # (índice, plazo) del documento en curso
+
+    def terminate(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def shutdown(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        self.terminate()
+
+
+class IsolatedExtractionPool:
+    """
+    Conjunto de procesos de extracción aislados. Cada documento tiene un tiempo límite y cada
+    proceso un límite de memoria; si un documento cuelga, agota la memoria o hace caer el proceso,
+    solo ese documento falla (con el motivo) y el proceso se reemplaza por uno nuevo.
+    """
+
+    def __init__(self, extractor, max_workers=1, timeout=EXTRACTION_TIMEOUT_SECONDS,
+                 memory_limit_mb=EXTRACTION_MEMORY_LIMIT_MB, initializer=None):
+        self._extractor = extractor
+        self._max_workers = max(1, max_workers)
+        self._timeout = timeout
+        self._memory_limit_mb = memory_limit_mb
+        self._initializer = initializer
+        self._workers = []
+
+    def _free_worker(self):
+        for worker in self._workers:
+            if worker.tarea is None:
+                return worker
+        if len(self._workers) < self._max_workers:
+            worker = _Worker(self._extractor, self._memory_limit_mb, self._initializer)
+            self._workers.append(worker)
+            return worker
+        return None
+
+    def _replace(self, worker):
+        worker.terminate()
+        self._workers.remove(worker)
+
+    def imap(self, contents):
+        """
+        Extrae los contenidos y entrega cada resultado (datos, estadísticas, textos) en el orden
+        de entrada. Los documentos fallidos entregan (None, {"error": motivo}, None).
+        """
+        pendientes = deque(enumerate(contents))
+        listos = {}
+        siguiente = 0
+
+        while siguiente < len(contents):
+            if siguiente in listos:
+                yield listos.pop(siguiente)
+                siguiente += 1
+                continue
+
+            # Repartir documentos a los procesos libres
+            while pendientes:
+                worker = self._free_worker()
+                if worker is None:
+                    break
+                indice, contenido = pendientes.popleft()
+                plazo = time.monotonic() + self._timeout if self._timeout else None
+                try:
+                    worker.conn.send(contenido)
+                    worker.tarea = (indice, plazo)
+                except (OSError, ValueError):
+                    listos[indice] = _failure("El proceso de extracción no está disponible")
+                    self._replace(worker)
+
+            ocupados = [worker for worker in self._workers if worker.tarea is not None]
+            if not ocupados:
+                continue
+
+            plazos = [worker.tarea[1] for worker in ocupados if worker.tarea[1] is not None]
+            espera = max(0.0, min(plazos) - time.monotonic()) if plazos else None
+            wait([worker.conn for worker in ocupados] + [worker.process.sentinel for worker in ocupados], espera)
+
+            ahora = time.monotonic()
+            for worker in ocupados:
+                indice, plazo = worker.tarea
+                tuberia_cerrada = False
+                if worker.conn.poll():
+                    try:
+                        listos[indice] = worker.conn.recv()
+                        worker.tarea = None
+                        continue
+                    except (EOFError, OSError):
+                        # El proceso terminó sin responder (p. ej. un fallo dentro de la biblioteca de PDF)
+                        tuberia_cerrada = True
+                if tuberia_cerrada or not worker.process.is_alive():
+                    worker.process.join(timeout=1)
+                    listos[indice] = _failure(
+                        f"El proceso de extracción terminó inesperadamente (código {worker.process.exitcode})"
+                    )
+                    self._replace(worker)
+                elif plazo is not None and ahora >= plazo:
+                    listos[indice] = _failure(f"Tiempo límite excedido ({self._timeout:.0f} s)")
+                    self._replace(worker)
+
+    def close(self):
+        """
+        Detiene todos los procesos; los que estén ocupados se terminan de inmediato.
+        """
+        for worker in self._workers:
+            if worker.tarea is None:
+                worker.shutdown()
+            else:
+                worker.terminate()
+        self._workers = []
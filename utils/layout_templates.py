@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+from collections import namedtuple
+
+# Región de una plantilla: campo que contiene, página (0 = primera, -1 = última) y recuadro
+# (x0, arriba, x1, abajo) expresado como fracción del ancho y alto de la página, con el
+# origen en la esquina superior izquierda (independiente del tamaño de papel).
+LayoutRegion = namedtuple("LayoutRegion", ["field", "page", "bbox"])
+
+# Plantilla de posiciones: nombre y regiones. La plantilla solo se considera válida para un PDF
+# si el patrón de cada región coincide dentro de su recuadro; si no, se usa el texto completo.
+LayoutTemplate = namedtuple("LayoutTemplate", ["name", "regions"])
+
+# Orden de compra estándar de Mercado Público: la cabecera de la primera página tiene una línea
+# por campo en posiciones fijas y el Total está en la columna derecha de la última página
+# (a una altura que depende del número de ítems, por eso la región ocupa toda la columna).
+MERCADO_PUBLICO_TEMPLATE = LayoutTemplate("mercado_publico", [
+    LayoutRegion("Orden de Compra", 0, (0.0, 0.035, 1.0, 0.057)),
+    LayoutRegion("Número Licitación", 0, (0.0, 0.059, 1.0, 0.081)),
+    LayoutRegion("Estado", 0, (0.0, 0.083, 1.0, 0.105)),
+    LayoutRegion("Proveedor", 0, (0.0, 0.107, 1.0, 0.128)),
+    LayoutRegion("RUT Proveedor", 0, (0.0, 0.131, 1.0, 0.152)),
+    LayoutRegion("Nombre Orden", 0, (0.0, 0.154, 1.0, 0.176)),
+    LayoutRegion("Fecha Envío OC", 0, (0.0, 0.178, 1.0, 0.200)),
+    LayoutRegion("Total", -1, (0.5, 0.0, 1.0, 1.0)),
+])
+
+# Plantillas conocidas, en el orden en que se prueban
+KNOWN_LAYOUT_TEMPLATES = [MERCADO_PUBLICO_TEMPLATE]
+
+# Los recuadros aún no se verificaron con OC reales: un recuadro corrido haría leer todo
+# por el camino lento o, peor, tomar un texto equivocado que pasa por válido. Las plantillas
+# quedan desactivadas salvo con la variable de entorno OC_LAYOUT_TEMPLATES=1, que conviene
+# usar solo después de que "python comparar_backends.py --plantilla carpeta_con_oc_reales"
+# muestre los mismos campos que la lectura del texto completo.
+LAYOUT_TEMPLATES_ENABLED = os.environ.get("OC_LAYOUT_TEMPLATES", "0") == "1"
+
+# Plantillas que se prueban, en orden, en el modo de extracción por posiciones
+OC_LAYOUT_TEMPLATES = KNOWN_LAYOUT_TEMPLATES if LAYOUT_TEMPLATES_ENABLED else []
+
+# Huella de las plantillas vigentes: al cambiar un recuadro, los resultados guardados con
+# las plantillas anteriores dejan de usarse
+LAYOUT_TEMPLATES_FINGERPRINT = hashlib.md5(
+    json.dumps(OC_LAYOUT_TEMPLATES, ensure_ascii=False).encode("utf-8")
+).hexdigest()[:12]
+
+
+def template_boxes_by_page(template, pages_total):
+    """
+    Agrupa las regiones de una plantilla por número de página real.
+    :return: Diccionario página -> lista de regiones (vacío si el PDF no tiene páginas).
+    """
+    boxes = {}
+    if not pages_total:
+        return boxes
+    for region in template.regions:
+        page = region.page if region.page >= 0 else pages_total + region.page
+        if 0 <= page < pages_total:
+            boxes.setdefault(page, []).append(region)
+    return boxes
@@ -0,0 +1,74 @@
+import os
+import json
+from datetime import datetime
+
+# Archivo (dentro del directorio de datos de cada usuario) con los PDFs que requieren ingreso manual
+MANUAL_QUEUE_FILENAME = "ingreso_manual.json"
+
+
+def get_manual_queue_file(user_data_path):
+    """
+    Devuelve la ruta de la cola de ingreso manual de un usuario.
+    """
+    return os.path.join(user_data_path, MANUAL_QUEUE_FILENAME)
+
+
+def load_manual_queue(queue_file):
+    """
+    Carga la cola de ingreso manual.
+    :return: Lista de entradas {"hash", "nombre", "paginas", "motivo", "fecha"}.
+    """
+    if not os.path.exists(queue_file):
+        return []
+    try:
+        with open(queue_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: no se pudo leer la cola de ingreso manual: {e}")
+        return []
+
+
+def save_manual_queue(queue_file, entries):
+    """
+    Guarda la cola de ingreso manual.
+    """
+    os.makedirs(os.path.dirname(queue_file) or ".", exist_ok=True)
+    tmp_path = f"{queue_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, queue_file)
+
+
+def add_to_manual_queue(queue_file, resultados):
+    """
+    Agrega a la cola los documentos con estado "manual" de iter_extract_batch
+    (un mismo PDF, identificado por su hash, se registra una sola vez).
+    :return: Número de documentos agregados.
+    """
+    entries = load_manual_queue(queue_file)
+    registrados = {entry["hash"] for entry in entries}
+    nuevos = 0
+    for resultado in resultados:
+        if resultado["estado"] != "manual" or resultado["hash"] in registrados:
+            continue
+        entries.append({
+            "hash": resultado["hash"],
+            "nombre": resultado["nombre"],
+            "paginas": resultado["paginas_totales"],
+            "motivo": resultado["motivo"],
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        registrados.add(resultado["hash"])
+        nuevos += 1
+    if nuevos:
+        save_manual_queue(queue_file, entries)
+    return nuevos
+
+
+def remove_from_manual_queue(queue_file, hashes):
+    """
+    Quita de la cola los documentos ya ingresados manualmente.
+    """
+    hashes = set(hashes)
+    entries = [entry for entry in load_manual_queue(queue_file) if entry["hash"] not in hashes]
+    save_manual_queue(queue_file, entries)
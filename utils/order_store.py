@@ -0,0 +1,723 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.workbook_mirror import read_workbook
+from utils.dataset_cache import invalidate_cache
+
+# Base de datos (dentro del directorio de datos de cada usuario) con las órdenes extraídas de
+# los PDFs, el control de órdenes, licitaciones, historial de gastos, certificados y cambios de
+# estado de las órdenes. Los archivos Excel y JSON (incluido ordenes_de_compra.xlsx) se generan
+# a partir de estos datos como exportaciones.
+STORE_FILENAME = "sistema_oc.db"
+
+# Archivos del control anteriores a la base de datos; se importan al crearla
+LEGACY_ORDERS_FILENAME = "control_de_ordenes_de_compra.xlsx"
+LEGACY_EXPENSES_FILENAME = "control_de_gasto_de_licitaciones.xlsx"
+LEGACY_SUMMARY_FILENAME = "resumen_control_licitaciones.json"
+LEGACY_CERTIFICATES_FILENAME = "registro_certificados.json"
+
+# Órdenes extraídas guardadas antes de la base de datos; se importan una sola vez (ver _migrate)
+LEGACY_EXTRACTED_FILENAME = "ordenes_de_compra.xlsx"
+
+# Versión del contenido de la base de datos (PRAGMA user_version): 1 = con las órdenes extraídas
+STORE_VERSION = 1
+
+# Máximo de parámetros por consulta (límite de las versiones antiguas de SQLite)
+_MAX_PARAMS = 500
+
+# Segundos de espera cuando otra sesión tiene la base de datos bloqueada para escritura
+STORE_TIMEOUT_SECONDS = 30
+
+# Cada tabla guarda la fila completa en "datos" (JSON, con las columnas en su orden original)
+# y repite en columnas propias los campos por los que se filtra, cada uno con su índice.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ordenes (
+    id INTEGER PRIMARY KEY,
+    numero_licitacion TEXT,
+    orden_de_compra TEXT,
+    rut_proveedor TEXT,
+    estado TEXT,
+    certificado TEXT,
+    usuario TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ordenes_orden_de_compra ON ordenes (orden_de_compra);
+CREATE INDEX IF NOT EXISTS idx_ordenes_numero_licitacion ON ordenes (numero_licitacion);
+CREATE INDEX IF NOT EXISTS idx_ordenes_rut_proveedor ON ordenes (rut_proveedor);
+CREATE INDEX IF NOT EXISTS idx_ordenes_estado ON ordenes (estado);
+
+CREATE TABLE IF NOT EXISTS licitaciones (
+    numero_licitacion TEXT PRIMARY KEY,
+    posicion INTEGER NOT NULL,
+    estado TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_licitaciones_estado ON licitaciones (estado);
+
+CREATE TABLE IF NOT EXISTS huellas_licitaciones (
+    numero_licitacion TEXT PRIMARY KEY,
+    huella TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS gastos_historial (
+    id INTEGER PRIMARY KEY,
+    numero_licitacion TEXT NOT NULL,
+    posicion INTEGER NOT NULL,
+    orden_de_compra TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_historial_numero_licitacion ON gastos_historial (numero_licitacion, posicion);
+CREATE INDEX IF NOT EXISTS idx_historial_orden_de_compra ON gastos_historial (orden_de_compra);
+
+CREATE TABLE IF NOT EXISTS certificados (
+    id INTEGER PRIMARY KEY,
+    orden_de_compra TEXT,
+    numero_licitacion TEXT,
+    usuario TEXT,
+    fecha_generacion TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_certificados_numero_licitacion ON certificados (numero_licitacion);
+CREATE INDEX IF NOT EXISTS idx_certificados_orden_de_compra ON certificados (orden_de_compra);
+
+CREATE TABLE IF NOT EXISTS estados_ordenes (
+    id INTEGER PRIMARY KEY,
+    orden_de_compra TEXT NOT NULL,
+    estado_anterior TEXT,
+    estado_nuevo TEXT,
+    fecha TEXT,
+    usuario TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_estados_orden_de_compra ON estados_ordenes (orden_de_compra);
+
+CREATE TABLE IF NOT EXISTS ordenes_extraidas (
+    id INTEGER PRIMARY KEY,
+    orden_de_compra TEXT,
+    numero_licitacion TEXT,
+    estado TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extraidas_orden_de_compra ON ordenes_extraidas (orden_de_compra);
+"""
+
+# Bases de datos ya inicializadas en este proceso (el esquema se crea una sola vez)
+_inicializadas = set()
+_init_lock = threading.Lock()
+
+
+def get_store_file(user_data_path):
+    """
+    Devuelve la ruta de la base de datos del control de un usuario.
+    """
+    return os.path.join(user_data_path, STORE_FILENAME)
+
+
+def _json_default(obj):
+    """
+    Convierte a JSON los tipos de pandas y numpy (las fechas quedan como AAAA-MM-DD).
+    """
+    if isinstance(obj, (datetime, pd.Timestamp)):
+        return obj.strftime('%Y-%m-%d')
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if pd.isna(obj):
+        return None
+    return str(obj)
+
+
+def _dumps(fila):
+    return json.dumps(fila, default=_json_default, ensure_ascii=False)
+
+
+def _texto(valor):
+    """
+    Valor de una columna indexada: texto sin espacios o None si está vacío.
+    """
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return str(valor).strip()
+
+
+def _sin_vacios(fila):
+    """
+    Copia de una fila (diccionario) con los valores vacíos de pandas (NaN, NaT) como None.
+    """
+    return {
+        col: (None if not isinstance(valor, (str, list, dict)) and pd.isna(valor) else valor)
+        for col, valor in fila.items()
+    }
+
+
+def _registros(df):
+    """
+    Filas de un DataFrame como diccionarios, sin los valores vacíos de pandas.
+    """
+    return [_sin_vacios(fila) for fila in df.to_dict("records")]
+
+
+def _connect(store_file, create=True):
+    """
+    Abre la base de datos creando el esquema la primera vez; si la base no existía,
+    importa los archivos del control que haya en el mismo directorio.
+    Con create=False (lecturas) devuelve None si la base no existe y no hay archivos
+    anteriores que importar: mostrar una página no debe crearla.
+    """
+    nueva = not os.path.exists(store_file)
+    if nueva and not create:
+        carpeta = os.path.dirname(store_file) or "."
+        legados = (LEGACY_ORDERS_FILENAME, LEGACY_EXPENSES_FILENAME, LEGACY_SUMMARY_FILENAME,
+                   LEGACY_CERTIFICATES_FILENAME, LEGACY_EXTRACTED_FILENAME)
+        if not any(os.path.exists(os.path.join(carpeta, nombre)) for nombre in legados):
+            return None
+    os.makedirs(os.path.dirname(store_file) or ".", exist_ok=True)
+    conn = sqlite3.connect(store_file, timeout=STORE_TIMEOUT_SECONDS)
+    clave = os.path.abspath(store_file)
+    if nueva or clave not in _inicializadas:
+        with _init_lock:
+            # WAL: las lecturas de otras sesiones no esperan a que termine una escritura
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            if nueva:
+                _import_legacy_files(conn, os.path.dirname(store_file) or ".")
+            _migrate(conn, os.path.dirname(store_file) or ".")
+            _inicializadas.add(clave)
+    return conn
+
+
+def _migrate(conn, user_data_path):
+    """
+    Actualiza el contenido de una base de datos de una versión anterior (PRAGMA user_version).
+    Versión 1: importa las órdenes extraídas de ordenes_de_compra.xlsx, que desde entonces
+    es solo una exportación. La transacción se toma antes de leer la versión, para que dos
+    procesos que abren la base a la vez no importen el archivo dos veces.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= STORE_VERSION:
+        return
+    extraidas_file = os.path.join(user_data_path, LEGACY_EXTRACTED_FILENAME)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < STORE_VERSION:
+                if os.path.exists(extraidas_file):
+                    hojas = read_workbook(extraidas_file) or {}
+                    if hojas:
+                        _insert_extraidas(conn, _registros(next(iter(hojas.values()))))
+                conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    except Exception as e:
+        print(f"Advertencia: no se pudieron importar las órdenes extraídas a la base de datos: {e}")
+
+
+def _insert_ordenes(conn, filas):
+    conn.executemany(
+        "INSERT INTO ordenes (numero_licitacion, orden_de_compra, rut_proveedor, estado, certificado, usuario, datos) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                _texto(fila.get("numero_licitacion")), _texto(fila.get("orden_de_compra")),
+                _texto(fila.get("rut_proveedor")), _texto(fila.get("estado")),
+                _texto(fila.get("certificado")), _texto(fila.get("usuario")), _dumps(fila)
+            )
+            for fila in filas
+        ]
+    )
+
+
+def _extraida_params(fila):
+    return (
+        _texto(fila.get("Orden de Compra")), _texto(fila.get("Número Licitación")),
+        _texto(fila.get("Estado")), _dumps(fila)
+    )
+
+
+def _insert_extraidas(conn, filas):
+    conn.executemany(
+        "INSERT INTO ordenes_extraidas (orden_de_compra, numero_licitacion, estado, datos) VALUES (?, ?, ?, ?)",
+        [_extraida_params(fila) for fila in filas]
+    )
+
+
+def _update_extraidas(conn, actualizadas):
+    conn.executemany(
+        "UPDATE ordenes_extraidas SET orden_de_compra = ?, numero_licitacion = ?, estado = ?, datos = ? WHERE id = ?",
+        [(*_extraida_params(datos), id_fila) for id_fila, datos in actualizadas.items()]
+    )
+
+
+def _insert_licitacion(conn, posicion, resumen, historial):
+    numero_licitacion = str(resumen.get("numero_licitacion"))
+    conn.execute(
+        "INSERT OR REPLACE INTO licitaciones (numero_licitacion, posicion, estado, datos) VALUES (?, ?, ?, ?)",
+        (numero_licitacion, posicion, _texto(resumen.get("estado")), _dumps(resumen))
+    )
+    conn.executemany(
+        "INSERT INTO gastos_historial (numero_licitacion, posicion, orden_de_compra, datos) VALUES (?, ?, ?, ?)",
+        [
+            (numero_licitacion, i, _texto(movimiento.get("orden_compra")), _dumps(movimiento))
+            for i, movimiento in enumerate(historial)
+        ]
+    )
+
+
+def _insert_certificado(conn, datos_certificado):
+    conn.execute(
+        "INSERT INTO certificados (orden_de_compra, numero_licitacion, usuario, fecha_generacion, datos) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            _texto(datos_certificado.get("orden_de_compra")), _texto(datos_certificado.get("licitacion")),
+            _texto(datos_certificado.get("usuario")), _texto(datos_certificado.get("fecha_generacion")),
+            _dumps(datos_certificado)
+        )
+    )
+
+
+def _import_legacy_files(conn, user_data_path):
+    """
+    Carga en una base de datos nueva el control guardado en los archivos Excel y JSON
+    (usuarios que generaron el control antes de existir la base de datos).
+    """
+    ordenes_file = os.path.join(user_data_path, LEGACY_ORDERS_FILENAME)
+    gastos_file = os.path.join(user_data_path, LEGACY_EXPENSES_FILENAME)
+    summary_file = os.path.join(user_data_path, LEGACY_SUMMARY_FILENAME)
+    certificados_file = os.path.join(user_data_path, LEGACY_CERTIFICATES_FILENAME)
+    try:
+        with conn:
+            if os.path.exists(ordenes_file):
+                for hoja, df in read_workbook(ordenes_file).items():
+                    df.columns = [str(col).lower().strip() for col in df.columns]
+                    if "numero_licitacion" not in df.columns:
+                        df["numero_licitacion"] = hoja
+                    _insert_ordenes(conn, _registros(df))
+
+            resumenes = {}
+            if os.path.exists(summary_file):
+                with open(summary_file, 'r', encoding='utf-8') as f:
+                    resumenes = {str(r.get("numero_licitacion")): r for r in json.load(f)}
+
+            if os.path.exists(gastos_file):
+                columnas_resumen = None
+                for posicion, (hoja, df) in enumerate(read_workbook(gastos_file).items()):
+                    filas = _registros(df)
+                    if not filas:
+                        continue
+                    # Cada hoja tiene el resumen en la primera fila y el historial debajo
+                    resumen = resumenes.pop(hoja, None)
+                    if resumen is None:
+                        columnas_resumen = columnas_resumen or [
+                            "numero_licitacion", "nombre", "fecha_inicio", "fecha_final", "presupuesto_total",
+                            "presupuesto_ejecutado", "presupuesto_comprometido", "presupuesto_certificado",
+                            "presupuesto_disponible", "porcentaje_ejecucion", "porcentaje_certificacion", "estado"
+                        ]
+                        resumen = {col: filas[0].get(col) for col in columnas_resumen}
+                        resumen["numero_licitacion"] = hoja
+                    historial = [
+                        {col: valor for col, valor in fila.items() if col in (
+                            "fecha", "orden_compra", "proveedor", "descripcion", "monto",
+                            "saldo_anterior", "saldo_disponible", "certificado", "porcentaje_acumulado"
+                        )}
+                        for fila in filas[1:]
+                    ]
+                    _insert_licitacion(conn, posicion, resumen, historial)
+
+            # Licitaciones del resumen sin hoja en el archivo de gastos
+            inicio = conn.execute("SELECT COUNT(*) FROM licitaciones").fetchone()[0]
+            for posicion, resumen in enumerate(resumenes.values(), start=inicio):
+                _insert_licitacion(conn, posicion, resumen, [])
+
+            if os.path.exists(certificados_file):
+                with open(certificados_file, 'r', encoding='utf-8') as f:
+                    for datos_certificado in json.load(f):
+                        _insert_certificado(conn, datos_certificado)
+    except Exception as e:
+        print(f"Advertencia: no se pudo importar el control existente a la base de datos: {e}")
+
+
+def save_control(store_file, ordenes_df, controles, huellas=None):
+    """
+    Reemplaza el control de un usuario (órdenes, resúmenes de licitaciones e historial
+    de gastos) en una sola transacción. Los certificados registrados se conservan.
+    Con las huellas de las licitaciones, solo se reescriben el resumen y el historial de
+    las que tienen una huella distinta de la guardada; las demás se conservan.
+
+    Args:
+        store_file (str): Ruta de la base de datos.
+        ordenes_df (DataFrame): Órdenes normalizadas (columnas en minúsculas).
+        controles (dict): Resultado de control_avanzado_de_gastos.
+        huellas (dict, optional): Número de licitación -> huella de los datos de los que
+            se calculó su control (ver load_controles).
+
+    Returns:
+        bool: True si se guardó correctamente, False en caso de error.
+    """
+    try:
+        with closing(_connect(store_file)) as conn, conn:
+            conn.execute("DELETE FROM ordenes")
+            _insert_ordenes(conn, _registros(ordenes_df))
+            anteriores = dict(conn.execute("SELECT numero_licitacion, huella FROM huellas_licitaciones"))
+            if huellas is None:
+                conn.execute("DELETE FROM licitaciones")
+                conn.execute("DELETE FROM gastos_historial")
+            else:
+                # Licitaciones que ya no están en el control
+                for (numero_licitacion,) in conn.execute("SELECT numero_licitacion FROM licitaciones").fetchall():
+                    if numero_licitacion not in controles:
+                        anteriores.pop(numero_licitacion, None)
+                        conn.execute("DELETE FROM licitaciones WHERE numero_licitacion = ?", (numero_licitacion,))
+                        conn.execute("DELETE FROM gastos_historial WHERE numero_licitacion = ?", (numero_licitacion,))
+            for posicion, (numero_licitacion, control) in enumerate(controles.items()):
+                huella = (huellas or {}).get(numero_licitacion)
+                if huella is not None and anteriores.get(numero_licitacion) == huella:
+                    # Sin cambios: solo puede cambiar su posición en el control
+                    conn.execute(
+                        "UPDATE licitaciones SET posicion = ? WHERE numero_licitacion = ? AND posicion != ?",
+                        (posicion, numero_licitacion, posicion)
+                    )
+                    continue
+                conn.execute("DELETE FROM gastos_historial WHERE numero_licitacion = ?", (numero_licitacion,))
+                _insert_licitacion(conn, posicion, control["resumen"], control["historial"])
+            conn.execute("DELETE FROM huellas_licitaciones")
+            conn.executemany(
+                "INSERT INTO huellas_licitaciones (numero_licitacion, huella) VALUES (?, ?)",
+                [(numero_licitacion, huella) for numero_licitacion, huella in (huellas or {}).items()
+                 if numero_licitacion in controles and huella is not None]
+            )
+        invalidate_cache(store_file)
+        return True
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error al guardar el control en la base de datos: {e}")
+        return False
+
+
+def load_controles(store_file, huellas):
+    """
+    Carga el control guardado (resumen e historial) de las licitaciones cuya huella
+    guardada coincide con la indicada, es decir, calculadas a partir de los mismos datos.
+
+    Args:
+        store_file (str): Ruta de la base de datos.
+        huellas (dict): Número de licitación -> huella de sus datos actuales.
+
+    Returns:
+        dict: Número de licitación -> {"resumen", "historial"}, como en control_avanzado_de_gastos.
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return {}
+    with closing(conn):
+        vigentes = {
+            numero_licitacion
+            for numero_licitacion, huella in conn.execute("SELECT numero_licitacion, huella FROM huellas_licitaciones")
+            if huellas.get(numero_licitacion) == huella
+        }
+        controles = {
+            numero_licitacion: {"resumen": json.loads(datos), "historial": []}
+            for numero_licitacion, datos in conn.execute("SELECT numero_licitacion, datos FROM licitaciones")
+            if numero_licitacion in vigentes
+        }
+        for numero_licitacion, movimiento in conn.execute(
+            "SELECT numero_licitacion, datos FROM gastos_historial ORDER BY numero_licitacion, posicion"
+        ):
+            if numero_licitacion in controles:
+                controles[numero_licitacion]["historial"].append(json.loads(movimiento))
+    return controles
+
+
+def list_licitaciones(store_file):
+    """
+    Lista las licitaciones del control (con resumen o con órdenes), ordenadas.
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return []
+    with closing(conn):
+        filas = conn.execute(
+            "SELECT numero_licitacion FROM licitaciones "
+            "UNION SELECT DISTINCT numero_licitacion FROM ordenes WHERE numero_licitacion IS NOT NULL"
+        ).fetchall()
+    return sorted(fila[0] for fila in filas)
+
+
+def load_ordenes(store_file, licitacion=None):
+    """
+    Carga las órdenes del control, todas o solo las de una licitación.
+    :return: DataFrame con las columnas originales (vacío si no hay órdenes).
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return pd.DataFrame()
+    with closing(conn):
+        if licitacion is None:
+            filas = conn.execute("SELECT datos FROM ordenes ORDER BY id").fetchall()
+        else:
+            filas = conn.execute(
+                "SELECT datos FROM ordenes WHERE numero_licitacion = ? ORDER BY id", (str(licitacion),)
+            ).fetchall()
+    return pd.DataFrame([json.loads(fila[0]) for fila in filas])
+
+
+def load_resumenes(store_file):
+    """
+    Carga los resúmenes de las licitaciones, en el orden en que se generaron
+    (el mismo contenido que resumen_control_licitaciones.json).
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return []
+    with closing(conn):
+        filas = conn.execute("SELECT datos FROM licitaciones ORDER BY posicion").fetchall()
+    return [json.loads(fila[0]) for fila in filas]
+
+
+def load_gastos(store_file, licitacion=None):
+    """
+    Carga el control de gastos con el formato de las hojas de control_de_gasto_de_licitaciones.xlsx:
+    por cada licitación, su resumen seguido de su historial de movimientos.
+    Todas las filas incluyen numero_licitacion.
+    :return: DataFrame (vacío si no hay datos).
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return pd.DataFrame()
+    with closing(conn):
+        if licitacion is None:
+            resumenes = conn.execute(
+                "SELECT numero_licitacion, datos FROM licitaciones ORDER BY posicion"
+            ).fetchall()
+        else:
+            resumenes = conn.execute(
+                "SELECT numero_licitacion, datos FROM licitaciones WHERE numero_licitacion = ?", (str(licitacion),)
+            ).fetchall()
+        filas = []
+        for numero_licitacion, datos in resumenes:
+            filas.append(json.loads(datos))
+            for (movimiento,) in conn.execute(
+                "SELECT datos FROM gastos_historial WHERE numero_licitacion = ? ORDER BY posicion",
+                (numero_licitacion,)
+            ):
+                movimiento = json.loads(movimiento)
+                movimiento["numero_licitacion"] = numero_licitacion
+                filas.append(movimiento)
+    return pd.DataFrame(filas)
+
+
+def set_certificado(store_file, orden_de_compra, valor="SÍ"):
+    """
+    Marca el estado de certificación de una orden de compra.
+    :return: Número de filas actualizadas (0 si la orden no existe).
+    """
+    with closing(_connect(store_file)) as conn, conn:
+        cursor = conn.execute(
+            "UPDATE ordenes SET certificado = ?, datos = json_set(datos, '$.certificado', ?) "
+            "WHERE orden_de_compra = ?",
+            (valor, valor, str(orden_de_compra).strip())
+        )
+    invalidate_cache(store_file)
+    return cursor.rowcount
+
+
+def reset_certificados(store_file):
+    """
+    Elimina los certificados registrados y marca todas las órdenes como no certificadas.
+    """
+    with closing(_connect(store_file)) as conn, conn:
+        conn.execute("DELETE FROM certificados")
+        conn.execute(
+            "UPDATE ordenes SET certificado = 'NO', datos = json_set(datos, '$.certificado', 'NO')"
+        )
+    invalidate_cache(store_file)
+
+
+def add_certificado(store_file, datos_certificado):
+    """
+    Registra un certificado generado.
+    """
+    with closing(_connect(store_file)) as conn, conn:
+        _insert_certificado(conn, datos_certificado)
+    invalidate_cache(store_file)
+
+
+def load_certificados(store_file, licitacion=None):
+    """
+    Carga los certificados registrados, todos o solo los de una licitación.
+    :return: Lista de diccionarios (el mismo contenido que registro_certificados.json).
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return []
+    with closing(conn):
+        if licitacion is None:
+            filas = conn.execute("SELECT datos FROM certificados ORDER BY id").fetchall()
+        else:
+            filas = conn.execute(
+                "SELECT datos FROM certificados WHERE numero_licitacion = ? ORDER BY id", (str(licitacion),)
+            ).fetchall()
+    return [json.loads(fila[0]) for fila in filas]
+
+
+def add_cambios_estado(store_file, cambios, usuario=None):
+    """
+    Registra los cambios de estado de órdenes de compra guardadas
+    (p. ej. Enviada a Proveedor -> Aceptada -> Recepcion Conforme).
+    :param cambios: Lista de {"orden_de_compra", "estado_anterior", "estado_nuevo"}.
+    """
+    if not cambios:
+        return
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with closing(_connect(store_file)) as conn, conn:
+        conn.executemany(
+            "INSERT INTO estados_ordenes (orden_de_compra, estado_anterior, estado_nuevo, fecha, usuario) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (cambio["orden_de_compra"], cambio["estado_anterior"], cambio["estado_nuevo"], fecha, usuario)
+                for cambio in cambios
+            ]
+        )
+    invalidate_cache(store_file)
+
+
+def load_cambios_estado(store_file, orden_de_compra=None):
+    """
+    Carga el historial de estados, de todas las órdenes o de una sola, en orden de registro.
+    :return: Lista de {"orden_de_compra", "estado_anterior", "estado_nuevo", "fecha", "usuario"}.
+    """
+    consulta = "SELECT orden_de_compra, estado_anterior, estado_nuevo, fecha, usuario FROM estados_ordenes"
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return []
+    with closing(conn):
+        if orden_de_compra is None:
+            filas = conn.execute(consulta + " ORDER BY id").fetchall()
+        else:
+            filas = conn.execute(
+                consulta + " WHERE orden_de_compra = ? ORDER BY id", (str(orden_de_compra).strip(),)
+            ).fetchall()
+    claves = ("orden_de_compra", "estado_anterior", "estado_nuevo", "fecha", "usuario")
+    return [dict(zip(claves, fila)) for fila in filas]
+
+
+def load_ordenes_extraidas(store_file):
+    """
+    Carga las órdenes extraídas de los PDFs y guardadas en el perfil del usuario, en el
+    orden en que se guardaron (el contenido de ordenes_de_compra.xlsx).
+    :return: DataFrame con las columnas originales (vacío si no hay órdenes).
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return pd.DataFrame()
+    with closing(conn):
+        filas = conn.execute("SELECT datos FROM ordenes_extraidas ORDER BY id").fetchall()
+    return pd.DataFrame([json.loads(fila[0]) for fila in filas])
+
+
+def load_estados_extraidos(store_file):
+    """
+    Carga la orden de compra y el estado de cada orden extraída guardada, sin leer el resto
+    de sus datos.
+    :return: Lista de (orden_de_compra, estado), en el orden en que se guardaron.
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return []
+    with closing(conn):
+        return conn.execute("SELECT orden_de_compra, estado FROM ordenes_extraidas ORDER BY id").fetchall()
+
+
+def append_ordenes_extraidas(store_file, filas):
+    """
+    Añade órdenes extraídas al perfil del usuario.
+    :param filas: Lista de diccionarios con los datos de cada orden.
+    """
+    if not filas:
+        return
+    with closing(_connect(store_file)) as conn, conn:
+        _insert_extraidas(conn, [_sin_vacios(fila) for fila in filas])
+    invalidate_cache(store_file)
+
+
+def upsert_ordenes_extraidas(store_file, filas, cambios_de):
+    """
+    Guarda órdenes extraídas usando "Orden de Compra" como clave: las nuevas se agregan al
+    final y a cada guardada se le aplican los cambios que devuelve cambios_de(guardada, fila)
+    (diccionario columna -> valor; vacío si no cambia nada). Una orden repetida entre las
+    nuevas: gana la última. La lectura de las guardadas y la escritura van en una sola
+    transacción, sin que otra sesión escriba entremedio.
+    :return: (cantidad de órdenes nuevas, cantidad de órdenes actualizadas).
+    """
+    filas = [_sin_vacios(fila) for fila in filas]
+    claves = sorted({orden for orden in (_texto(fila.get("Orden de Compra")) for fila in filas) if orden})
+    with closing(_connect(store_file)) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        guardadas = {}  # orden de compra -> (id, datos) de su última fila
+        for inicio in range(0, len(claves), _MAX_PARAMS):
+            lote = claves[inicio:inicio + _MAX_PARAMS]
+            for id_fila, orden, datos in conn.execute(
+                "SELECT id, orden_de_compra, datos FROM ordenes_extraidas "
+                f"WHERE orden_de_compra IN ({', '.join('?' * len(lote))}) ORDER BY id", lote
+            ):
+                guardadas[orden] = (id_fila, json.loads(datos))
+
+        nuevas = []
+        posiciones = {}  # orden de compra -> posición en nuevas
+        actualizadas = {}  # id -> datos completos
+        for fila in filas:
+            orden = _texto(fila.get("Orden de Compra"))
+            if orden in guardadas:
+                id_fila, guardada = guardadas[orden]
+                cambios = cambios_de(guardada, fila)
+                if cambios:
+                    guardada.update(cambios)
+                    actualizadas[id_fila] = guardada
+            elif orden in posiciones:
+                nuevas[posiciones[orden]] = fila
+            else:
+                if orden:
+                    posiciones[orden] = len(nuevas)
+                nuevas.append(fila)
+
+        _update_extraidas(conn, actualizadas)
+        _insert_extraidas(conn, nuevas)
+    if nuevas or actualizadas:
+        invalidate_cache(store_file)
+    return len(nuevas), len(actualizadas)
+
+
+def update_ordenes_extraidas(store_file, cambios_de, dry_run=False):
+    """
+    Recorre las órdenes extraídas guardadas y aplica a cada una los cambios que devuelve
+    cambios_de(guardada) (diccionario columna -> valor; vacío si no cambia nada), en una
+    sola transacción.
+    :param dry_run: Si es True, solo llama a cambios_de sin escribir.
+    :return: Cantidad de órdenes actualizadas.
+    """
+    conn = _connect(store_file, create=False)
+    if conn is None:
+        return 0
+    with closing(conn), conn:
+        if not dry_run:
+            conn.execute("BEGIN IMMEDIATE")
+        actualizadas = {}
+        for id_fila, datos in conn.execute("SELECT id, datos FROM ordenes_extraidas ORDER BY id").fetchall():
+            guardada = json.loads(datos)
+            cambios = cambios_de(guardada)
+            if cambios:
+                guardada.update(_sin_vacios(cambios))
+                actualizadas[id_fila] = guardada
+        if not dry_run:
+            _update_extraidas(conn, actualizadas)
+    if actualizadas and not dry_run:
+        invalidate_cache(store_file)
+    return len(actualizadas)
@@ -1,6 +1,10 @@
-import pdfplumber
 import re
+import json
+import hashlib
+from collections import namedtuple
 from datetime import datetime
+from utils.text_backends import open_text_backend, resolve_text_backend, PageRange
+from utils.layout_templates import OC_LAYOUT_TEMPLATES, template_boxes_by_page
 
 
 def clean_text(text):
@@ -24,6 +28,450 @@ def parse_chilean_currency(value):
         return None
 
 
+def format_rut(rut):
+    """
+    Formatea un RUT en el formato XX.XXX.XXX-X (si no lo está).
+    """
+    if rut and len(rut) > 1:
+        rut = rut.replace(".", "").replace("-", "")
+        return f"{rut[:-8]}.{rut[-8:-5]}.{rut[-5:-2]}-{rut[-1]}"
+    return rut
+
+
+def format_fecha_envio(value):
+    """
+    Convierte la Fecha Envío OC ("dd-mm-aaaa hh:mm:ss") al formato corto dd/mm/aaaa.
+    Devuelve None si la fecha no tiene el formato esperado.
+    """
+    try:
+        return datetime.strptime(value, "%d-%m-%Y %H:%M:%S").strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+# Regla de extracción: campo de salida, patrón compilado (el grupo 1 es el valor) y
+# post-procesador opcional que se aplica al valor ya limpio cuando no está vacío.
+ExtractionRule = namedtuple("ExtractionRule", ["field", "pattern", "postprocess"])
+
+# Versión de las reglas de extracción. Incrementar cuando cambie un post-procesador
+# sin cambiar su nombre (los patrones ya forman parte de la huella de las reglas).
+EXTRACTION_RULES_VERSION = 1
+
+# Expresiones regulares mejoradas, compiladas una sola vez al importar el módulo.
+# Los patrones de Número Licitación, Orden de Compra y Estado ya garantizan el formato
+# válido, por lo que no se requiere una segunda validación del valor capturado.
+EXTRACTION_RULES = [
+    # Número Licitación: Buscar específicamente "Número Licitación"
+    ExtractionRule("Número Licitación", re.compile(r"(\d{7}-\d{1,2}-[A-Z]{2}\d{2})"), None),
+    # Orden de Compra: Buscar específicamente el formato esperado
+    ExtractionRule("Orden de Compra", re.compile(r"(\d{7}-\d{1,4}-SE\d{2})"), None),
+    # Estado: Buscar valores predefinidos
+    ExtractionRule("Estado", re.compile(r"(Aceptada|Cancelada|Recepcion Conforme|Rechazada|Enviada a Proveedor)"), None),
+    # Proveedor
+    ExtractionRule("Proveedor", re.compile(r"SEÑOR \(ES\)\s*:\s*([\w\s\.]+)"), None),
+    # RUT del Proveedor
+    ExtractionRule("RUT Proveedor", re.compile(r"RUT\s*:\s*([\d\.]+-[\dkK])"), None),
+    # Nombre de la Orden
+    ExtractionRule("Nombre Orden", re.compile(r"NOMBRE ORDEN DE COMPRA\s*:\s*([\w\s\/,]+)"), None),
+    # Fecha de Envío de la Orden de Compra (convertida al formato corto)
+    ExtractionRule("Fecha Envío OC", re.compile(r"Fecha Envio OC\.\s*:\s*([\d\-:\s]+)"), format_fecha_envio),
+    # Total (convertido a número en formato flotante)
+    ExtractionRule("Total", re.compile(r"Total\s*\$\s*([\d\.,]+)"), parse_chilean_currency),
+]
+
+FIELD_PATTERNS = {rule.field: rule.pattern.pattern for rule in EXTRACTION_RULES}
+_RULES_BY_FIELD = {rule.field: rule for rule in EXTRACTION_RULES}
+
+# Campos que deben encontrarse con el backend rápido; si falta alguno se reintenta con pdfplumber
+REQUIRED_FIELDS = ("Número Licitación", "Orden de Compra", "Proveedor", "RUT Proveedor", "Total")
+
+# Huella de las reglas vigentes: cualquier resultado guardado con otra huella queda invalidado
+EXTRACTION_RULES_FINGERPRINT = hashlib.md5(
+    json.dumps(
+        [EXTRACTION_RULES_VERSION] + [
+            [rule.field, rule.pattern.pattern, getattr(rule.postprocess, "__name__", None)]
+            for rule in EXTRACTION_RULES
+        ],
+        ensure_ascii=False
+    ).encode("utf-8")
+).hexdigest()[:12]
+
+
+def scan_fields(text, fields=None):
+    """
+    Busca los campos de las reglas de extracción en el texto con los patrones ya compilados.
+    Cada regla se busca por separado: en CPython una búsqueda con prefijo literal
+    ("SEÑOR", "RUT", "Total"...) recorre el texto más rápido que una única alternancia
+    de todos los patrones, y cada búsqueda se detiene en su primera coincidencia.
+    :param text: Texto completo (o acumulado) de la orden de compra.
+    :param fields: Campos a buscar; por defecto todos los de EXTRACTION_RULES.
+    :return: Diccionario campo -> objeto Match (o None si no se encontró).
+    """
+    return {
+        rule.field: rule.pattern.search(text)
+        for rule in EXTRACTION_RULES
+        if fields is None or rule.field in fields
+    }
+
+
+def apply_extraction_rules(matches):
+    """
+    Convierte las coincidencias de scan_fields en valores limpios aplicando el
+    post-procesador de cada regla.
+    :param matches: Diccionario campo -> objeto Match (o None).
+    :return: Diccionario campo -> valor extraído (o None).
+    """
+    extracted_data = {}
+    for rule in EXTRACTION_RULES:
+        match = matches.get(rule.field)
+        value = match.group(1).strip() if match else None
+        if value and rule.postprocess:
+            value = rule.postprocess(value)
+        extracted_data[rule.field] = value
+    return extracted_data
+
+
+# Motivo registrado para los PDFs sin capa de texto (escaneados), que requieren ingreso manual
+TEXTLESS_PDF_REASON = "PDF sin capa de texto (escaneado): requiere ingreso manual"
+
+
+def document_has_text(document):
+    """
+    Pre-clasificación barata: indica si alguna página del PDF tiene texto, usando solo los
+    metadatos de los objetos de cada página (sin análisis de layout). Se detiene en la
+    primera página con texto, por lo que en un PDF normal solo revisa la primera.
+    """
+    return any(document.page_has_text(index) for index in range(len(document)))
+
+
+def find_order_segments(document):
+    """
+    Divide un PDF en segmentos de páginas, uno por orden de compra. Una página inicia un
+    segmento nuevo cuando contiene un número de orden de compra distinto al del segmento
+    actual; las páginas sin número (p. ej. las de detalle de ítems) pertenecen a la orden anterior.
+    Lee el texto de todas las páginas, pero solo conserva el número de orden de cada una.
+    :return: Lista de rangos [inicio, fin) (un único rango si el PDF tiene una sola orden).
+    """
+    pattern = _RULES_BY_FIELD["Orden de Compra"].pattern
+    starts = [0]
+    current = None
+    for index in range(len(document)):
+        text = document.page_text(index)
+        match = pattern.search(text) if text else None
+        if match is None or match.group(1) == current:
+            continue
+        if current is not None:
+            starts.append(index)
+        current = match.group(1)
+    return [[start, end] for start, end in zip(starts, starts[1:] + [len(document)])]
+
+
+def split_pdf_orders(pdf_file, backend=None, stats=None):
+    """
+    Detecta las órdenes de compra contenidas en un PDF (ver find_order_segments).
+    :param stats: Diccionario opcional donde se registran "paginas_leidas" y "paginas_totales".
+    :return: Lista de rangos de páginas o None si el PDF no tiene texto o no pudo leerse.
+    """
+    try:
+        with open_text_backend(pdf_file, backend) as document:
+            if not document_has_text(document):
+                return None
+            segments = find_order_segments(document)
+            if stats is not None:
+                stats.update(paginas_leidas=len(document), paginas_totales=len(document))
+            return segments
+    except Exception as e:
+        print(f"Error al segmentar el archivo PDF: {e}")
+        return None
+
+
+def _page_lines(document, index, page_texts=None):
+    """
+    Extrae y limpia las líneas de texto de una página.
+    Si se entrega page_texts, guarda además el texto original de la página en esa lista.
+    """
+    text = document.page_text(index)
+    if page_texts is not None:
+        page_texts[index] = text
+    # Una página sin capa de texto devuelve None: no aporta líneas
+    if text is None:
+        return []
+    return [clean_text(line) for line in text.split("\n")]
+
+
+# Caracteres del texto ya leído que se conservan al pasar a la página siguiente. Debe superar
+# el prefijo más largo que una regla necesita antes de poder coincidir (p. ej.
+# "NOMBRE ORDEN DE COMPRA : "); las coincidencias que llegan al final se conservan completas.
+STREAM_WINDOW_CHARS = 4096
+
+
+def _scan_pages_streaming(document, total_from_end=False, page_texts=None, stop_early=True):
+    """
+    Busca los campos página por página sobre una ventana acotada del texto, sin acumular
+    el texto completo del documento: el resultado es el mismo que buscar en el texto
+    completo, pero la memoria no crece con el número de páginas.
+    Una coincidencia que toca el final de la ventana podría continuar en la página
+    siguiente, por lo que solo se da por definitiva cuando hay texto posterior.
+    :param document: PDF abierto con un backend de texto (ver utils.text_backends).
+    :param total_from_end: Si es True, el Total no se exige en la lectura hacia adelante;
+        si falta, se busca desde la última página hacia atrás.
+    :param page_texts: Lista opcional (una posición por página) donde guardar el texto leído.
+    :param stop_early: Detenerse en cuanto todos los campos fueron encontrados (modo incremental).
+    :return: Tupla (coincidencias por campo, número de páginas leídas).
+    """
+    matches = {field: None for field in FIELD_PATTERNS}
+    required = [field for field in FIELD_PATTERNS if not (total_from_end and field == "Total")]
+    parsed = set()
+    window = None
+
+    for index in range(len(document)):
+        parsed.add(index)
+        lines = _page_lines(document, index, page_texts)
+        if not lines:
+            continue
+        page_text = " ".join(lines)
+        window = page_text if window is None else f"{window} {page_text}"
+
+        # Conservar el final de la ventana y cualquier coincidencia que aún puede crecer
+        keep_from = max(0, len(window) - STREAM_WINDOW_CHARS)
+        pending = [field for field in FIELD_PATTERNS if matches[field] is None]
+        for field, match in scan_fields(window, pending).items():
+            if match is None:
+                continue
+            if match.end() < len(window):
+                matches[field] = match
+            else:
+                keep_from = min(keep_from, match.start())
+
+        if stop_early and all(matches[field] is not None for field in required):
+            break
+
+        # Recortar en un límite de palabra para no crear coincidencias que no existen en el texto completo
+        if keep_from > 0:
+            corte = window.rfind(" ", 0, keep_from + 1)
+            if corte >= 0:
+                window = window[corte + 1:]
+
+    # Campos aún pendientes: búsqueda final sobre el texto restante (igual que el modo completo)
+    pending = [field for field in FIELD_PATTERNS if matches[field] is None]
+    if pending and window is not None:
+        matches.update(scan_fields(window, pending))
+
+    # Buscar el Total desde la última página hacia atrás
+    if total_from_end and matches["Total"] is None:
+        for index in range(len(document) - 1, -1, -1):
+            if index in parsed:
+                continue
+            parsed.add(index)
+            match = _RULES_BY_FIELD["Total"].pattern.search(" ".join(_page_lines(document, index, page_texts)))
+            if match:
+                matches["Total"] = match
+                break
+
+    return matches, len(parsed)
+
+
+def _scan_layout_template(document, template):
+    """
+    Busca cada campo solo dentro del recuadro que le asigna la plantilla, sin extraer el
+    texto del resto de la página.
+    :return: Tupla (coincidencias por campo, número de páginas leídas) o None si algún campo
+        no está en su recuadro (el PDF no sigue la plantilla).
+    """
+    matches = {field: None for field in FIELD_PATTERNS}
+    regions_by_page = template_boxes_by_page(template, len(document))
+    if not regions_by_page:
+        return None
+
+    for index, regions in regions_by_page.items():
+        texts = document.page_text_in_boxes(index, [region.bbox for region in regions])
+        for region, text in zip(regions, texts):
+            region_text = " ".join(clean_text(line) for line in (text or "").split("\n"))
+            match = _RULES_BY_FIELD[region.field].pattern.search(region_text)
+            if match is None:
+                return None
+            matches[region.field] = match
+
+    return matches, len(regions_by_page)
+
+
+def _scan_layout_templates(document, templates):
+    """
+    Prueba las plantillas de posiciones en orden.
+    :return: Tupla (coincidencias, páginas leídas, nombre de la plantilla) o None si ninguna coincide.
+    """
+    for template in templates:
+        result = _scan_layout_template(document, template)
+        if result is not None:
+            return result + (template.name,)
+    return None
+
+
+def _scan_page_texts(texts):
+    """
+    Busca los campos sobre el texto completo formado por las páginas indicadas.
+    """
+    lines = []
+    for text in texts:
+        if text is not None:
+            lines.extend(text.split("\n"))
+
+    # Limpieza inicial del texto por líneas
+    lines = [clean_text(line) for line in lines]
+
+    # Combinar todas las líneas en un texto completo
+    full_text = " ".join(lines)
+
+    # Buscar todos los campos en el texto completo
+    return scan_fields(full_text)
+
+
+def extract_fields_from_text(page_texts):
+    """
+    Aplica las reglas de extracción vigentes sobre el texto ya guardado de un PDF,
+    sin volver a leer el archivo.
+    :param page_texts: Lista con el texto original de cada página (None en las páginas no leídas).
+    :return: Diccionario con los datos extraídos.
+    """
+    return apply_extraction_rules(_scan_page_texts(page_texts))
+
+
+def extract_fields_from_pdf(pdf_file, incremental=False, total_from_end=False, stats=None, backend=None,
+                            fallback=True, page_texts=None, layout=False, pages=None):
+    """
+    Extrae los campos de una orden de compra desde un PDF, sin validar duplicidad.
+    Es la parte costosa del proceso y no depende de estado compartido, por lo que
+    puede ejecutarse en procesos de trabajo independientes.
+    :param pdf_file: Ruta o archivo PDF (objeto tipo archivo) a procesar.
+    :param incremental: Si es True, lee página por página y se detiene al encontrar todos los campos.
+    :param total_from_end: En modo incremental, busca el Total desde la última página.
+    :param stats: Diccionario opcional donde se registran "paginas_leidas", "paginas_totales", "backend"
+        y, si el PDF no pudo leerse, "error" con el motivo ("sin_texto" si no tiene capa de texto).
+    :param backend: Backend de texto ("pypdfium2" o "pdfplumber"); por defecto DEFAULT_TEXT_BACKEND.
+    :param fallback: Si el backend rápido deja vacío algún campo de REQUIRED_FIELDS, reintentar con pdfplumber.
+    :param page_texts: Lista opcional que se completa con el texto original de cada página
+        (None en las páginas que no se leyeron), para volver a aplicar las reglas sin leer el PDF.
+        Queda vacía si los campos se leyeron con una plantilla de posiciones.
+    :param layout: Buscar primero cada campo solo en su recuadro según OC_LAYOUT_TEMPLATES
+        (o según la lista de plantillas indicada, p. ej. para verificar una plantilla desactivada;
+        registra "plantilla" en stats); si el PDF no sigue ninguna plantilla, se lee el texto completo.
+    :param pages: Rango [inicio, fin) de páginas a procesar como un documento independiente
+        (una orden de compra dentro de un PDF con varias, ver split_pdf_orders).
+    :return: Diccionario con los datos extraídos o None si el PDF no pudo leerse.
+    """
+    backend = resolve_text_backend(backend)
+    if stats is None:
+        stats = {}
+    extracted_data = _extract_fields_with_backend(
+        pdf_file, incremental, total_from_end, stats, backend, page_texts, layout, pages
+    )
+
+    # Un PDF sin capa de texto tampoco tendrá texto con pdfplumber: no reintentar
+    if fallback and backend != "pdfplumber" and not stats.get("sin_texto") and (
+        extracted_data is None or any(not extracted_data.get(field) for field in REQUIRED_FIELDS)
+    ):
+        if hasattr(pdf_file, "seek"):
+            pdf_file.seek(0)
+        fallback_stats = {}
+        fallback_texts = [] if page_texts is not None else None
+        fallback_data = _extract_fields_with_backend(
+            pdf_file, incremental, total_from_end, fallback_stats, "pdfplumber", fallback_texts, layout, pages
+        )
+        if fallback_data is not None:
+            extracted_data = fallback_data
+            if page_texts is not None:
+                page_texts[:] = fallback_texts
+            stats["paginas_leidas"] = stats.get("paginas_leidas", 0) + fallback_stats["paginas_leidas"]
+            stats.update(paginas_totales=fallback_stats["paginas_totales"], backend="pdfplumber",
+                         plantilla=fallback_stats.get("plantilla"))
+            # Si el backend rápido falló (p. ej. MemoryError por el límite de memoria), se deja constancia
+            error_backend = stats.pop("error", None)
+            if error_backend:
+                stats["error_backend"] = f"{backend}: {error_backend}"
+                print(f"Advertencia: el backend {backend} falló ({error_backend}); se usó pdfplumber.")
+
+    return extracted_data
+
+
+def _extract_fields_with_backend(pdf_file, incremental, total_from_end, stats, backend, page_texts=None,
+                                 layout=False, pages=None):
+    try:
+        with open_text_backend(pdf_file, backend) as opened:
+            document = opened if pages is None else PageRange(opened, *pages)
+            pages_total = len(document)
+
+            # Descartar de inmediato los PDFs escaneados, antes de extraer texto de ninguna página
+            if not document_has_text(document):
+                if stats is not None:
+                    stats.update(paginas_leidas=0, paginas_totales=pages_total, backend=backend,
+                                 sin_texto=True, error=TEXTLESS_PDF_REASON)
+                return None
+
+            # Plantilla de posiciones: solo se extrae el texto de los recuadros de cada campo
+            template_name = None
+            templates = OC_LAYOUT_TEMPLATES if layout is True else layout
+            layout_result = _scan_layout_templates(document, templates) if layout else None
+            if layout_result is not None:
+                matches, pages_parsed, template_name = layout_result
+                if page_texts is not None:
+                    # No hay texto completo que guardar para volver a aplicar las reglas
+                    page_texts[:] = []
+            else:
+                if page_texts is not None:
+                    page_texts[:] = [None] * pages_total
+
+                # Lectura por ventanas: cada página se libera apenas se consume su texto
+                matches, pages_parsed = _scan_pages_streaming(
+                    document, incremental and total_from_end, page_texts, stop_early=incremental
+                )
+
+        if stats is not None:
+            stats["paginas_leidas"] = pages_parsed
+            stats["paginas_totales"] = pages_total
+            stats["backend"] = backend
+            stats["plantilla"] = template_name
+
+        # Extraer valores, limpiarlos y aplicar el post-procesamiento de cada regla
+        return apply_extraction_rules(matches)
+
+    except Exception as e:
+        print(f"Error al procesar el archivo PDF: {e}")
+        if stats is not None:
+            stats["error"] = f"{type(e).__name__}: {e}"
+        return None
+
+
+def register_extracted_order(extracted_data, processed_orders, user_id=None):
+    """
+    Valida la duplicidad de la orden de compra extraída y la registra como procesada.
+    :param extracted_data: Diccionario producido por extract_fields_from_pdf.
+    :param processed_orders: Conjunto de órdenes de compra ya procesadas.
+    :param user_id: Identificador del usuario que está procesando el archivo (para evitar duplicados solo entre sus archivos)
+    :return: Diccionario con los datos extraídos o None si es duplicada.
+    """
+    # Validar duplicidad de la Orden de Compra
+    order_number = extracted_data.get("Orden de Compra")
+    
+    # Crear clave única que combine orden y usuario (si se proporciona)
+    order_key = order_number
+    if user_id:
+        order_key = f"{user_id}_{order_number}"
+    
+    if order_key in processed_orders:
+        print(f"Advertencia: La Orden de Compra '{order_number}' ya fue procesada por el usuario {user_id}. Ignorando archivo.")
+        return None  # Ignorar archivo si la orden ya fue procesada
+
+    # Agregar la Orden de Compra al conjunto de procesadas
+    if order_key:
+        processed_orders.add(order_key)
+
+    # Añadir información del usuario
+    if user_id:
+        extracted_data["Usuario"] = user_id
+
+    return extracted_data
+
+
 def extract_data_from_pdf(pdf_file, processed_orders, user_id=None):
     """
     Extrae datos relevantes de un archivo PDF y valida duplicidad de órdenes de compra.
@@ -32,90 +480,7 @@ def extract_data_from_pdf(pdf_file, processed_orders, user_id=None):
     :param user_id: Identificador del usuario que está procesando el archivo (para evitar duplicados solo entre sus archivos)
     :return: Diccionario con los datos extraídos o None si es duplicada.
     """
-    try:
-        with pdfplumber.open(pdf_file) as pdf:
-            lines = []
-            for page in pdf.pages:
-                lines.extend(page.extract_text().split("\n"))
-
-        # Limpieza inicial del texto por líneas
-        lines = [clean_text(line) for line in lines]
-
-        # Combinar todas las líneas en un texto completo
-        full_text = " ".join(lines)
-
-        # Expresiones regulares mejoradas
-        extracted_data = {
-            # Número Licitación: Buscar específicamente "Número Licitación"
-            "Número Licitación": re.search(r"(\d{7}-\d{1,2}-[A-Z]{2}\d{2})", full_text),
-            # Orden de Compra: Buscar específicamente el formato esperado
-            "Orden de Compra": re.search(r"(\d{7}-\d{1,4}-SE\d{2})", full_text),
-            # Estado: Buscar valores predefinidos
-            "Estado": re.search(r"(Aceptada|Cancelada|Recepcion Conforme|Rechazada|Enviada a Proveedor)", full_text),
-            # Proveedor
-            "Proveedor": re.search(r"SEÑOR \(ES\)\s*:\s*([\w\s\.]+)", full_text),
-            # RUT del Proveedor
-            "RUT Proveedor": re.search(r"RUT\s*:\s*([\d\.]+-[\dkK])", full_text),
-            # Nombre de la Orden
-            "Nombre Orden": re.search(r"NOMBRE ORDEN DE COMPRA\s*:\s*([\w\s\/,]+)", full_text),
-            # Fecha de Envío de la Orden de Compra
-            "Fecha Envío OC": re.search(r"Fecha Envio OC\.\s*:\s*([\d\-:\s]+)", full_text),
-            # Total
-            "Total": re.search(r"Total\s*\$\s*([\d\.,]+)", full_text),
-        }
-
-        # Extraer valores y limpiar
-        for key, match in extracted_data.items():
-            extracted_data[key] = match.group(1).strip() if match else None
-
-        # Validar el formato del Número de Licitación
-        if extracted_data["Número Licitación"] and not re.match(r"\d{7}-\d{1,2}-[A-Z]{2}\d{2}", extracted_data["Número Licitación"]):
-            extracted_data["Número Licitación"] = None
-
-        # Validar el formato de la Orden de Compra
-        if extracted_data["Orden de Compra"] and not re.match(r"\d{7}-\d{1,4}-SE\d+", extracted_data["Orden de Compra"]):
-            extracted_data["Orden de Compra"] = None
-
-        # Validar el campo "Estado" con valores predefinidos
-        valid_states = ["Aceptada", "Cancelada", "Recepcion Conforme", "Rechazada", "Enviada a Proveedor"]
-        if extracted_data["Estado"] not in valid_states:
-            extracted_data["Estado"] = None
-
-        # Validar duplicidad de la Orden de Compra
-        order_number = extracted_data.get("Orden de Compra")
-        
-        # Crear clave única que combine orden y usuario (si se proporciona)
-        order_key = order_number
-        if user_id:
-            order_key = f"{user_id}_{order_number}"
-        
-        if order_key in processed_orders:
-            print(f"Advertencia: La Orden de Compra '{order_number}' ya fue procesada por el usuario {user_id}. Ignorando archivo.")
-            return None  # Ignorar archivo si la orden ya fue procesada
-
-        # Agregar la Orden de Compra al conjunto de procesadas
-        if order_key:
-            processed_orders.add(order_key)
-
-        # Convertir Fecha Envío OC al formato corto
-        if extracted_data["Fecha Envío OC"]:
-            try:
-                extracted_data["Fecha Envío OC"] = datetime.strptime(
-                    extracted_data["Fecha Envío OC"], "%d-%m-%Y %H:%M:%S"
-                ).strftime("%d/%m/%Y")
-            except ValueError:
-                extracted_data["Fecha Envío OC"] = None
-
-        # Convertir Total a número en formato flotante
-        if extracted_data["Total"]:
-            extracted_data["Total"] = parse_chilean_currency(extracted_data["Total"])
-            
-        # Añadir información del usuario
-        if user_id:
-            extracted_data["Usuario"] = user_id
-
-        return extracted_data
-
-    except Exception as e:
-        print(f"Error al procesar el archivo PDF: {e}")
-        return None
\ No newline at end of file
+    extracted_data = extract_fields_from_pdf(pdf_file)
+    if extracted_data is None:
+        return None
+    return register_extracted_order(extracted_data, processed_orders, user_id)
@@ -0,0 +1,217 @@
+import os
+import re
+import pdfplumber
+from pdfminer.pdftypes import resolve1
+
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+except ImportError:  # pypdfium2 es opcional: sin él se usa solo pdfplumber
+    pdfium = None
+
+# Operadores que dibujan texto (Tj, TJ, ' y ") en el flujo de contenido de una página
+_TEXT_OPERATOR = re.compile(rb"(?:^|[\s)\]>])(?:T[jJ]|'|\")(?:\s|$)")
+
+
+class PdfplumberBackend:
+    """
+    Backend de texto basado en pdfplumber (análisis de layout completo, más lento).
+    """
+    name = "pdfplumber"
+
+    def __init__(self, pdf_file):
+        self._pdf = pdfplumber.open(pdf_file)
+        self.pages = self._pdf.pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def page_text(self, index):
+        """
+        Devuelve el texto de una página (None si la página no tiene texto).
+        Los objetos y el layout de la página se liberan después de leerla, para que la
+        memoria no crezca con el número de páginas del documento.
+        """
+        page = self.pages[index]
+        try:
+            return page.extract_text()
+        finally:
+            page.close()
+
+    def page_text_in_boxes(self, index, boxes):
+        """
+        Devuelve el texto de cada recuadro de una página, analizando solo los caracteres
+        que quedan completamente dentro de él.
+        :param boxes: Lista de recuadros (x0, arriba, x1, abajo) como fracción de la página,
+            con el origen en la esquina superior izquierda.
+        """
+        page = self.pages[index]
+        x0, top, x1, bottom = page.bbox
+        ancho, alto = x1 - x0, bottom - top
+        try:
+            return [
+                page.within_bbox(
+                    (x0 + bx0 * ancho, top + btop * alto, x0 + bx1 * ancho, top + bbottom * alto)
+                ).extract_text()
+                for bx0, btop, bx1, bbottom in boxes
+            ]
+        finally:
+            page.close()
+
+    def page_has_text(self, index):
+        """
+        Indica si la página tiene texto mirando solo sus recursos y su flujo de contenido
+        (operadores Tj/TJ), sin el análisis de layout de extract_text.
+        """
+        page_obj = self.pages[index].page_obj
+        resources = resolve1(page_obj.resources) or {}
+        xobjects = resolve1(resources.get("XObject")) or {}
+        # Un formulario (Form XObject) puede contener texto propio: ante la duda, se asume que sí
+        tiene_formularios = any(
+            getattr(resolve1(xobject), "attrs", {}).get("Subtype") is not None
+            and resolve1(xobject).attrs["Subtype"].name == "Form"
+            for xobject in xobjects.values()
+        )
+        if tiene_formularios:
+            return True
+        if not resolve1(resources.get("Font")):
+            return False
+        return any(_TEXT_OPERATOR.search(resolve1(stream).get_data()) for stream in page_obj.contents)
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Pypdfium2Backend:
+    """
+    Backend de texto basado en pypdfium2: lee la capa de texto directamente con PDFium,
+    sin análisis de layout, por lo que es mucho más rápido que pdfplumber.
+    """
+    name = "pypdfium2"
+
+    def __init__(self, pdf_file):
+        self._pdf = pdfium.PdfDocument(pdf_file)
+
+    def __len__(self):
+        return len(self._pdf)
+
+    def page_text(self, index):
+        """
+        Devuelve el texto de una página con saltos de línea normalizados.
+        """
+        page = self._pdf[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+    def page_text_in_boxes(self, index, boxes):
+        """
+        Devuelve el texto de cada recuadro de una página (ver PdfplumberBackend.page_text_in_boxes).
+        PDFium usa el origen en la esquina inferior izquierda, por lo que se invierte el eje vertical.
+        """
+        page = self._pdf[index]
+        textpage = page.get_textpage()
+        try:
+            x0, y0, x1, y1 = page.get_mediabox()
+            ancho, alto = x1 - x0, y1 - y0
+            return [
+                textpage.get_text_bounded(
+                    left=x0 + bx0 * ancho, bottom=y1 - bbottom * alto, right=x0 + bx1 * ancho, top=y1 - btop * alto
+                ).replace("\r\n", "\n").replace("\r", "\n")
+                for bx0, btop, bx1, bbottom in boxes
+            ]
+        finally:
+            textpage.close()
+            page.close()
+
+    def page_has_text(self, index):
+        """
+        Indica si la página tiene objetos de texto (metadatos de los objetos de la página,
+        sin extraer el texto).
+        """
+        page = self._pdf[index]
+        try:
+            return any(True for _ in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_TEXT]))
+        finally:
+            page.close()
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PageRange:
+    """
+    Vista de un rango de páginas [inicio, fin) de un PDF ya abierto, con la misma interfaz que
+    los backends: permite extraer cada orden de compra de un PDF con varias como si fuera un
+    documento independiente.
+    """
+
+    def __init__(self, document, start, end):
+        self._document = document
+        self._start = start
+        self._end = min(end, len(document))
+        self.name = document.name
+
+    def __len__(self):
+        return max(0, self._end - self._start)
+
+    def page_text(self, index):
+        return self._document.page_text(self._start + index)
+
+    def page_text_in_boxes(self, index, boxes):
+        return self._document.page_text_in_boxes(self._start + index, boxes)
+
+    def page_has_text(self, index):
+        return self._document.page_has_text(self._start + index)
+
+
+TEXT_BACKENDS = {PdfplumberBackend.name: PdfplumberBackend}
+if pdfium is not None:
+    TEXT_BACKENDS[Pypdfium2Backend.name] = Pypdfium2Backend
+
+# Backend usado cuando no se indica uno explícitamente (variable de entorno OC_TEXT_BACKEND)
+DEFAULT_TEXT_BACKEND = os.environ.get(
+    "OC_TEXT_BACKEND", Pypdfium2Backend.name if pdfium is not None else PdfplumberBackend.name
+)
+
+
+def set_default_text_backend(name):
+    """
+    Cambia globalmente el backend de texto por defecto.
+    """
+    global DEFAULT_TEXT_BACKEND
+    if name not in TEXT_BACKENDS:
+        raise ValueError(f"Backend de texto no disponible: {name}")
+    DEFAULT_TEXT_BACKEND = name
+
+
+def resolve_text_backend(name=None):
+    """
+    Devuelve el nombre del backend a usar (el indicado o el por defecto).
+    """
+    name = name or DEFAULT_TEXT_BACKEND
+    if name not in TEXT_BACKENDS:
+        raise ValueError(f"Backend de texto no disponible: {name}")
+    return name
+
+
+def open_text_backend(pdf_file, name=None):
+    """
+    Abre un PDF con el backend indicado. Debe usarse como administrador de contexto.
+    """
+    return TEXT_BACKENDS[resolve_text_backend(name)](pdf_file)
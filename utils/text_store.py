@@ -0,0 +1,186 @@
+import os
+import gzip
+import json
+
+import pandas as pd
+
+from utils.pdf_extraction import extract_fields_from_text, format_rut
+from utils.order_store import get_store_file, update_ordenes_extraidas
+
+# Carpeta (dentro del directorio de datos de cada usuario) con el texto original de los PDFs
+TEXT_STORE_DIRNAME = "textos_pdf"
+
+# Índice hash -> {"nombre", "orden_de_compra"}: relaciona cada texto guardado con su orden
+# en el perfil del usuario mediante la orden de compra extraída la última vez
+TEXT_STORE_INDEX = "indice.json"
+
+
+def get_text_store_dir(user_data_path):
+    """
+    Devuelve la carpeta donde se guarda el texto original de los PDFs de un usuario.
+    """
+    return os.path.join(user_data_path, TEXT_STORE_DIRNAME)
+
+
+def _text_path(store_dir, file_hash):
+    return os.path.join(store_dir, f"{file_hash}.json.gz")
+
+
+def store_page_texts(store_dir, file_hash, page_texts):
+    """
+    Guarda comprimido el texto de cada página de un PDF, identificado por su hash de contenido.
+    """
+    try:
+        os.makedirs(store_dir, exist_ok=True)
+        path = _text_path(store_dir, file_hash)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(page_texts, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Advertencia: no se pudo guardar el texto del PDF {file_hash}: {e}")
+
+
+def load_page_texts(store_dir, file_hash):
+    """
+    Carga el texto guardado de un PDF.
+    :return: Lista con el texto de cada página (None en las no leídas) o None si no existe.
+    """
+    try:
+        with gzip.open(_text_path(store_dir, file_hash), 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: texto guardado inválido para {file_hash}: {e}")
+        return None
+
+
+def load_text_store_index(store_dir):
+    """
+    Carga el índice de textos guardados (diccionario hash -> información del documento).
+    """
+    path = os.path.join(store_dir, TEXT_STORE_INDEX)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: no se pudo leer el índice de textos: {e}")
+        return {}
+
+
+def save_text_store_index(store_dir, index):
+    """
+    Guarda el índice de textos guardados.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, TEXT_STORE_INDEX)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def update_text_store_index(store_dir, entries):
+    """
+    Añade o actualiza entradas del índice de textos guardados.
+    :param entries: Diccionario hash -> {"nombre": ..., "orden_de_compra": ...}.
+    """
+    if not entries:
+        return
+    index = load_text_store_index(store_dir)
+    index.update(entries)
+    save_text_store_index(store_dir, index)
+
+
+def _is_empty(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip()) or (
+        not isinstance(valor, str) and pd.api.types.is_scalar(valor) and pd.isna(valor)
+    )
+
+
+def reextract_orders(user_data_path, dry_run=False):
+    """
+    Vuelve a aplicar las reglas de extracción vigentes sobre el texto guardado de todos los
+    PDFs del usuario y corrige en su perfil (ver order_store) solo los campos que cambian.
+    Un campo que las reglas no encuentran no reemplaza el valor guardado. Cada texto se
+    relaciona con su orden mediante la orden de compra registrada en el índice. Las órdenes
+    se leen y se escriben en una sola transacción.
+
+    Args:
+        user_data_path (str): Carpeta de datos del usuario.
+        dry_run (bool): Si es True, solo calcula los cambios sin escribir.
+
+    Returns:
+        dict: Resumen con "documentos", "filas_actualizadas", "campos_modificados",
+        "sin_fila", "sin_texto" y "cambios" (lista de (orden, campo, antes, después)).
+    """
+    store_dir = get_text_store_dir(user_data_path)
+    index = load_text_store_index(store_dir)
+
+    resumen = {
+        "documentos": len(index),
+        "filas_actualizadas": 0,
+        "campos_modificados": 0,
+        "sin_fila": 0,
+        "sin_texto": 0,
+        "cambios": [],
+    }
+
+    # Orden de compra registrada -> documentos con texto guardado y sus campos re-extraídos
+    documentos_por_orden = {}
+    for file_hash, info in index.items():
+        page_texts = load_page_texts(store_dir, file_hash)
+        if page_texts is None:
+            resumen["sin_texto"] += 1
+            continue
+
+        datos = extract_fields_from_text(page_texts)
+        if datos.get("RUT Proveedor"):
+            datos["RUT Proveedor"] = format_rut(datos["RUT Proveedor"])
+        documentos_por_orden.setdefault(str(info.get("orden_de_compra")), []).append((info, datos))
+
+    encontradas = set()
+
+    def cambios_de(guardada):
+        if _is_empty(guardada.get("Orden de Compra")):
+            return {}
+        orden = str(guardada["Orden de Compra"])
+        cambios = {}
+        for info, datos in documentos_por_orden.get(orden, []):
+            encontradas.add(orden)
+            for campo, valor in datos.items():
+                # Un campo que las reglas vigentes no encuentran no borra lo guardado
+                # (puede ser una corrección manual)
+                if _is_empty(valor):
+                    continue
+                anterior = cambios.get(campo, guardada.get(campo))
+                if not _is_empty(anterior) and anterior == valor:
+                    continue
+                cambios[campo] = valor
+                resumen["campos_modificados"] += 1
+                resumen["cambios"].append((info.get("orden_de_compra"), campo, anterior, valor))
+        return cambios
+
+    try:
+        resumen["filas_actualizadas"] = update_ordenes_extraidas(
+            get_store_file(user_data_path), cambios_de, dry_run=dry_run
+        )
+    except Exception as e:
+        print(f"No se pudieron actualizar las órdenes guardadas: {e}")
+        return resumen
+
+    for orden, documentos in documentos_por_orden.items():
+        if orden not in encontradas:
+            resumen["sin_fila"] += len(documentos)
+            continue
+        for info, datos in documentos:
+            if datos.get("Orden de Compra"):
+                info["orden_de_compra"] = datos["Orden de Compra"]
+
+    if not dry_run and resumen["filas_actualizadas"]:
+        save_text_store_index(store_dir, index)
+
+    return resumen
@@ -0,0 +1,295 @@
+import os
+import time
+import queue
+import shutil
+import threading
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+from utils.pdf_extraction import format_rut
+from utils.batch_extraction import iter_extract_batch, load_processed_orders, compute_content_hash, format_result_name
+from utils.order_store import get_store_file, append_ordenes_extraidas
+from utils.extraction_cache import get_extraction_cache_dir
+from utils.text_store import get_text_store_dir
+from utils.manual_entry import get_manual_queue_file, add_to_manual_queue
+
+# Carpeta de entrada (dentro del directorio de datos de cada usuario) donde se dejan los PDFs
+WATCH_DIRNAME = "entrada_pdf"
+
+# Subcarpetas a las que se mueven los PDFs ya procesados, los que no se pudieron leer
+# y los escaneados (sin capa de texto), que requieren ingreso manual
+PROCESSED_DIRNAME = "procesados"
+FAILED_DIRNAME = "con_error"
+MANUAL_DIRNAME = "ingreso_manual"
+
+# Segundos sin cambios (ni eventos ni tamaño) antes de considerar que un PDF terminó de copiarse
+DEBOUNCE_SECONDS = 2.0
+
+# Capacidad de la cola entre la detección y la extracción; al llenarse, los archivos
+# detectados esperan en la carpeta hasta que haya espacio (contrapresión)
+WATCH_QUEUE_SIZE = 200
+
+# Máximo de PDFs extraídos (y guardados en el perfil del usuario) en cada lote
+WATCH_BATCH_SIZE = 50
+
+# Intervalo de revisión de los hilos de servicio
+POLL_SECONDS = 0.5
+
+
+def get_watch_dir(user_data_path):
+    """
+    Devuelve la carpeta de entrada vigilada de un usuario.
+    """
+    return os.path.join(user_data_path, WATCH_DIRNAME)
+
+
+def _mover_archivo(ruta, carpeta):
+    """
+    Mueve un archivo a una subcarpeta sin sobrescribir otro con el mismo nombre.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    destino = os.path.join(carpeta, os.path.basename(ruta))
+    if os.path.exists(destino):
+        base, extension = os.path.splitext(destino)
+        destino = f"{base}_{time.strftime('%Y%m%d%H%M%S')}{extension}"
+    try:
+        shutil.move(ruta, destino)
+    except OSError as e:
+        print(f"Advertencia: no se pudo mover {ruta}: {e}")
+
+
+class _DropFolderHandler(FileSystemEventHandler):
+    """
+    Registra los PDFs creados, modificados o movidos a la carpeta de entrada.
+    No procesa nada: solo marca la hora del último evento para el antirrebote.
+    """
+
+    def __init__(self, service):
+        super().__init__()
+        self._service = service
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._service.mark_pending(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._service.mark_pending(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._service.mark_pending(event.dest_path)
+
+
+class WatchFolderService:
+    """
+    Servicio de ingesta que vigila la carpeta de entrada de un usuario y agrega las órdenes
+    de compra de los PDFs nuevos a su perfil (ver order_store).
+
+    Tres etapas desacopladas:
+    - watchdog marca los archivos con eventos (nunca se bloquea);
+    - el antirrebote pasa a la cola los PDFs que dejaron de cambiar;
+    - el extractor toma lotes de la cola y los procesa con iter_extract_batch, cada PDF
+      en un proceso aislado (un archivo dañado no detiene el servicio).
+    La cola es acotada: ante ráfagas de cientos de archivos el antirrebote espera
+    y los archivos restantes quedan en la carpeta hasta que el extractor avance.
+    """
+
+    def __init__(self, user_id, user_data_path, max_workers=None, backend=None,
+                 debounce_seconds=DEBOUNCE_SECONDS, queue_size=WATCH_QUEUE_SIZE, batch_size=WATCH_BATCH_SIZE,
+                 split_orders=False):
+        self.user_id = user_id
+        self.user_data_path = user_data_path
+        self.watch_dir = get_watch_dir(user_data_path)
+        self.store_file = get_store_file(user_data_path)
+        self.max_workers = max_workers
+        self.backend = backend
+        self.debounce_seconds = debounce_seconds
+        self.batch_size = batch_size
+        self.split_orders = split_orders
+        self.estadisticas = {"ok": 0, "duplicado": 0, "error": 0, "manual": 0, "lotes": 0}
+
+        self._cola = queue.Queue(maxsize=queue_size)
+        self._pendientes = {}  # ruta -> (último evento, último tamaño observado)
+        self._encolados = set()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._observer = None
+        self._hilos = []
+
+    def mark_pending(self, ruta):
+        """
+        Registra (o renueva) un PDF de la carpeta de entrada para el antirrebote.
+        """
+        ruta = os.path.abspath(ruta)
+        if not ruta.lower().endswith(".pdf") or os.path.dirname(ruta) != os.path.abspath(self.watch_dir):
+            return
+        with self._lock:
+            if ruta not in self._encolados:
+                self._pendientes[ruta] = (time.monotonic(), None)
+
+    def start(self):
+        """
+        Inicia la vigilancia. Los PDFs que ya estaban en la carpeta también se procesan.
+        """
+        os.makedirs(self.watch_dir, exist_ok=True)
+        for nombre in sorted(os.listdir(self.watch_dir)):
+            self.mark_pending(os.path.join(self.watch_dir, nombre))
+
+        self._observer = Observer()
+        self._observer.schedule(_DropFolderHandler(self), self.watch_dir, recursive=False)
+        self._observer.start()
+
+        self._hilos = [
+            threading.Thread(target=self._debounce_loop, name="oc-antirrebote", daemon=True),
+            threading.Thread(target=self._worker_loop, name="oc-extractor", daemon=True),
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def stop(self):
+        """
+        Detiene la vigilancia y espera a que termine el lote en curso.
+        Lo que quede en la cola vuelve a detectarse al iniciar de nuevo (los archivos siguen en la carpeta).
+        """
+        self._detener.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for hilo in self._hilos:
+            hilo.join()
+
+    def _debounce_loop(self):
+        while not self._detener.is_set():
+            ahora = time.monotonic()
+            listos = []
+            with self._lock:
+                for ruta, (ultimo_evento, tamano_anterior) in list(self._pendientes.items()):
+                    if ahora - ultimo_evento < self.debounce_seconds:
+                        continue
+                    try:
+                        tamano = os.path.getsize(ruta)
+                    except OSError:
+                        # El archivo se eliminó o se movió antes de procesarlo
+                        del self._pendientes[ruta]
+                        continue
+                    if tamano != tamano_anterior or tamano == 0:
+                        # Todavía se está copiando: esperar otro intervalo completo
+                        self._pendientes[ruta] = (ahora, tamano)
+                        continue
+                    listos.append(ruta)
+
+            for ruta in sorted(listos):
+                try:
+                    self._cola.put(ruta, timeout=POLL_SECONDS)
+                except queue.Full:
+                    # Contrapresión: el resto sigue pendiente hasta que el extractor libere espacio
+                    break
+                with self._lock:
+                    self._pendientes.pop(ruta, None)
+                    self._encolados.add(ruta)
+
+            self._detener.wait(POLL_SECONDS)
+
+    def _worker_loop(self):
+        while not self._detener.is_set():
+            try:
+                lote = [self._cola.get(timeout=POLL_SECONDS)]
+            except queue.Empty:
+                continue
+            while len(lote) < self.batch_size:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            fallido = False
+            try:
+                self.process_batch(lote)
+            except Exception as e:
+                # Un lote fallido no debe detener el servicio: los archivos siguen en la carpeta
+                # y se reintentan
+                print(f"Error al procesar el lote de la carpeta de entrada: {e}")
+                fallido = True
+            finally:
+                with self._lock:
+                    self._encolados.difference_update(lote)
+            if fallido:
+                for ruta in lote:
+                    if os.path.exists(ruta):
+                        self.mark_pending(ruta)
+
+    def process_batch(self, rutas):
+        """
+        Extrae un lote de PDFs de la carpeta de entrada, agrega las órdenes nuevas al perfil
+        del usuario y mueve cada archivo a procesados/ o con_error/.
+        :return: Lista de resultados de iter_extract_batch.
+        """
+        documentos = []
+        for ruta in rutas:
+            try:
+                with open(ruta, "rb") as f:
+                    contenido = f.read()
+            except OSError as e:
+                print(f"Advertencia: no se pudo leer {ruta}: {e}")
+                continue
+            documentos.append((ruta, contenido, compute_content_hash(contenido)))
+
+        if not documentos:
+            return []
+
+        # Se leen en cada lote (solo la columna indexada): incluyen las que el usuario guardó
+        # desde la Página 1 mientras tanto
+        processed_orders = load_processed_orders(self.store_file, self.user_id)
+        resultados = list(iter_extract_batch(
+            documentos,
+            processed_orders,
+            self.user_id,
+            max_workers=self.max_workers,
+            cache_dir=get_extraction_cache_dir(self.user_data_path),
+            incremental=True,
+            backend=self.backend,
+            text_store_dir=get_text_store_dir(self.user_data_path),
+            isolated=True,
+            split_orders=self.split_orders
+        ))
+
+        filas = []
+        for resultado in resultados:
+            datos = resultado["datos"]
+            if datos:
+                if "RUT Proveedor" in datos:
+                    datos["RUT Proveedor"] = format_rut(datos["RUT Proveedor"])
+                filas.append(datos)
+
+        # Guardar antes de mover: si la escritura falla, los PDFs siguen en la carpeta de entrada
+        if filas:
+            append_ordenes_extraidas(self.store_file, filas)
+
+        add_to_manual_queue(get_manual_queue_file(self.user_data_path), resultados)
+
+        # Un PDF con varias órdenes entrega un resultado por orden: se mueve una sola vez,
+        # a con_error/ si alguna de sus órdenes no se pudo leer
+        carpetas = {"error": FAILED_DIRNAME, "manual": MANUAL_DIRNAME}
+        destinos = {}
+        for resultado in resultados:
+            if resultado["estado"] == "error":
+                print(f"Error en {os.path.basename(format_result_name(resultado))}: {resultado['motivo']}")
+            carpeta = carpetas.get(resultado["estado"], PROCESSED_DIRNAME)
+            # El nombre de cada documento es la ruta del PDF en la carpeta de entrada
+            if destinos.get(resultado["nombre"]) != FAILED_DIRNAME:
+                destinos[resultado["nombre"]] = carpeta
+            self.estadisticas[resultado["estado"]] += 1
+        for ruta, carpeta in destinos.items():
+            _mover_archivo(ruta, os.path.join(self.watch_dir, carpeta))
+        self.estadisticas["lotes"] += 1
+
+        print(
+            f"[{time.strftime('%H:%M:%S')}] Lote de {len(destinos)} PDF(s): "
+            f"{sum(r['estado'] == 'ok' for r in resultados)} nuevas, "
+            f"{sum(r['estado'] == 'duplicado' for r in resultados)} duplicadas, "
+            f"{sum(r['estado'] == 'error' for r in resultados)} con error, "
+            f"{sum(r['estado'] == 'manual' for r in resultados)} para ingreso manual "
+            f"(en espera: {self._cola.qsize()} en cola, {len(self._pendientes)} por confirmar)"
+        )
+        return resultados
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: el bloqueo solo cubre los hilos de este proceso
+    fcntl = None
+
+# Ruta del libro -> cerrojo de los hilos de este proceso (reentrante: quien tiene el libro
+# bloqueado puede llamar a write_cells u otra escritura del mismo libro)
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+# Ruta del libro -> archivo .lock abierto por el hilo que tiene el cerrojo
+_lock_files = {}
+
+
+def _thread_lock(ruta):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(ruta, threading.RLock())
+
+
+@contextmanager
+def workbook_lock(workbook_file):
+    """
+    Bloqueo exclusivo de un libro para una lectura-modificación-escritura completa. Lo
+    respetan todos los que escriben el libro (la aplicación, la vigilancia de carpeta y los
+    scripts), también desde otros procesos: se usa fcntl.flock sobre un archivo "<libro>.lock"
+    junto al libro. Es reentrante dentro de un mismo hilo.
+    """
+    ruta = os.path.abspath(workbook_file)
+    with _thread_lock(ruta):
+        if fcntl is None or ruta in _lock_files:
+            yield
+            return
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(f"{ruta}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _lock_files[ruta] = lock_file
+            try:
+                yield
+            finally:
+                del _lock_files[ruta]
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def unique_temp_path(path):
+    """
+    Crea un temporal vacío con nombre único en la carpeta de un archivo, para escribirlo ahí
+    y reemplazar el archivo con os.replace sin chocar con otro escritor. Conserva la
+    extensión (openpyxl valida que sea .xlsx).
+    :return: Ruta del temporal (quien llama debe moverlo o borrarlo).
+    """
+    carpeta, nombre = os.path.split(path)
+    root, extension = os.path.splitext(nombre)
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{root}.", suffix=f".tmp{extension}", dir=carpeta or ".")
+    os.close(fd)
+    # mkstemp lo crea solo para el dueño: el archivo reemplazado conserva sus permisos
+    os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+    return tmp_path
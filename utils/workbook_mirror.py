@@ -0,0 +1,432 @@
+import os
+import json
+import uuid
+
+import openpyxl
+import pandas as pd
+
+from utils.dataset_cache import invalidate_cache
+from utils.xlsx_package import patch_cells, transplant_sheets
+from utils.workbook_lock import workbook_lock, unique_temp_path
+
+# Carpeta (junto a los libros Excel del control) con una copia en Parquet de cada libro.
+# Leer Parquet con solo las columnas necesarias evita volver a interpretar el Excel
+# completo con openpyxl en cada recarga de la página.
+MIRROR_DIRNAME = "espejo_parquet"
+MIRROR_MANIFEST = "manifest.json"
+
+# Índices de filas ya construidos: (ruta del libro, columna) -> (versión del libro, índice)
+_row_indices = {}
+
+
+def get_mirror_dir(workbook_file):
+    """
+    Devuelve la carpeta de la copia en Parquet de un libro Excel.
+    """
+    carpeta, nombre = os.path.split(workbook_file)
+    return os.path.join(carpeta, MIRROR_DIRNAME, os.path.splitext(nombre)[0])
+
+
+def _workbook_key(workbook_file):
+    """
+    Identifica la versión de un libro por su fecha de modificación y su tamaño.
+    """
+    stat = os.stat(workbook_file)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _load_manifest(mirror_dir):
+    try:
+        with open(os.path.join(mirror_dir, MIRROR_MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_mirror(workbook_file, hojas, huellas=None):
+    """
+    Guarda la copia en Parquet de un libro Excel recién escrito (escritura simultánea:
+    quien escribe el libro ya tiene los DataFrames y no hace falta volver a leerlo).
+    Si alguna hoja no se puede convertir (p. ej. una columna con textos y números), no se
+    deja copia y los lectores usan el Excel.
+
+    Args:
+        workbook_file (str): Ruta del libro Excel ya guardado.
+        hojas (dict): Nombre de la hoja -> DataFrame, en el orden del libro.
+        huellas (dict, optional): Nombre de la hoja -> huella de los datos de los que se
+            generó, para reescribir luego solo las hojas que cambien (ver get_sheet_fingerprints).
+
+    Returns:
+        bool: True si la copia quedó vigente.
+    """
+    invalidate_cache(workbook_file)
+    mirror_dir = get_mirror_dir(workbook_file)
+    try:
+        os.makedirs(mirror_dir, exist_ok=True)
+        # Archivos con un sufijo nuevo en cada escritura: un lector con el manifiesto anterior
+        # nunca mezcla hojas de dos versiones (si ya no encuentra sus archivos, usa el Excel)
+        sufijo = uuid.uuid4().hex[:8]
+        manifest = {"libro": _workbook_key(workbook_file), "hojas": []}
+        for i, (nombre, df) in enumerate(hojas.items()):
+            manifest["hojas"].append(_write_mirror_sheet(mirror_dir, i, sufijo, nombre, df, huellas))
+        _save_manifest(mirror_dir, manifest)
+        vigentes = {hoja["archivo"] for hoja in manifest["hojas"]}
+        exito = True
+    except Exception as e:
+        print(f"Advertencia: no se pudo guardar la copia en Parquet de {workbook_file}: {e}")
+        invalidate_mirror(workbook_file)
+        vigentes = set()
+        exito = False
+
+    _remove_stale_files(mirror_dir, vigentes)
+    return exito
+
+
+def _write_mirror_sheet(mirror_dir, i, sufijo, nombre, df, huellas):
+    """
+    Guarda una hoja en Parquet.
+    :return: Entrada de la hoja en el manifiesto.
+    """
+    archivo = f"hoja_{i:03d}_{sufijo}.parquet"
+    df.to_parquet(os.path.join(mirror_dir, archivo), index=False)
+    hoja = {
+        "nombre": str(nombre),
+        "archivo": archivo,
+        "columnas": [str(col) for col in df.columns],
+        "filas": len(df),
+    }
+    if huellas and huellas.get(nombre) is not None:
+        hoja["huella"] = huellas[nombre]
+    return hoja
+
+
+def _save_manifest(mirror_dir, manifest):
+    tmp_path = unique_temp_path(os.path.join(mirror_dir, MIRROR_MANIFEST))
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(mirror_dir, MIRROR_MANIFEST))
+
+
+def _remove_stale_files(mirror_dir, vigentes):
+    """
+    Elimina los archivos de versiones anteriores del libro.
+    """
+    for archivo in os.listdir(mirror_dir) if os.path.isdir(mirror_dir) else []:
+        if archivo.endswith(".parquet") and archivo not in vigentes:
+            try:
+                os.remove(os.path.join(mirror_dir, archivo))
+            except OSError:
+                pass
+
+
+def invalidate_mirror(workbook_file):
+    """
+    Elimina el manifiesto de la copia en Parquet (la próxima lectura usará el Excel).
+    """
+    try:
+        os.remove(os.path.join(get_mirror_dir(workbook_file), MIRROR_MANIFEST))
+    except OSError:
+        pass
+
+
+def _project(columnas, columns):
+    """
+    Columnas de la hoja que corresponden a las pedidas (sin distinguir mayúsculas ni espacios).
+    """
+    if columns is None:
+        return None
+    pedidas = {str(col).lower().strip() for col in columns}
+    return [col for col in columnas if str(col).lower().strip() in pedidas]
+
+
+def _read_from_mirror(workbook_file, columns, sheets):
+    manifest = _load_manifest(get_mirror_dir(workbook_file))
+    if not manifest or manifest.get("libro") != _workbook_key(workbook_file):
+        return None
+    hojas = {}
+    try:
+        for hoja in manifest["hojas"]:
+            if sheets is not None and hoja["nombre"] not in sheets:
+                continue
+            hojas[hoja["nombre"]] = pd.read_parquet(
+                os.path.join(get_mirror_dir(workbook_file), hoja["archivo"]),
+                columns=_project(hoja["columnas"], columns)
+            )
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: copia en Parquet de {workbook_file} ilegible, se usará el Excel: {e}")
+        return None
+    return hojas
+
+
+def read_workbook(workbook_file, columns=None, sheets=None):
+    """
+    Lee las hojas de un libro Excel del control desde su copia en Parquet, cargando solo
+    las columnas pedidas. El Excel se interpreta únicamente si la copia no existe o no
+    corresponde a la versión actual del libro (fecha de modificación y tamaño); en ese
+    caso la copia se regenera.
+
+    Args:
+        workbook_file (str): Ruta del libro Excel.
+        columns (list, optional): Columnas a cargar (sin distinguir mayúsculas); las que
+            no existen en una hoja se omiten. None carga todas.
+        sheets (list, optional): Hojas a cargar. None carga todas.
+
+    Returns:
+        dict: Nombre de la hoja -> DataFrame, en el orden del libro, o None si el libro no existe.
+    """
+    if not os.path.exists(workbook_file):
+        return None
+    hojas = _read_from_mirror(workbook_file, columns, sheets)
+    if hojas is not None:
+        return hojas
+
+    excel = pd.ExcelFile(workbook_file)
+    todas = {hoja: excel.parse(hoja) for hoja in excel.sheet_names}
+    write_mirror(workbook_file, todas)
+    return {
+        hoja: df if columns is None else df[_project(df.columns, columns)]
+        for hoja, df in todas.items()
+        if sheets is None or hoja in sheets
+    }
+
+
+def get_row_index(workbook_file, column):
+    """
+    Índice de las filas de un libro según los valores de una columna (por ejemplo,
+    orden de compra -> licitación y fila). Se construye leyendo solo esa columna desde la
+    copia en Parquet y se reutiliza mientras el libro no cambie.
+
+    Args:
+        workbook_file (str): Ruta del libro Excel.
+        column (str): Columna indexada (sin distinguir mayúsculas).
+
+    Returns:
+        dict: Valor como texto -> lista de (hoja, posición); la posición 0 es la fila 2 del
+            Excel (la fila 1 tiene los encabezados). None si el libro no existe.
+    """
+    if not os.path.exists(workbook_file):
+        return None
+    clave = (os.path.abspath(workbook_file), str(column).lower().strip())
+    version = _workbook_key(workbook_file)
+    guardado = _row_indices.get(clave)
+    if guardado and guardado[0] == version:
+        return guardado[1]
+
+    indice = {}
+    for hoja, df in (read_workbook(workbook_file, columns=[column]) or {}).items():
+        if df.columns.empty:
+            continue
+        for posicion, valor in enumerate(df.iloc[:, 0].astype(str)):
+            indice.setdefault(valor, []).append((hoja, posicion))
+    _row_indices[clave] = (version, indice)
+    return indice
+
+
+def _column_number(ws, column):
+    """
+    Número de la columna de una hoja cuyo encabezado corresponde a column, o None.
+    """
+    for numero, celda in enumerate(ws[1], start=1):
+        if celda.value is not None and str(celda.value).lower().strip() == str(column).lower().strip():
+            return numero
+    return None
+
+
+def _update_mirror_sheets(workbook_file, manifest, cambios):
+    """
+    Aplica a la copia en Parquet las celdas escritas en el libro, reescribiendo solo las
+    hojas afectadas.
+    """
+    mirror_dir = get_mirror_dir(workbook_file)
+    sufijo = uuid.uuid4().hex[:8]
+    for i, hoja in enumerate(manifest["hojas"]):
+        if hoja["nombre"] not in cambios:
+            continue
+        df = pd.read_parquet(os.path.join(mirror_dir, hoja["archivo"]))
+        for posicion, columna, valor in cambios[hoja["nombre"]]:
+            col = _project(df.columns, [columna])[0]
+            if not pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].astype(object)
+            df.iat[posicion, df.columns.get_loc(col)] = valor
+        hoja["archivo"] = f"hoja_{i:03d}_{sufijo}.parquet"
+        df.to_parquet(os.path.join(mirror_dir, hoja["archivo"]), index=False)
+        # La hoja ya no corresponde a los datos de los que se generó
+        hoja.pop("huella", None)
+    manifest["libro"] = _workbook_key(workbook_file)
+    _save_manifest(mirror_dir, manifest)
+    _remove_stale_files(mirror_dir, {hoja["archivo"] for hoja in manifest["hojas"]})
+
+
+def _column_positions(manifest, celdas):
+    """
+    Número de columna de cada celda según los encabezados guardados en el manifiesto.
+    :return: Hoja -> lista de (fila de Excel, número de columna, valor), o None si falta alguna hoja o columna.
+    """
+    columnas = {hoja["nombre"]: hoja["columnas"] for hoja in manifest["hojas"]}
+    cambios = {}
+    for hoja, posicion, columna, valor in celdas:
+        encontradas = _project(columnas.get(hoja, []), [columna])
+        if not encontradas:
+            return None
+        numero = columnas[hoja].index(encontradas[0]) + 1
+        cambios.setdefault(hoja, []).append((posicion + 2, numero, valor))
+    return cambios
+
+
+def _write_cells_openpyxl(workbook_file, celdas):
+    """
+    Escribe las celdas abriendo el libro completo con openpyxl.
+    :return: True si se agregó alguna columna (la copia en Parquet ya no corresponde).
+    """
+    wb = openpyxl.load_workbook(workbook_file)
+    columna_nueva = False
+    for hoja, posicion, columna, valor in celdas:
+        ws = wb[hoja]
+        numero = _column_number(ws, columna)
+        if numero is None:
+            numero = ws.max_column + 1
+            ws.cell(row=1, column=numero, value=columna)
+            columna_nueva = True
+        ws.cell(row=posicion + 2, column=numero, value=valor)
+
+    tmp_path = unique_temp_path(workbook_file)
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, workbook_file)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return columna_nueva
+
+
+def write_cells(workbook_file, celdas):
+    """
+    Escribe celdas sueltas en un libro Excel sin reconstruir sus hojas con pandas. Si la
+    copia en Parquet está vigente, se edita solo el XML de las hojas afectadas (ver
+    xlsx_package.patch_cells), con un costo que no depende de las demás hojas; si no, el
+    libro se abre con openpyxl. En la copia en Parquet solo se reescriben las hojas
+    afectadas, y los índices de filas del libro siguen vigentes (salvo el de una columna escrita).
+    El libro queda bloqueado mientras se escribe (ver workbook_lock).
+
+    Args:
+        workbook_file (str): Ruta del libro Excel.
+        celdas (list): Tuplas (hoja, posición, columna, valor), con la posición de get_row_index.
+            Si la hoja no tiene la columna, se agrega al final de los encabezados.
+
+    Returns:
+        bool: True si el libro se guardó correctamente, False en caso de error.
+    """
+    with workbook_lock(workbook_file):
+        try:
+            version = _workbook_key(workbook_file)
+            manifest = _load_manifest(get_mirror_dir(workbook_file))
+            copia_vigente = bool(manifest) and manifest.get("libro") == version
+
+            posiciones = _column_positions(manifest, celdas) if copia_vigente else None
+            if posiciones is None or not patch_cells(workbook_file, posiciones):
+                if _write_cells_openpyxl(workbook_file, celdas):
+                    copia_vigente = False
+        except Exception as e:
+            print(f"Error al escribir las celdas de {workbook_file}: {e}")
+            return False
+
+        invalidate_cache(workbook_file)
+        cambios = {}
+        for hoja, posicion, columna, valor in celdas:
+            cambios.setdefault(hoja, []).append((posicion, columna, valor))
+        try:
+            if copia_vigente:
+                _update_mirror_sheets(workbook_file, manifest, cambios)
+            else:
+                invalidate_mirror(workbook_file)
+        except Exception as e:
+            print(f"Advertencia: no se pudo actualizar la copia en Parquet de {workbook_file}: {e}")
+            invalidate_mirror(workbook_file)
+
+        # Las filas no se movieron: los índices de otras columnas siguen sirviendo para la nueva versión
+        ruta = os.path.abspath(workbook_file)
+        escritas = {str(columna).lower().strip() for _, _, columna, _ in celdas}
+        nueva_version = _workbook_key(workbook_file)
+        for clave, (version_indice, indice) in list(_row_indices.items()):
+            if clave[0] != ruta:
+                continue
+            if version_indice == version and clave[1] not in escritas:
+                _row_indices[clave] = (nueva_version, indice)
+            else:
+                del _row_indices[clave]
+        return True
+
+
+def get_sheet_fingerprints(workbook_file):
+    """
+    Huellas guardadas con la copia en Parquet (ver write_mirror) de cada hoja de un libro.
+
+    Returns:
+        dict: Nombre de la hoja -> huella (None si no se guardó), en el orden del libro, o
+            None si el libro no existe o su copia no está vigente.
+    """
+    if not os.path.exists(workbook_file):
+        return None
+    manifest = _load_manifest(get_mirror_dir(workbook_file))
+    if not manifest or manifest.get("libro") != _workbook_key(workbook_file):
+        return None
+    return {hoja["nombre"]: hoja.get("huella") for hoja in manifest["hojas"]}
+
+
+def replace_sheets(workbook_file, hojas, huellas=None):
+    """
+    Reescribe algunas hojas de un libro Excel del control con el mismo contenido que
+    tendrían al escribir el libro completo con pandas: solo esas hojas se generan (en un
+    libro aparte, cuyo XML se copia al libro con xlsx_package.transplant_sheets) y solo sus
+    archivos de la copia en Parquet se reemplazan. Las demás hojas no se vuelven a escribir.
+
+    Args:
+        workbook_file (str): Ruta del libro Excel; su copia en Parquet debe estar vigente.
+        hojas (dict): Nombre de una hoja existente -> DataFrame con su nuevo contenido.
+        huellas (dict, optional): Nombre de la hoja -> huella (ver write_mirror).
+
+    Returns:
+        bool: True si se reemplazaron; False si no se pudo (el libro no cambia y debe
+            escribirse completo).
+    """
+    with workbook_lock(workbook_file):
+        manifest = _load_manifest(get_mirror_dir(workbook_file))
+        if not manifest or manifest.get("libro") != _workbook_key(workbook_file):
+            return False
+        if any(str(nombre) not in {hoja["nombre"] for hoja in manifest["hojas"]} for nombre in hojas):
+            return False
+
+        parcial = unique_temp_path(workbook_file)
+        try:
+            with pd.ExcelWriter(parcial, engine="xlsxwriter") as writer:
+                for nombre, df in hojas.items():
+                    df.to_excel(writer, index=False, sheet_name=str(nombre))
+            if not transplant_sheets(workbook_file, parcial, [str(nombre) for nombre in hojas]):
+                return False
+        except Exception as e:
+            print(f"Advertencia: no se pudieron reemplazar las hojas de {workbook_file}: {e}")
+            return False
+        finally:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+
+        invalidate_cache(workbook_file)
+        ruta = os.path.abspath(workbook_file)
+        for clave in [clave for clave in _row_indices if clave[0] == ruta]:
+            del _row_indices[clave]
+        try:
+            mirror_dir = get_mirror_dir(workbook_file)
+            sufijo = uuid.uuid4().hex[:8]
+            for i, hoja in enumerate(manifest["hojas"]):
+                if hoja["nombre"] in hojas:
+                    manifest["hojas"][i] = _write_mirror_sheet(
+                        mirror_dir, i, sufijo, hoja["nombre"], hojas[hoja["nombre"]], huellas
+                    )
+            manifest["libro"] = _workbook_key(workbook_file)
+            _save_manifest(mirror_dir, manifest)
+            _remove_stale_files(mirror_dir, {hoja["archivo"] for hoja in manifest["hojas"]})
+        except Exception as e:
+            print(f"Advertencia: no se pudo actualizar la copia en Parquet de {workbook_file}: {e}")
+            invalidate_mirror(workbook_file)
+        return True
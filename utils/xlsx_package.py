@@ -0,0 +1,300 @@
+import os
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+from utils.workbook_lock import unique_temp_path
+
+# Espacios de nombres del formato .xlsx (Office Open XML)
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PACKAGE_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROW_PATTERN = r'<row r="{fila}"[^>]*?(?<!/)>(.*?)</row>'
+_CELL_PATTERN = re.compile(r'<c\b([^>]*?)(/>|>.*?</c>)', re.DOTALL)
+_CELL_REF = re.compile(r'\br="([A-Z]+)\d+"')
+_CELL_FULL_REF = re.compile(r'\br="([A-Z]+\d+)"')
+_SHARED_STRING_TYPE = re.compile(r'\bt="s"')
+_CELL_VALUE = re.compile(r'<v>(\d+)</v>')
+_SHEET_VIEWS = re.compile(r'<sheetViews>.*?</sheetViews>|<sheetViews/>', re.DOTALL)
+_CELL_STYLE = re.compile(r'\bs="\d+"')
+_DIMENSION = re.compile(r'<dimension\s+ref="([^"]+)"')
+
+# Partes del libro compartidas por todas las hojas
+SHARED_STRINGS_PART = "xl/sharedStrings.xml"
+STYLES_PART = "xl/styles.xml"
+
+# Bytes iniciales de cada hoja que se leen para encontrar su dimensión
+DIMENSION_PEEK_BYTES = 4096
+
+# Índices de libros ya leídos: ruta -> ((fecha de modificación, tamaño), índice)
+_manifests = {}
+
+
+def _read_sheet_parts(zf):
+    """
+    Ubica la parte XML de cada hoja leyendo solo workbook.xml y sus relaciones.
+    """
+    libro = ET.fromstring(zf.read("xl/workbook.xml"))
+    relaciones = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    destinos = {rel.get("Id"): rel.get("Target") for rel in relaciones.iter(f"{{{NS_PACKAGE_REL}}}Relationship")}
+    partes = {}
+    for hoja in libro.iter(f"{{{NS_MAIN}}}sheet"):
+        destino = destinos[hoja.get(f"{{{NS_REL}}}id")]
+        # El destino es relativo a xl/ salvo que empiece con "/"
+        partes[hoja.get("name")] = destino.lstrip("/") if destino.startswith("/") else posixpath.normpath(
+            posixpath.join("xl", destino)
+        )
+    return partes
+
+
+def _read_dimension(zf, parte):
+    """
+    Lee la dimensión de una hoja (p. ej. "A1:D41") del comienzo de su XML, sin descomprimir los datos.
+    """
+    with zf.open(parte) as f:
+        inicio = f.read(DIMENSION_PEEK_BYTES).decode("utf-8", errors="ignore")
+    encontrada = _DIMENSION.search(inicio)
+    return encontrada.group(1) if encontrada else None
+
+
+def _dimension_rows(dimension):
+    """
+    Filas de datos (sin la fila de encabezados) según la dimensión de una hoja.
+    """
+    if not dimension:
+        return None
+    ultima = re.search(r"(\d+)$", dimension)
+    return max(int(ultima.group(1)) - 1, 0) if ultima else None
+
+
+def read_manifest(workbook_file):
+    """
+    Índice de un libro .xlsx: sus hojas, en orden, con la parte XML y la dimensión de
+    cada una. Solo se leen workbook.xml, sus relaciones y el comienzo de cada hoja (la
+    dimensión precede a los datos). Para un libro en disco, el índice se guarda en memoria
+    por ruta, fecha de modificación y tamaño.
+
+    Args:
+        workbook_file: Ruta o archivo binario (p. ej. un archivo subido) con el libro.
+
+    Returns:
+        list: Diccionarios {"nombre", "parte", "dimension", "filas"}; "filas" no cuenta
+            los encabezados y es None si la hoja no declara su dimensión.
+    """
+    if not isinstance(workbook_file, (str, os.PathLike)):
+        try:
+            with zipfile.ZipFile(workbook_file) as zf:
+                return _build_manifest(zf)
+        finally:
+            workbook_file.seek(0)
+
+    ruta = os.path.abspath(workbook_file)
+    stat = os.stat(ruta)
+    version = (stat.st_mtime_ns, stat.st_size)
+    guardado = _manifests.get(ruta)
+    if guardado and guardado[0] == version:
+        return guardado[1]
+    with zipfile.ZipFile(ruta) as zf:
+        manifest = _build_manifest(zf)
+    _manifests[ruta] = (version, manifest)
+    return manifest
+
+
+def _build_manifest(zf):
+    manifest = []
+    for nombre, parte in _read_sheet_parts(zf).items():
+        dimension = _read_dimension(zf, parte)
+        manifest.append({"nombre": nombre, "parte": parte, "dimension": dimension, "filas": _dimension_rows(dimension)})
+    return manifest
+
+
+def list_sheets(workbook_file):
+    """
+    Nombres de las hojas de un libro .xlsx, en orden, sin leer sus datos (ver read_manifest).
+    """
+    return [hoja["nombre"] for hoja in read_manifest(workbook_file)]
+
+
+def _cell_xml(referencia, atributos, valor):
+    """
+    XML de una celda con un valor nuevo, conservando su estilo.
+    """
+    estilo = _CELL_STYLE.search(atributos or "")
+    inicio = f'<c r="{referencia}"' + (f" {estilo.group(0)}" if estilo else "")
+    if valor is None:
+        return f"{inicio}/>"
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f"{inicio}><v>{valor}</v></c>"
+    # Texto en línea: no requiere modificar la tabla de textos compartidos
+    return f'{inicio} t="inlineStr"><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+def _patch_row(contenido, numero_columna, referencia, valor):
+    """
+    Reemplaza (o inserta en su posición) una celda en el contenido XML de una fila.
+    :return: Contenido nuevo o None si la fila tiene una estructura no reconocida.
+    """
+    for celda in _CELL_PATTERN.finditer(contenido):
+        ref = _CELL_REF.search(celda.group(1))
+        if ref is None:
+            return None
+        columna = column_index_from_string(ref.group(1))
+        if columna == numero_columna:
+            return contenido[:celda.start()] + _cell_xml(referencia, celda.group(1), valor) + contenido[celda.end():]
+        if columna > numero_columna:
+            return contenido[:celda.start()] + _cell_xml(referencia, "", valor) + contenido[celda.start():]
+    return contenido + _cell_xml(referencia, "", valor)
+
+
+def _patch_sheet(xml, celdas):
+    for fila, numero_columna, valor in celdas:
+        fila_xml = re.search(_ROW_PATTERN.format(fila=fila), xml, re.DOTALL)
+        if fila_xml is None:
+            return None
+        referencia = f"{get_column_letter(numero_columna)}{fila}"
+        contenido = _patch_row(fila_xml.group(1), numero_columna, referencia, valor)
+        if contenido is None:
+            return None
+        xml = xml[:fila_xml.start(1)] + contenido + xml[fila_xml.end(1):]
+    return xml
+
+
+def _write_package(workbook_file, origen, nuevas):
+    """
+    Escribe junto al libro un temporal con las partes nuevas, copiando tal cual las demás
+    entradas del ZIP original.
+    :return: Ruta del temporal (quien llama lo mueve sobre el libro al cerrar el original).
+    """
+    tmp_path = unique_temp_path(workbook_file)
+    try:
+        with zipfile.ZipFile(tmp_path, "w") as destino:
+            for info in origen.infolist():
+                destino.writestr(info, nuevas.get(info.filename) or origen.read(info))
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def patch_cells(workbook_file, cambios):
+    """
+    Escribe celdas sueltas editando directamente el XML de las hojas afectadas dentro del
+    ZIP del libro: el resto de las partes se copia tal cual, sin interpretar el libro
+    completo con openpyxl. El archivo se reemplaza de forma atómica.
+
+    Args:
+        workbook_file (str): Ruta del libro .xlsx.
+        cambios (dict): Nombre de la hoja -> lista de (fila de Excel, número de columna, valor).
+            Las filas deben existir en la hoja.
+
+    Returns:
+        bool: True si se escribió; False si alguna hoja tiene una estructura no reconocida
+            (el libro no se modifica y se puede usar openpyxl).
+    """
+    manifest = read_manifest(workbook_file)
+    partes = {hoja["nombre"]: hoja["parte"] for hoja in manifest}
+    if any(hoja not in partes for hoja in cambios):
+        return False
+
+    with zipfile.ZipFile(workbook_file) as origen:
+        nuevas = {}
+        for hoja, celdas in cambios.items():
+            xml = _patch_sheet(origen.read(partes[hoja]).decode("utf-8"), celdas)
+            if xml is None:
+                return False
+            nuevas[partes[hoja]] = xml.encode("utf-8")
+        tmp_path = _write_package(workbook_file, origen, nuevas)
+    os.replace(tmp_path, workbook_file)
+    # Las celdas escritas quedan dentro de la dimensión de cada hoja: el índice sigue vigente
+    stat = os.stat(workbook_file)
+    _manifests[os.path.abspath(workbook_file)] = ((stat.st_mtime_ns, stat.st_size), manifest)
+    return True
+
+
+def _read_part(zf, parte):
+    try:
+        return zf.read(parte)
+    except KeyError:
+        return None
+
+
+def _read_shared_strings(zf):
+    """
+    Tabla de textos compartidos de un libro (lista de textos por índice).
+    """
+    xml = _read_part(zf, SHARED_STRINGS_PART)
+    if xml is None:
+        return []
+    return [
+        "".join(t.text or "" for t in si.iter(f"{{{NS_MAIN}}}t"))
+        for si in ET.fromstring(xml).iter(f"{{{NS_MAIN}}}si")
+    ]
+
+
+def _inline_shared_strings(xml, textos):
+    """
+    Convierte en texto en línea las celdas de una hoja que apuntan a la tabla de textos compartidos.
+    :return: XML nuevo o None si alguna celda tiene una estructura no reconocida.
+    """
+    partes = []
+    inicio = 0
+    for celda in _CELL_PATTERN.finditer(xml):
+        if not _SHARED_STRING_TYPE.search(celda.group(1)):
+            continue
+        referencia = _CELL_FULL_REF.search(celda.group(1))
+        indice = _CELL_VALUE.search(celda.group(2))
+        if referencia is None or indice is None or int(indice.group(1)) >= len(textos):
+            return None
+        partes.append(xml[inicio:celda.start()])
+        partes.append(_cell_xml(referencia.group(1), celda.group(1), textos[int(indice.group(1))]))
+        inicio = celda.end()
+    partes.append(xml[inicio:])
+    return "".join(partes)
+
+
+def transplant_sheets(workbook_file, origen_file, hojas):
+    """
+    Reemplaza hojas de un libro por las hojas del mismo nombre de otro libro (p. ej. uno
+    recién escrito solo con las hojas que cambiaron), copiando su XML dentro del ZIP: las
+    demás hojas se copian tal cual. Los índices de la tabla de textos compartidos del otro
+    libro no valen en este, por lo que los textos de las hojas copiadas quedan en línea; la
+    vista de cada hoja (pestaña seleccionada) es la que tenía en el libro.
+
+    Args:
+        workbook_file (str): Ruta del libro .xlsx que se modifica.
+        origen_file (str): Ruta del libro .xlsx con las hojas nuevas.
+        hojas (list): Nombres de las hojas a reemplazar.
+
+    Returns:
+        bool: True si se reemplazaron; False si falta alguna hoja, los libros no usan los
+            mismos estilos o alguna hoja tiene una estructura no reconocida (el libro no se modifica).
+    """
+    destino_partes = {hoja["nombre"]: hoja["parte"] for hoja in read_manifest(workbook_file)}
+    origen_partes = {hoja["nombre"]: hoja["parte"] for hoja in read_manifest(origen_file)}
+    if any(hoja not in destino_partes or hoja not in origen_partes for hoja in hojas):
+        return False
+
+    with zipfile.ZipFile(origen_file) as origen, zipfile.ZipFile(workbook_file) as libro:
+        # Las celdas copiadas indican su formato por posición en styles.xml
+        if _read_part(origen, STYLES_PART) != _read_part(libro, STYLES_PART):
+            return False
+        textos = _read_shared_strings(origen)
+        nuevas = {}
+        for hoja in hojas:
+            xml = _inline_shared_strings(origen.read(origen_partes[hoja]).decode("utf-8"), textos)
+            if xml is None:
+                return False
+            vista = _SHEET_VIEWS.search(libro.read(destino_partes[hoja]).decode("utf-8"))
+            if vista is not None:
+                xml = _SHEET_VIEWS.sub(lambda _: vista.group(0), xml, count=1)
+            nuevas[destino_partes[hoja]] = xml.encode("utf-8")
+        tmp_path = _write_package(workbook_file, libro, nuevas)
+    os.replace(tmp_path, workbook_file)
+    # Las dimensiones de las hojas reemplazadas cambiaron: el índice se vuelve a leer
+    _manifests.pop(os.path.abspath(workbook_file), None)
+    return True
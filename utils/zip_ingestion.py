@@ -0,0 +1,98 @@
+import os
+import zipfile
+import hashlib
+
+# Tamaño de cada bloque leído al descomprimir un miembro del ZIP
+ZIP_READ_CHUNK = 1024 * 1024
+
+# Tamaño máximo descomprimido de un PDF dentro de un ZIP (protege contra archivos corruptos o "zip bombs")
+MAX_ZIP_MEMBER_BYTES = int(os.environ.get("OC_MAX_ZIP_MEMBER_MB", 100)) * 1024 * 1024
+
+
+def is_zip_upload(file_name):
+    """
+    Indica si un archivo subido es un ZIP según su extensión.
+    """
+    return file_name.lower().endswith(".zip")
+
+
+def _is_pdf_member(info):
+    """
+    Indica si una entrada del ZIP es un PDF (ignora carpetas y metadatos de macOS).
+    """
+    nombre = info.filename
+    base = os.path.basename(nombre)
+    return (
+        not info.is_dir()
+        and nombre.lower().endswith(".pdf")
+        and not nombre.startswith("__MACOSX/")
+        and not base.startswith("._")
+    )
+
+
+def list_zip_pdfs(zip_file):
+    """
+    Lista los PDFs de un ZIP leyendo solo el directorio central (sin descomprimir).
+    :param zip_file: Ruta o archivo binario con el ZIP.
+    :return: Lista de nombres de los PDFs o None si el archivo no es un ZIP válido.
+    """
+    try:
+        with zipfile.ZipFile(zip_file) as zf:
+            return [info.filename for info in zf.infolist() if _is_pdf_member(info)]
+    except (zipfile.BadZipFile, OSError) as e:
+        print(f"Error al leer el archivo ZIP: {e}")
+        return None
+
+
+def _read_member(zf, info, max_bytes):
+    """
+    Descomprime un miembro por bloques calculando su hash al mismo tiempo.
+    :return: Tupla (contenido, hash MD5) o None si supera max_bytes.
+    """
+    md5 = hashlib.md5()
+    bloques = []
+    leidos = 0
+    with zf.open(info) as miembro:
+        while True:
+            bloque = miembro.read(ZIP_READ_CHUNK)
+            if not bloque:
+                break
+            leidos += len(bloque)
+            # Se controla lo realmente descomprimido, no el tamaño declarado en la cabecera
+            if leidos > max_bytes:
+                return None
+            md5.update(bloque)
+            bloques.append(bloque)
+    return b"".join(bloques), md5.hexdigest()
+
+
+def iter_zip_pdfs(zip_file, max_member_bytes=MAX_ZIP_MEMBER_BYTES):
+    """
+    Recorre los PDFs de un ZIP descomprimiéndolos en memoria de uno en uno, sin escribir
+    en disco, de modo que solo el miembro actual ocupa memoria.
+
+    Args:
+        zip_file: Ruta o archivo binario con el ZIP.
+        max_member_bytes (int): Tamaño máximo descomprimido de cada PDF; los mayores se omiten.
+
+    Yields:
+        tuple: (nombre del miembro, contenido en bytes, hash MD5 del contenido).
+    """
+    try:
+        with zipfile.ZipFile(zip_file) as zf:
+            for info in zf.infolist():
+                if not _is_pdf_member(info):
+                    continue
+                try:
+                    leido = _read_member(zf, info, max_member_bytes)
+                except (zipfile.BadZipFile, zipfile.LargeZipFile, RuntimeError, OSError, EOFError) as e:
+                    # RuntimeError: miembro cifrado; el resto del ZIP se sigue procesando
+                    print(f"Advertencia: no se pudo descomprimir '{info.filename}': {e}")
+                    continue
+                if leido is None:
+                    print(f"Advertencia: '{info.filename}' supera el tamaño máximo permitido y será ignorado.")
+                    continue
+                contenido, file_hash = leido
+                yield info.filename, contenido, file_hash
+    except (zipfile.BadZipFile, OSError) as e:
+        print(f"Error al leer el archivo ZIP: {e}")
@@ -0,0 +1,70 @@
+"""
+Servicio de ingesta automática: vigila la carpeta de entrada de un usuario
+(data/users/<usuario>/entrada_pdf) y agrega a su perfil las órdenes de compra de cada PDF
+que se deje ahí, para que ya estén cargadas al abrir la aplicación.
+
+Los PDFs procesados se mueven a entrada_pdf/procesados, los que no se pudieron leer a
+entrada_pdf/con_error y los escaneados (sin texto) a entrada_pdf/ingreso_manual.
+Se detiene con Ctrl+C.
+
+Uso:
+    python vigilar_carpeta.py --usuario NOMBRE [--procesos N] [--espera 2] [--lote 50] [--separar]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.batch_extraction import MAX_EXTRACTION_WORKERS
+from utils.text_backends import TEXT_BACKENDS, DEFAULT_TEXT_BACKEND
+from utils.watch_ingestion import WatchFolderService, DEBOUNCE_SECONDS, WATCH_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vigila la carpeta de entrada de un usuario y extrae los PDFs nuevos.")
+    parser.add_argument("--usuario", required=True, help="Nombre de usuario (carpeta data/users/<usuario>)")
+    parser.add_argument("--procesos", type=int, default=MAX_EXTRACTION_WORKERS, help="Procesos de extracción en paralelo")
+    parser.add_argument("--backend", choices=list(TEXT_BACKENDS.keys()), default=DEFAULT_TEXT_BACKEND,
+                        help="Motor de lectura de texto")
+    parser.add_argument("--espera", type=float, default=DEBOUNCE_SECONDS,
+                        help="Segundos sin cambios antes de procesar un PDF recién copiado")
+    parser.add_argument("--lote", type=int, default=WATCH_BATCH_SIZE, help="Máximo de PDFs por lote")
+    parser.add_argument("--separar", action="store_true",
+                        help="Separar los PDFs que contienen varias órdenes de compra")
+    args = parser.parse_args()
+
+    user_data_path = os.path.join("data", "users", args.usuario)
+    if not os.path.isdir(user_data_path):
+        print(f"No existe la carpeta de datos del usuario: {user_data_path}")
+        return 1
+
+    servicio = WatchFolderService(
+        args.usuario,
+        user_data_path,
+        max_workers=max(1, args.procesos),
+        backend=args.backend,
+        debounce_seconds=args.espera,
+        batch_size=max(1, args.lote),
+        split_orders=args.separar
+    )
+    servicio.start()
+    print(f"Vigilando {servicio.watch_dir} (Ctrl+C para detener)")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Deteniendo...")
+    finally:
+        servicio.stop()
+
+    e = servicio.estadisticas
+    print(f"Lotes: {e['lotes']} · nuevas: {e['ok']} · duplicadas: {e['duplicado']} · "
+          f"con error: {e['error']} · ingreso manual: {e['manual']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())